@@ -1,70 +1,36 @@
 import random
-import pygame
 import heapq
-import copy
-from collections import deque
-from sprites import Mummy, Player, Trap
-from constants import CELL_SIZE
+import rules
+from solver import solve
+from policy_cache import get_policy, SURVIVE
+from tablebase import get_tablebase
+from q_learning import get_q_table
+import anytime
+
+# Độ sâu tối đa của BFS; trạng thái đóng gói đủ nhỏ để tìm sâu hơn nhiều so với 10
+SEARCH_MAX_DEPTH = 50
+# Số trạng thái tối đa mỗi lần tìm kiếm, giữ mỗi nước đi trong vài chục ms trên mê cung 64x64
+SEARCH_MAX_EXPANDED = 1000
+# Thời gian (giây) cho tìm kiếm anytime ở mỗi nước đi, bất kể kích thước mê cung hay số xác ướp
+SEARCH_BUDGET = 0.02
 
 def manhattan_distance(row1, col1, row2, col2):
     return abs(row1 - row2) + abs(col1 - col2)
 
-def predict_mummy_moves(mummy, maze, gate, player_row, player_col, steps=2):
-    """Giảm số bước dự đoán và vùng đệm của xác ướp"""
-    possible_positions = {(mummy.row, mummy.col)}
-    current_row, current_col = mummy.row, mummy.col
-    directions = ["up", "down", "left", "right"]
-    priority = ["left", "right", "up", "down"] if mummy.color == "white" else ["up", "down", "left", "right"]
-
-    # Chỉ thêm vùng đệm 1 ô xung quanh xác ướp
-    buffer_positions = set()
-    for dr, dc in [(0,1), (0,-1), (1,0), (-1,0)]:  # Chỉ thêm 4 ô kề cạnh
-        new_row, new_col = mummy.row + dr, mummy.col + dc
-        if 0 <= new_row < len(maze) and 0 <= new_col < len(maze[0]):  # Kiểm tra giới hạn bản đồ
-            buffer_positions.add((new_row, new_col))
-
-    for _ in range(steps):  # Tăng số bước dự đoán
-        current_distance = manhattan_distance(current_row, current_col, player_row, player_col)
-        possible_moves = []
-        
-        for direction in directions:
-            new_row, new_col = current_row, current_col
-            if direction == "up": new_row -= 1
-            elif direction == "down": new_row += 1
-            elif direction == "left": new_col -= 1
-            elif direction == "right": new_col += 1
-            
-            if mummy.eligible_move(maze, gate, new_row, new_col):
-                new_distance = manhattan_distance(new_row, new_col, player_row, player_col)
-                possible_moves.append((new_distance, direction, new_row, new_col))
-        
-        if not possible_moves:
-            break
-            
-        possible_moves.sort(key=lambda x: x[0])
-        min_distance = possible_moves[0][0]
-        best_moves = [move for move in possible_moves if move[0] == min_distance]
-        selected_move = min(best_moves, key=lambda x: priority.index(x[1]))
-        current_row, current_col = selected_move[2], selected_move[3]
-        possible_positions.add((current_row, current_col))
-        
-        # Thêm vùng đệm cho vị trí mới
-        for dr in [-1, 0, 1]:
-            for dc in [-1, 0, 1]:
-                buffer_positions.add((current_row + dr, current_col + dc))
-
-    return possible_positions.union(buffer_positions)
-
 class GameState:
-    def __init__(self, game):
-        self.player_pos = (game.player.row, game.player.col)
-        self.maze = game.maze
-        self.gate = game.gate
-        self.mummies = [(m.row, m.col, m.color, m.direction) for m in game.mummies]
-        self.traps = [((t.rect.y - 80) // CELL_SIZE, (t.rect.x - 215) // CELL_SIZE) for t in game.traps]
-        self.goals = [(stair["row"], stair["col"]) for stair in game.stairs_positions]
-        self.max_row = len(game.maze)
-        self.max_col = len(game.maze[0]) if self.max_row > 0 else 0
+    """Góc nhìn của các thuật toán lên một rules.State (không phụ thuộc sprite)."""
+    def __init__(self, state):
+        self.state = state
+        self.level = state.level
+        self.player_pos = state.player
+        self.maze = state.level.maze
+        self.gate = {"isClosed": state.gate_closed}
+        self.mummies = list(state.mummies)
+        self.traps = state.level.traps
+        self.goals = state.level.stairs
+        self.max_row = state.level.rows
+        self.max_col = state.level.cols
+        self.search_result = None  # anytime.SearchResult, tính một lần cho mỗi quyết định
 
     def get_mummy_positions(self):
         return [(m[0], m[1]) for m in self.mummies]
@@ -79,123 +45,79 @@ class GameState:
     def is_goal(self, row, col):
         return (row, col) in self.goals
 
-def is_valid_move(game, game_state, current_row, current_col, new_row, new_col):
-    if (new_row, new_col) in game_state.goals:
-        return True
-
-    max_row = game_state.max_row
-    max_col = game_state.max_col
-    if new_row < 0 or new_row >= max_row or new_col < 0 or new_col >= max_col:
-        return False
+class PlanContext:
+    """Bản sao sổ sách chống lặp của game cho một lần lập kế hoạch.
 
+    Luồng lập kế hoạch chỉ đọc và sửa bản sao này, không bao giờ chạm vào
+    Game; luồng chính chép nó ngược lại vào game khi nhận kết quả (apply_to).
+    Chơi không cần cửa sổ (headless.py) thì tạo thẳng với sổ sách rỗng.
+    Mọi lựa chọn ngẫu nhiên của kế hoạch dùng `rng` riêng chứ không dùng module
+    random chung, nên kế hoạch bị hủy vẫn chạy tiếp cũng không làm lệch chuỗi
+    random của luồng chính (replay dựa vào random.seed của từng lần chơi).
+    """
+    def __init__(self, level_number, previous_positions=(), blocked_positions=(), seed=None):
+        self.level_number = level_number
+        self.previous_positions = list(previous_positions)
+        self.blocked_positions = set(blocked_positions)
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_game(cls, game):
+        # Seed chỉ phụ thuộc lần chơi và trạng thái, không phụ thuộc lúc luồng nền chạy xong
+        seed = game.packed.pack(game.state) << 32 | game.plan_seed
+        return cls(game.level_manager.current_level + 1, game.previous_positions,
+                   game.blocked_positions, seed)
+
+    def apply_to(self, game):
+        game.previous_positions = self.previous_positions
+        game.blocked_positions = self.blocked_positions
+
+def direction_between(current_row, current_col, new_row, new_col):
     dr = new_row - current_row
     dc = new_col - current_col
-    direction = None
-    if dr == -1: direction = "top"
-    elif dr == 1: direction = "bottom"
-    elif dc == -1: direction = "left"
-    elif dc == 1: direction = "right"
-
-    current_cell = game_state.maze[current_row][current_col]
-    if "walls" in current_cell and direction in current_cell["walls"]:
-        return False
+    if abs(dr) + abs(dc) != 1:
+        return None
+    if dr == -1: return "up"
+    if dr == 1: return "down"
+    if dc == -1: return "left"
+    return "right"
 
-    target_cell = game_state.maze[new_row][new_col]
-    opposite = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
-    if "walls" in target_cell and opposite[direction] in target_cell["walls"]:
+def is_valid_move(game, game_state, current_row, current_col, new_row, new_col):
+    direction = direction_between(current_row, current_col, new_row, new_col)
+    if direction is None:
         return False
-
-    return True
+    return game_state.level.player_target(current_row, current_col, direction,
+                                          game_state.gate["isClosed"]) is not None
 
 def predict_mummy_moves_auto(game, game_state, mummy, player_row, player_col):
     """
-    Dự đoán các di chuyển có thể của một mummy.
-    Returns: List of tuples (direction, new_row, new_col)
+    Dự đoán các di chuyển có thể của một mummy (mỗi bước đều rút ngắn khoảng cách).
+    Returns: List of tuples (direction, new_row, new_col), theo thứ tự ưu tiên màu
     """
     # Handle different mummy data formats
     if hasattr(mummy, 'row'):
-        current_row = mummy.row
-        current_col = mummy.col
+        current_row, current_col, color = mummy.row, mummy.col, mummy.color
     elif isinstance(mummy, dict):
-        current_row = mummy['row']
-        current_col = mummy['col']
+        current_row, current_col, color = mummy['row'], mummy['col'], mummy.get('color', 'white')
     else:
-        current_row, current_col = mummy[0], mummy[1]
-    
-    current_distance = abs(current_row - player_row) + abs(current_col - player_col)
-    possible_moves = []
-    directions = [("up", -1, 0), ("down", 1, 0), ("left", 0, -1), ("right", 0, 1)]
-    
-    for direction_name, dr, dc in directions:
-        new_row, new_col = current_row + dr, current_col + dc
+        current_row, current_col, color = mummy[0], mummy[1], mummy[2]
 
-        max_row = game_state.max_row
-        max_col = game_state.max_col
-        if not (0 <= new_row < max_row and 0 <= new_col < max_col):
-            continue
-
-        direction = None
-        if dr == -1: direction = "top"
-        elif dr == 1: direction = "bottom"
-        elif dc == -1: direction = "left"
-        elif dc == 1: direction = "right"
-
-        current_cell = game_state.maze[current_row][current_col]
-        if "walls" in current_cell and direction in current_cell["walls"]:
-            continue
-
-        target_cell = game_state.maze[new_row][new_col]
-        opposite = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
-        if "walls" in target_cell and opposite[direction] in target_cell["walls"]:
-            continue
-
-        if game_state.gate.get("isClosed", False):
-            if direction == "up" and current_row > 0 and game_state.maze[current_row - 1][current_col].get("gate"):
-                continue
-            if direction == "down" and current_row < max_row - 1 and game_state.maze[current_row + 1][current_col].get("gate"):
-                continue
-            if direction == "left" and current_col > 0 and game_state.maze[current_row][current_col - 1].get("gate"):
-                continue
-            if direction == "right" and current_col < max_col - 1 and game_state.maze[current_row][current_col + 1].get("gate"):
-                continue
-
-        new_distance = abs(new_row - player_row) + abs(new_col - player_col)
-        if new_distance < current_distance:
-            possible_moves.append((direction_name, new_row, new_col))
+    current_distance = manhattan_distance(current_row, current_col, player_row, player_col)
+    possible_moves = []
+    for direction in rules.MUMMY_PRIORITY[rules.normalize_color(color)]:
+        target = game_state.level.mummy_target(current_row, current_col, direction,
+                                               game_state.gate["isClosed"])
+        if target and manhattan_distance(target[0], target[1], player_row, player_col) < current_distance:
+            possible_moves.append((direction, target[0], target[1]))
 
     return possible_moves
 
 def is_mummy_blocked(game, game_state, mummy):
     """Kiểm tra xem mummy có bị chặn bởi tường không"""
-    mummy_row, mummy_col = mummy[0], mummy[1]
-    
-    directions = [
-        ("up", -1, 0, "top"),
-        ("down", 1, 0, "bottom"),
-        ("left", 0, -1, "left"),
-        ("right", 0, 1, "right")
-    ]
-    
-    blocked_count = 0
-    for _, dr, dc, wall_dir in directions:
-        new_row, new_col = mummy_row + dr, mummy_col + dc
-        
-        if new_row < 0 or new_row >= game_state.max_row or \
-           new_col < 0 or new_col >= game_state.max_col:
-            blocked_count += 1
-            continue
-            
-        current_cell = game_state.maze[mummy_row][mummy_col]
-        if "walls" in current_cell and wall_dir in current_cell["walls"]:
-            blocked_count += 1
-            continue
-            
-        target_cell = game_state.maze[new_row][new_col]
-        opposite = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
-        if "walls" in target_cell and opposite[wall_dir] in target_cell["walls"]:
-            blocked_count += 1
-            
-    return blocked_count >= 3
+    level = game_state.level
+    open_directions = level.open_mask[level.cell_index(mummy[0], mummy[1])]
+    # Bị chặn khi chỉ còn tối đa một hướng mở
+    return open_directions & (open_directions - 1) == 0
 
 def calculate_safety_score(state):
     """Tính điểm an toàn với trọng số mới"""
@@ -308,145 +230,33 @@ def find_path_to_goal(game, game_state):
     path = bfs_search(game, game_state, start, goals)
     return path if path else None
 
-def bfs_search(game, game_state, start, goals, max_depth=10):
-    queue = deque([(copy.deepcopy(game_state), [], 0)])
-    visited = set()
-
-    while queue:
-        state, actions, depth = queue.popleft()
-        
-        state_key = (state.player_pos, tuple(sorted((m[0], m[1]) for m in state.mummies)))
-        if state_key in visited:
-            continue
-        visited.add(state_key)
-
-        if depth > max_depth:
-            continue
-
-        if state.is_goal(state.player_pos[0], state.player_pos[1]):
-            return actions[0] if actions else None
-
-        if (state.player_pos in [(m[0], m[1]) for m in state.mummies]) or (state.player_pos in state.traps):
-            continue
-
-        directions = ["up", "down", "left", "right"]
-        for direction in directions:
-            new_row, new_col = state.player_pos
-            if direction == "up": new_row -= 1
-            elif direction == "down": new_row += 1
-            elif direction == "left": new_col -= 1
-            elif direction == "right": new_col += 1
+def anytime_search(game_state, budget=SEARCH_BUDGET):
+    """Kết quả tìm kiếm anytime (đào sâu dần trong `budget` giây) cho game_state, nhớ lại trong cùng quyết định."""
+    if game_state.search_result is None:
+        game_state.search_result = anytime.search(game_state.level, game_state.state, budget)
+    return game_state.search_result
 
-            if not is_valid_move(game, game_state, state.player_pos[0], state.player_pos[1], new_row, new_col):
-                continue
+def bfs_search(game, game_state, start, goals, budget=SEARCH_BUDGET):
+    """Hướng đi đầu tiên của đường thắng ngắn nhất tìm được trong `budget` giây, None nếu chưa tìm thấy."""
+    result = anytime_search(game_state, budget)
+    return result.move if result.value is not None and result.value > anytime.WIN_VALUE // 2 else None
 
-            new_state = copy.deepcopy(state)
-            new_state.player_pos = (new_row, new_col)
-
-            new_mummies = []
-            mummy_positions = []
-            
-            for mummy in new_state.mummies:
-                mummy_data = {
-                    'row': mummy[0],
-                    'col': mummy[1],
-                    'color': mummy[2],
-                    'direction': mummy[3]
-                }
-                
-                moves = predict_mummy_moves_auto(game, new_state, mummy_data, new_row, new_col)
-                if moves:
-                    new_pos = (moves[0][1], moves[0][2])
-                    new_mummies.append((new_pos[0], new_pos[1], mummy[2], moves[0][0]))
-                    mummy_positions.append(new_pos)
-                else:
-                    new_mummies.append(mummy)
-                    mummy_positions.append((mummy[0], mummy[1]))
-
-            position_counts = {}
-            for pos in mummy_positions:
-                position_counts[pos] = position_counts.get(pos, 0) + 1
-            new_mummies = [m for m in new_mummies if position_counts[(m[0], m[1])] <= 1]
-            new_state.mummies = new_mummies
-
-            queue.append((new_state, actions + [direction], depth + 1))
-
-    return None
+def tablebase_move(game_state):
+    """Nước đi theo tablebase; None nếu cấp độ quá lớn để lập bảng hoặc trạng thái không có trong bảng."""
+    tablebase = get_tablebase(game_state.level)
+    return tablebase.best_move(game_state.state) if tablebase else None
 
 def find_safe_path_to_goal(game, game_state):
     start = game_state.player_pos
     goals = game_state.goals
-    queue = deque([(copy.deepcopy(game_state), [], 0)])
-    visited = set()
-    best_path = None
-    best_safety_score = float('-inf')
-
-    while queue:
-        state, actions, depth = queue.popleft()
-        
-        if depth > 10:
-            continue
-
-        state_key = (state.player_pos, tuple(sorted((m[0], m[1]) for m in state.mummies)))
-        if state_key in visited:
-            continue
-        visited.add(state_key)
-
-        if state.is_goal(state.player_pos[0], state.player_pos[1]):
-            return actions[0] if actions else None
-
-        if (state.player_pos in [(m[0], m[1]) for m in state.mummies]) or (state.player_pos in state.traps):
-            continue
-
-        current_safety = calculate_safety_score(state)
-        if best_path is None or current_safety > best_safety_score:
-            if state.is_goal(state.player_pos[0], state.player_pos[1]):
-                best_path = actions[0] if actions else None
-                best_safety_score = current_safety
-
-        for direction in ["up", "down", "left", "right"]:
-            new_row, new_col = state.player_pos
-            if direction == "up": new_row -= 1
-            elif direction == "down": new_row += 1
-            elif direction == "left": new_col -= 1
-            elif direction == "right": new_col += 1
-
-            if not is_valid_move(game, state, state.player_pos[0], state.player_pos[1], new_row, new_col):
-                continue
-
-            new_state = copy.deepcopy(state)
-            new_state.player_pos = (new_row, new_col)
-
-            new_mummies = []
-            mummy_positions = []
-            for mummy in new_state.mummies:
-                mummy_data = {
-                    'row': mummy[0],
-                    'col': mummy[1],
-                    'color': mummy[2],
-                    'direction': mummy[3]
-                }
-                
-                moves = predict_mummy_moves_auto(game, new_state, mummy_data, new_row, new_col)
-                if moves:
-                    new_pos = (moves[0][1], moves[0][2])
-                    new_mummies.append((new_pos[0], new_pos[1], mummy[2], moves[0][0]))
-                    mummy_positions.append(new_pos)
-                else:
-                    new_mummies.append(mummy)
-                    mummy_positions.append((mummy[0], mummy[1]))
-
-            position_counts = {}
-            for pos in mummy_positions:
-                position_counts[pos] = position_counts.get(pos, 0) + 1
-            new_mummies = [m for m in new_mummies if position_counts[(m[0], m[1])] <= 1]
-            new_state.mummies = new_mummies
-
-            queue.append((new_state, actions + [direction], depth + 1))
-
-    return best_path
+    return bfs_search(game, game_state, start, goals)
 
 def stall_safely(game, game_state):
+    # Trạng thái có trong tablebase: chọn theo giá trị chính xác thay vì trọng số ước lượng
+    exact_move = tablebase_move(game_state)
+    if exact_move:
+        return exact_move
+
     directions = ["up", "down", "left", "right"]
     safe_directions = []
 
@@ -490,6 +300,10 @@ def stall_safely(game, game_state):
     return least_dangerous
 
 def find_least_dangerous_move(game, game_state):
+    exact_move = tablebase_move(game_state)
+    if exact_move:
+        return exact_move
+
     directions = ["up", "down", "left", "right"]
     moves_with_scores = []
 
@@ -541,7 +355,7 @@ def find_least_dangerous_move(game, game_state):
     if moves_with_scores:
         return min(moves_with_scores, key=lambda x: x[0])[1]
 
-    for direction in random.sample(directions, len(directions)):
+    for direction in game.rng.sample(directions, len(directions)):
         player_row, player_col = game_state.player_pos
         new_row, new_col = player_row, player_col
         if direction == "up": new_row -= 1
@@ -611,86 +425,130 @@ def search_no_observation(game, game_state):
     
     return None
 
-def auto_play_step(game):
-    """Thực hiện một bước tự động với logic từ auto_agent"""
-    if not hasattr(game, 'blocked_positions'):
-        game.blocked_positions = set()
-    if not hasattr(game, 'reset_counter'):
-        game.reset_counter = 0
-    if not hasattr(game, 'previous_positions'):
-        game.previous_positions = []
-
-    if game.game_over:
-        print(f"Game over! Reason: {'Collision with mummy' if pygame.sprite.spritecollide(game.player, game.characters, False) else 'Trap or other'}")
-        game.blocked_positions.clear()
-        return "auto_play"
-
-    if game.player.moving or game.player.move_queue or any(mummy.moving or mummy.move_queue for mummy in game.mummies):
-        return "auto_play"
-
-    game_state = GameState(game)
+def search_move(context, game_state, algorithm):
+    """Chọn nước đi bằng tìm kiếm khi chưa có chính sách cho trạng thái hiện tại.
 
-    current_pos = (game.player.row, game.player.col)
-    game.previous_positions.append(current_pos)
-    if len(game.previous_positions) > 6:
-        game.previous_positions.pop(0)
+    Chỉ cập nhật sổ sách chống lặp trong `context` (PlanContext), không đụng tới Game.
+    """
+    current_pos = game_state.player_pos
+    context.previous_positions.append(current_pos)
+    if len(context.previous_positions) > 6:
+        context.previous_positions.pop(0)
 
-    if len(game.previous_positions) >= 4:
-        last_4_pos = game.previous_positions[-4:]
+    if len(context.previous_positions) >= 4:
+        last_4_pos = context.previous_positions[-4:]
         if len(set(last_4_pos)) <= 2:
             print("Detected short loop pattern, forcing path recalculation")
-            game.blocked_positions.clear()
-            game.previous_positions.clear()
-            return find_alternative_path(game, game_state)
+            context.blocked_positions.clear()
+            context.previous_positions.clear()
+            return find_alternative_path(context, game_state)
 
     position_counts = {}
-    for pos in game.previous_positions:
+    for pos in context.previous_positions:
         position_counts[pos] = position_counts.get(pos, 0) + 1
 
     for pos, count in position_counts.items():
         if count >= 3:
             print(f"Detected loop at {pos}, resetting nearby blocked positions")
-            game.blocked_positions = {
-                move for move in game.blocked_positions
+            context.blocked_positions = {
+                move for move in context.blocked_positions
                 if abs(move[0] - current_pos[0]) > 2 or abs(move[1] - current_pos[1]) > 2
             }
-            game.previous_positions.clear()
+            context.previous_positions.clear()
             break
 
-    mummies_data = [{"row": m.row, "col": m.col, "color": m.color, "direction": m.direction} for m in game.mummies]
-    traps_data = [{"row": (t.rect.y - 80) // CELL_SIZE, "col": (t.rect.x - 215) // CELL_SIZE} for t in game.traps]
-    game.move_history.append({
-        "player_pos": (game.player.row, game.player.col),
-        "mummies": mummies_data,
-        "traps": traps_data
-    })
-
-    if game_state.is_goal(game.player.row, game.player.col):
+    if game_state.is_goal(*current_pos):
         print(f"Reached goal at {current_pos}!")
-        return "auto_play"
+        return None
 
-    situation = analyze_situation(game, game_state)
-    mummy_positions = [(m.row, m.col) for m in game.mummies]
-    print(f"Level {game.level_manager.current_level + 1}, Situation: {situation}, Player at {current_pos}, Mummies at {mummy_positions}")
+    situation = analyze_situation(context, game_state)
+    mummy_positions = game_state.get_mummy_positions()
+    depth = game_state.search_result.depth if game_state.search_result else "-"
+    print(f"Level {context.level_number}, Situation: {situation}, Player at {current_pos}, Mummies at {mummy_positions}, Search depth: {depth}")
 
     next_move = None
-    if hasattr(game.player, 'current_algorithm') and game.player.current_algorithm == "search_no_observation":
-        next_move = search_no_observation(game, game_state)
+    if algorithm == "search_no_observation":
+        next_move = search_no_observation(context, game_state)
+    elif algorithm == "bfs":
+        # BFS chính xác (solver.solve) nhưng chỉ mở rộng tối đa SEARCH_MAX_EXPANDED trạng thái mỗi nước:
+        # tìm thấy thì đi theo lời giải ngắn nhất, hết giới hạn thì theo nước tốt nhất của tìm kiếm
+        # anytime, cuối cùng mới tới stall_safely
+        solution = solve(game_state.level, game_state.state, max_expanded=SEARCH_MAX_EXPANDED)
+        next_move = solution.moves[0] if solution.moves else anytime_search(game_state).move
+        if not next_move:
+            next_move = stall_safely(context, game_state)
     else:
         if situation == "can_reach_goal_safely":
-            next_move = find_path_to_goal(game, game_state)
-        else:
-            next_move = search_no_observation(game, game_state)
-            if not next_move:
-                next_move = find_safest_path(game, game_state)
+            next_move = find_path_to_goal(context, game_state)
+        if not next_move:
+            # Chưa thấy đường thắng: đi nước tốt nhất mà tìm kiếm anytime tìm được trong ngân sách
+            next_move = anytime_search(game_state).move
+        if not next_move:
+            next_move = search_no_observation(context, game_state)
+        if not next_move:
+            next_move = find_safest_path(context, game_state)
+
+    return next_move
+
+def choose_move(context, game_state, algorithm):
+    """(nước đi, context đã cập nhật) cho `game_state` theo `algorithm`; chạy trên luồng của game.planner.
+
+    Chỉ dùng dữ liệu bất biến (rules.State) và bản sao `context`, nên một kế
+    hoạch bị hủy giữa chừng không để lại dấu vết nào trên Game.
+    """
+    next_move = None
+    if algorithm == "q_learning":
+        # Chỉ đọc bảng Q đã huấn luyện ngoại tuyến (python q_learning.py); chưa có thì đi như các chế độ khác
+        q_table = get_q_table(game_state.level)
+        next_move = q_table.best_move(game_state.state) if q_table else None
+    if next_move is None and algorithm != "search_no_observation":
+        # Cấp độ đã có chính sách trong bộ nhớ đệm: tra bảng O(1) thay vì tìm kiếm lại
+        policy = get_policy(game_state.level)
+        next_move = policy.best_move(game_state.state) if policy else None
+        if next_move is not None and policy.distance(game_state.state) == SURVIVE:
+            # Không thể thắng nữa: chọn nước hòa hoặc thua muộn nhất theo tablebase
+            next_move = stall_safely(context, game_state)
+    if next_move is None:
+        next_move = search_move(context, game_state, algorithm)
+    return next_move, context
+
+def auto_play_step(game, wait=0):
+    """Thực hiện một bước tự động với logic từ auto_agent.
+
+    `wait` là số giây tối đa chờ luồng lập kế hoạch trả lời trong lần gọi này.
+    """
+    if not hasattr(game, 'blocked_positions'):
+        game.blocked_positions = set()
+    if not hasattr(game, 'reset_counter'):
+        game.reset_counter = 0
+    if not hasattr(game, 'previous_positions'):
+        game.previous_positions = []
+
+    if game.game_over:
+        print(f"Game over! Reason: {'Collision with mummy' if game.outcome == rules.CAUGHT else 'Trap or other'}")
+        game.blocked_positions.clear()
+        return "auto_play"
+
+    if game.characters_moving():
+        return "auto_play"
 
-    if game.player.current_algorithm == "search_no_observation":
-        next_move = search_no_observation(game, game_state)
+    algorithm = game.player.current_algorithm
+    planner = getattr(game, "planner", None)
+    if planner is None:
+        next_move, context = choose_move(PlanContext.from_game(game), GameState(game.state), algorithm)
+    else:
+        # Tìm kiếm chạy trên luồng nền với bản chụp trạng thái; chưa xong thì nhịp sau hỏi lại,
+        # game vẫn vẽ và nhận sự kiện. poll chỉ trả kết quả của đúng khóa (trạng thái, thuật toán) hiện tại.
+        ready, plan = planner.poll((game.state, algorithm), wait, choose_move,
+                                   PlanContext.from_game(game), GameState(game.state), algorithm)
+        if not ready:
+            return "auto_play"
+        next_move, context = plan
+    context.apply_to(game)
 
     if next_move:
         print(f"Attempting move: {next_move}")
-        player_move_success = game.player.move(next_move, game.maze, game.gate, game.stairs_positions)
-        if not player_move_success:
+        if not game.play_turn(next_move):
             new_row, new_col = game.player.row, game.player.col
             if next_move == "up": new_row -= 1
             elif next_move == "down": new_row += 1
@@ -700,9 +558,6 @@ def auto_play_step(game):
             print(f"Move {next_move.upper()} blocked! Added to blocked list.")
             return "auto_play"
 
-        for mummy in game.mummies:
-            mummy.auto_move(game.maze, game.gate, game.player.row, game.player.col)
-
         game.reset_counter = 0
         return game.check_collisions()
 
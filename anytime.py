@@ -0,0 +1,220 @@
+"""Tìm kiếm anytime có hạn thời gian cho mỗi nước đi của chế độ tự chơi.
+
+Ví dụ:
+    python anytime.py                          # mọi cấp độ, ngân sách 5 ms và 50 ms
+    python anytime.py --budget-ms 2 20 --levels 1,4
+
+search() đào sâu dần (iterative deepening): tìm kiếm theo chiều sâu có giới
+hạn 1, 2, 3... lượt trên mã trạng thái đóng gói, mỗi vòng thử nước tốt nhất
+của vòng trước đầu tiên. Vòng nào chưa xong khi hết `budget` giây thì bị bỏ,
+nước trả về là của vòng sâu nhất đã xong, nên luôn có câu trả lời (vòng độ sâu
+1 luôn được chạy hết) và thời gian quyết định gần như cố định dù mê cung lớn
+hay nhiều xác ướp.
+
+Giá trị một trạng thái nhìn từ người chơi:
+    thắng sau k lượt   WIN_VALUE - k
+    chết sau k lượt    LOSS_VALUE + k - 1
+    lá ở độ sâu giới hạn: ước lượng theo số bước tới cầu thang và khoảng cách
+    tới xác ướp gần nhất.
+Vòng nào không có lá ước lượng (mọi nhánh đều kết thúc) là kết quả chính xác
+và tìm kiếm dừng sớm; thắng được tìm thấy ở vòng d cũng là đường thắng ngắn nhất.
+"""
+import argparse
+from collections import deque, namedtuple
+import sys
+import threading
+import time
+import weakref
+
+import rules
+from level_manager import LEVELS_PATH, LevelManager
+from state_packing import get_packed_level
+
+WIN_VALUE = 1_000_000
+LOSS_VALUE = -1_000_000
+DEFAULT_BUDGET = 0.02
+MUMMY_DISTANCE_CAP = 3  # xác ướp xa hơn chừng này ô không còn ảnh hưởng tới ước lượng
+
+# move: nước đi tốt nhất (None nếu không còn nước nào không bị chặn)
+# depth: độ sâu của vòng sâu nhất đã xong; value: giá trị của nước đó ở vòng ấy
+# expanded: số trạng thái đã mở rộng, kể cả vòng bị bỏ dở
+# complete: True nếu giá trị là chính xác (không phụ thuộc ước lượng)
+SearchResult = namedtuple("SearchResult", ["move", "depth", "value", "expanded", "complete"])
+
+
+class _Timeout(Exception):
+    pass
+
+
+_exit_distances = weakref.WeakKeyDictionary()
+_exit_distances_lock = threading.Lock()  # luồng lập kế hoạch (planner.py) và luồng chính cùng dùng
+
+
+def exit_distances(level):
+    """Số lượt ít nhất từ mỗi ô tới cầu thang khi bỏ qua xác ướp và cổng (level.size + 1 nếu không tới được)."""
+    with _exit_distances_lock:
+        distances = _exit_distances.get(level)
+        if distances is None:
+            distances = _exit_distances[level] = _compute_exit_distances(level)
+        return distances
+
+
+def _compute_exit_distances(level):
+    unreachable = level.size + 1
+    distances = [unreachable] * level.size
+    queue = deque()
+    for cell in range(level.size):
+        if level.exit_mask[cell]:
+            distances[cell] = 1
+            queue.append(cell)
+    while queue:
+        cell = queue.popleft()
+        for d in range(4):
+            if level.open_mask[cell] >> d & 1:
+                neighbor = level.neighbors[cell * 4 + d]
+                if distances[neighbor] == unreachable:
+                    distances[neighbor] = distances[cell] + 1
+                    queue.append(neighbor)
+    return distances
+
+
+def _discount(value):
+    """Giá trị nhìn từ trạng thái cha: thắng càng muộn càng kém, thua càng muộn càng tốt."""
+    if value > WIN_VALUE // 2:
+        return value - 1
+    if value < LOSS_VALUE // 2:
+        return value + 1
+    return value
+
+
+class _Search:
+    def __init__(self, level, deadline):
+        self.packed = get_packed_level(level)
+        self.level = level
+        self.distances = exit_distances(level)
+        self.deadline = deadline
+        self.expanded = 0
+        self.cut = False  # vòng hiện tại có lá phải ước lượng
+
+    def estimate(self, code):
+        _, player, mummies = self.packed.decode(code)
+        row, col = self.level.coords[player]
+        nearest = MUMMY_DISTANCE_CAP
+        for cell, _ in mummies:
+            mummy_row, mummy_col = self.level.coords[cell]
+            nearest = min(nearest, abs(mummy_row - row) + abs(mummy_col - col))
+        return nearest - 2 * self.distances[player]
+
+    def value(self, code, depth, table):
+        """Giá trị của trạng thái `code` khi còn `depth` lượt; `table` nhớ {mã: (depth, giá trị)} trong vòng."""
+        known = table.get(code)
+        if known is not None and known[0] >= depth:
+            return known[1]
+        if depth == 0:
+            self.cut = True
+            return self.estimate(code)
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise _Timeout
+        self.expanded += 1
+        best = None
+        for d in range(4):
+            child, outcome = self.packed.successor(code, d)
+            if outcome == rules.BLOCKED:
+                continue
+            if outcome == rules.WIN:
+                best = WIN_VALUE - 1
+                break
+            value = LOSS_VALUE if child is None else _discount(self.value(child, depth - 1, table))
+            if best is None or value > best:
+                best = value
+        if best is None:  # mọi hướng bị chặn: đứng yên không phải là một nước đi
+            best = self.estimate(code)
+        table[code] = (depth, best)
+        return best
+
+    def root(self, code, depth, order):
+        """(nước tốt nhất, giá trị) ở độ sâu `depth`, thử các hướng theo `order`."""
+        self.expanded += 1
+        table = {}
+        best_move, best_value = None, None
+        for d in order:
+            child, outcome = self.packed.successor(code, d)
+            if outcome == rules.BLOCKED:
+                continue
+            if outcome == rules.WIN:
+                return rules.DIRECTIONS[d], WIN_VALUE - 1
+            value = LOSS_VALUE if child is None else _discount(self.value(child, depth - 1, table))
+            if best_value is None or value > best_value:
+                best_move, best_value = rules.DIRECTIONS[d], value
+        return best_move, best_value
+
+
+def search(level, state, budget=DEFAULT_BUDGET, max_depth=None):
+    """SearchResult tốt nhất tìm được cho `state` trong khoảng `budget` giây.
+
+    `budget=None` bỏ giới hạn thời gian (chỉ dừng theo `max_depth`), để đo tốc độ
+    tìm kiếm ở một độ sâu cố định.
+    """
+    start = time.perf_counter()
+    code = get_packed_level(level).pack(state)
+    searcher = _Search(level, None)
+    move, value = searcher.root(code, 1, range(4))
+    depth = 1
+    complete = not searcher.cut
+    searcher.deadline = None if budget is None else start + budget
+    if budget is None and max_depth is None:
+        raise ValueError("Cần budget hoặc max_depth để tìm kiếm dừng được")
+    while move is not None and not complete and abs(value) < WIN_VALUE // 2 and \
+            (max_depth is None or depth < max_depth):
+        first = rules.DIRECTIONS.index(move)
+        order = [first] + [d for d in range(4) if d != first]
+        searcher.cut = False
+        try:
+            move, value = searcher.root(code, depth + 1, order)
+        except _Timeout:
+            break
+        depth += 1
+        complete = not searcher.cut
+    complete = complete or abs(value or 0) >= WIN_VALUE // 2
+    return SearchResult(move, depth, value, searcher.expanded, complete)
+
+
+def main(argv=None):
+    from headless import play
+
+    parser = argparse.ArgumentParser(description="Chơi từng cấp độ bằng tìm kiếm anytime với các ngân sách thời gian.")
+    parser.add_argument("levels_file", nargs="?", default=LEVELS_PATH)
+    parser.add_argument("--levels", help="danh sách số cấp độ, ví dụ 1,4,6")
+    parser.add_argument("--budget-ms", type=float, nargs="+", default=[5, 50])
+    parser.add_argument("--max-turns", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    level_manager = LevelManager(args.levels_file)
+    numbers = ([int(n) for n in args.levels.split(",")] if args.levels
+               else range(1, level_manager.get_level_count() + 1))
+    print(f"{'level':>5} {'budget':>8} {'outcome':>10} {'turns':>5} {'mean ms':>8} {'max ms':>7} "
+          f"{'min depth':>9} {'mean depth':>10}")
+    for number in numbers:
+        level = level_manager.compile_level(number)
+        if level is None:
+            print(f"{number:>5}  không có trong '{args.levels_file}'")
+            continue
+        for budget_ms in args.budget_ms:
+            depths = []
+
+            def decide(state, stats):
+                result = search(state.level, state, budget_ms / 1000)
+                stats["expanded"] = stats.get("expanded", 0) + result.expanded
+                depths.append(result.depth)
+                return result.move
+
+            result = play(level, decide, max_turns=args.max_turns)
+            latencies = result.latencies
+            print(f"{number:>5} {budget_ms:>6g}ms {result.outcome:>10} {len(result.moves):>5} "
+                  f"{sum(latencies) / len(latencies) * 1000:>8.2f} {max(latencies) * 1000:>7.2f} "
+                  f"{min(depths):>9} {sum(depths) / len(depths):>10.1f}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,38 +6,46 @@ class AudioManager:
         self.music_volume = 0.5
         self.sfx_volume = 0.5
 
-        try:
-            self.background_music = pygame.mixer.Sound("sounds/Title.mp3")
-        except pygame.error:
-            print("Background music file not found! Please add 'background_music.mp3' to the 'sounds' folder.")
-            self.background_music = None
-        
+        # Nhạc nền phát qua pygame.mixer.music: giải mã dần từng đoạn khi phát
+        # thay vì giải mã cả bài vào RAM như mixer.Sound; hiệu ứng ngắn vẫn nạp sẵn
+        self.music_loaded = False
+        self.load_music()
+
         try:
             self.button_click = pygame.mixer.Sound("sounds/button_click.wav")
         except pygame.error:
             print("Button click sound file not found! Please add 'button_click.wav' to the 'sounds' folder.")
             self.button_click = None
 
-        if self.background_music:
-            self.background_music.set_volume(self.music_volume) 
         if self.button_click:
             self.button_click.set_volume(self.sfx_volume)
 
+    def load_music(self):
+        """Open the background music stream (only the file header is read here)."""
+        try:
+            pygame.mixer.music.load("sounds/Title.mp3")
+        except pygame.error:
+            print("Background music file not found! Please add 'background_music.mp3' to the 'sounds' folder.")
+            return
+        # mixer.music.load đặt lại âm lượng về tối đa
+        pygame.mixer.music.set_volume(self.music_volume)
+        self.music_loaded = True
+
     def play_background_music(self):
-        """Play the background music on loop."""
-        if self.background_music:
-            self.background_music.play(-1)
+        """Play the background music on loop (no-op if it is already playing)."""
+        if self.music_loaded and not pygame.mixer.music.get_busy():
+            pygame.mixer.music.play(-1)
 
     def stop_background_music(self):
         """Stop the background music."""
-        if self.background_music:
-            self.background_music.stop()
+        if self.music_loaded:
+            pygame.mixer.music.stop()
 
     def set_music_volume(self, volume):
         """Set the music volume (0.0 to 1.0)."""
         self.music_volume = volume / 100
-        if self.background_music:
-            self.background_music.set_volume(self.music_volume)
+        if self.music_loaded:
+            pygame.mixer.music.set_volume(self.music_volume)
 
     def set_sfx_volume(self, volume):
         """Set the sound effects volume (0.0 to 1.0)."""
@@ -0,0 +1,105 @@
+"""Giải hàng loạt cấp độ song song, không cần pygame.
+
+Ví dụ:
+    python batch_solver.py                       # levels.json, bộ giải chính xác
+    python batch_solver.py pack.json -a bfs -j 8  # tệp khác, BFS theo từng lượt, 8 tiến trình
+
+Mỗi cấp độ in ra một dòng JSON: độ dài lời giải, số trạng thái đã mở rộng,
+bộ nhớ đỉnh (tracemalloc) và thời gian chạy.
+"""
+import argparse
+import json
+from multiprocessing import Pool
+import os
+import sys
+import time
+import tracemalloc
+
+import rules
+from headless import DECIDERS, DEFAULT_MAX_TURNS, play
+from level_manager import LEVELS_PATH
+from level_pack import LevelPack, is_pack
+from solver import solve
+
+ALGORITHMS = ["exact"] + sorted(DECIDERS)
+
+
+def solve_level(job):
+    """Chạy trong tiến trình con: giải một cấp độ và trả về bản ghi kết quả."""
+    data, algorithm, max_turns, trace_memory = job
+    level = rules.Level.from_data(data)
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    if algorithm == "exact":
+        solution = solve(level)
+        moves = solution.moves
+        expanded = solution.expanded
+        outcome = rules.WIN if moves is not None else ("unsolvable" if solution.complete else "unknown")
+    else:
+        result = play(level, DECIDERS[algorithm], max_turns=max_turns)
+        moves = result.moves if result.outcome == rules.WIN else None
+        expanded = result.expanded
+        outcome = result.outcome
+
+    wall_time = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "level": data.get("level"),
+        "algorithm": algorithm,
+        "outcome": outcome,
+        "solved": moves is not None,
+        "solution_length": len(moves) if moves is not None else None,
+        "states_expanded": expanded,
+        "peak_memory_bytes": peak_memory,
+        "wall_time_ms": round(wall_time * 1000, 3),
+        "moves": moves,
+    }
+
+
+def load_levels(path):
+    """Dữ liệu mọi cấp độ trong `path`: tệp JSON dạng levels.json hoặc gói nhị phân (level_pack.py)."""
+    if is_pack(path):
+        pack = LevelPack(path)
+        try:
+            return [pack.get(number) for number in pack.numbers()]
+        finally:
+            pack.close()
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file).get("levels", [])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Giải mọi cấp độ trong một tệp level song song.")
+    parser.add_argument("levels_file", nargs="?", default=LEVELS_PATH, help="tệp JSON dạng levels.json hoặc gói .mmpk")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="exact")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS,
+                        help="giới hạn lượt cho các thuật toán chơi từng bước")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="tắt tracemalloc (thời gian đo được sát thực tế hơn)")
+    parser.add_argument("--require-solved", action="store_true",
+                        help="trả mã thoát 1 nếu có cấp độ không giải được")
+    args = parser.parse_args(argv)
+
+    levels = load_levels(args.levels_file)
+    jobs = [(data, args.algorithm, args.max_turns, not args.no_memory) for data in levels]
+    unsolved = 0
+    with Pool(processes=max(1, args.workers)) as pool:
+        for record in pool.imap(solve_level, jobs):
+            unsolved += not record["solved"]
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    if args.require_solved and unsolved:
+        print(f"{unsolved} cấp độ không giải được", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
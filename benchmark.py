@@ -0,0 +1,199 @@
+"""Đo tốc độ các hàm nóng của agent và phần di chuyển trên các cấp độ cố định.
+
+Ví dụ:
+    python benchmark.py                              # mọi cấp độ trong levels.json
+    python benchmark.py -k solve --levels 4,6        # chỉ các phép đo có "solve" trong tên
+    python benchmark.py --save-baseline bench.json   # lưu làm mốc so sánh
+    python benchmark.py --baseline bench.json        # so sánh với mốc, đánh dấu chậm đi
+
+Mỗi phép đo in ra số lần gọi mỗi giây (lấy lần chạy nhanh nhất), bộ nhớ đỉnh
+cấp phát trong một lần gọi và số khối bộ nhớ còn giữ lại sau lần gọi (tracemalloc).
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+import agent
+import anytime
+from headless import make_player
+import rules
+from level_manager import LEVELS_PATH
+from solver import solve
+
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # chậm hơn mốc quá 10% thì coi là thụt lùi
+# Tìm kiếm anytime được đo ở độ sâu cố định, không giới hạn thời gian, để số đo phản ánh tốc độ
+# chứ không phải ngân sách agent.SEARCH_BUDGET
+ANYTIME_DEPTH = 4
+
+
+def _neighbor_pairs(level):
+    """Mọi cặp (ô, ô kề) trong lưới, kể cả ô kề nằm ngoài biên."""
+    pairs = []
+    for row, col in level.coords:
+        for dr, dc in rules.DELTAS.values():
+            pairs.append((row, col, row + dr, col + dc))
+    return pairs
+
+
+def _nearest_stair(level, start):
+    return min(level.stairs, key=lambda s: abs(s[0] - start[0]) + abs(s[1] - start[1]))
+
+
+def build_cases(level, player):
+    """[(tên, hàm không đối số, số lần gọi hàm gốc trong mỗi lần chạy hàm đó)]."""
+    state = level.initial_state()
+    game_state = agent.GameState(state)
+    gate = {"isClosed": state.gate_closed}
+    start = state.player
+    goal = _nearest_stair(level, start)
+    pairs = _neighbor_pairs(level)
+    mummy_row, mummy_col = state.mummies[0][:2] if state.mummies else (-1, -1)
+
+    def eligible_move():
+        for row, col, new_row, new_col in pairs:
+            player.eligible_move(level, gate, new_row, new_col, is_player=True, origin=(row, col))
+
+    def is_valid_move():
+        for row, col, new_row, new_col in pairs:
+            agent.is_valid_move(None, game_state, row, col, new_row, new_col)
+
+    def predict_mummy_moves_auto():
+        for mummy in game_state.mummies:
+            agent.predict_mummy_moves_auto(None, game_state, mummy, start[0], start[1])
+
+    return [
+        ("eligible_move", eligible_move, len(pairs)),
+        ("is_valid_move", is_valid_move, len(pairs)),
+        ("predict_mummy_moves_auto", predict_mummy_moves_auto, max(1, len(game_state.mummies))),
+        ("calculate_safety_score", lambda: agent.calculate_safety_score(game_state), 1),
+        ("GameState", lambda: agent.GameState(state), 1),
+        ("solve_capped", lambda: solve(level, state, max_depth=agent.SEARCH_MAX_DEPTH,
+                                       max_expanded=agent.SEARCH_MAX_EXPANDED), 1),
+        (f"anytime_search_depth{ANYTIME_DEPTH}",
+         lambda: anytime.search(level, state, budget=None, max_depth=ANYTIME_DEPTH), 1),
+        ("a_star_search", lambda: player.a_star_search(level, start, goal, gate), 1),
+        ("min_conflict_search", lambda: player.min_conflict_search(level, start, goal, gate), 1),
+        ("local_beam_search",
+         lambda: player.local_beam_search(level, start, goal, gate, mummy_row, mummy_col), 1),
+    ]
+
+
+def time_case(func, calls_per_run, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+    """Số lần gọi mỗi giây: tự tăng số vòng tới khi một lần đo kéo dài >= min_time / repeat."""
+    func()  # khởi động bộ nhớ đệm (bảng biên dịch, mã trạng thái đóng gói...)
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / repeat / elapsed) + 1)
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return loops * calls_per_run / best
+
+
+def measure_allocations(func, calls_per_run):
+    """(byte đỉnh mỗi lần gọi, số khối còn sống sau mỗi lần gọi, kể cả giá trị trả về) theo tracemalloc."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return (peak - base) / calls_per_run, retained / calls_per_run
+
+
+def run(levels, player, pattern=None, min_time=DEFAULT_MIN_TIME, repeat=DEFAULT_REPEAT):
+    results = {}
+    for number, level in levels:
+        for name, func, calls in build_cases(level, player):
+            key = f"{name}[level {number}]"
+            if pattern and pattern not in key:
+                continue
+            ops = time_case(func, calls, min_time, repeat)
+            peak, retained = measure_allocations(func, calls)
+            results[key] = {"ops_per_sec": ops, "alloc_peak_bytes": peak, "alloc_blocks": retained}
+            yield key, results[key]
+
+
+def compare(result, baseline, threshold=DEFAULT_THRESHOLD):
+    """(tỉ lệ tốc độ so với mốc, có thụt lùi không); (None, False) nếu mốc không có phép đo này."""
+    if not baseline:
+        return None, False
+    ratio = result["ops_per_sec"] / baseline["ops_per_sec"]
+    return ratio, ratio < 1 - threshold
+
+
+def load_levels(path, numbers=None):
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    levels = []
+    for item in data.get("levels", []):
+        if numbers is None or item.get("level") in numbers:
+            levels.append((item.get("level"), rules.Level.from_data(item)))
+    return levels
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo tốc độ các hàm nóng của agent và Player.")
+    parser.add_argument("levels_file", nargs="?", default=LEVELS_PATH)
+    parser.add_argument("--levels", help="danh sách số cấp độ, ví dụ 1,4,6")
+    parser.add_argument("-k", dest="pattern", help="chỉ chạy phép đo có chuỗi này trong tên")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="tổng thời gian đo tối thiểu cho mỗi phép đo (giây)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--baseline", help="tệp JSON mốc để so sánh")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="tỉ lệ chậm đi tối đa so với mốc trước khi báo thụt lùi")
+    parser.add_argument("--save-baseline", help="ghi kết quả lần chạy này ra tệp JSON")
+    args = parser.parse_args(argv)
+
+    numbers = {int(n) for n in args.levels.split(",")} if args.levels else None
+    levels = load_levels(args.levels_file, numbers)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file).get("results", {})
+
+    player = make_player()
+    print(f"{'benchmark':<40} {'ops/sec':>14} {'peak B':>10} {'blocks':>8} {'vs baseline':>12}")
+    results = {}
+    regressions = []
+    for key, result in run(levels, player, args.pattern, args.min_time, args.repeat):
+        results[key] = result
+        ratio, regressed = compare(result, baseline.get(key), args.threshold)
+        note = "" if ratio is None else f"{ratio:>11.2f}x" + (" !" if regressed else "")
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<40} {result['ops_per_sec']:>14,.0f} {result['alloc_peak_bytes']:>10,.0f} "
+              f"{result['alloc_blocks']:>8.1f} {note:>12}", flush=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump({"python": sys.version.split()[0], "results": results}, file, indent=2)
+        print(f"Đã lưu mốc vào '{args.save_baseline}'")
+    if regressions:
+        print(f"Chậm hơn mốc quá {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""So sánh thời gian blit ảnh gốc (định dạng tệp) với ảnh đã đổi sang định dạng màn hình.
+
+Ví dụ:
+    python blit_benchmark.py                # mọi ảnh của IMAGES
+    python blit_benchmark.py -k mummy       # chỉ các ảnh có "mummy" trong tên
+
+Ảnh được nạp trước khi có cửa sổ (images.load_images()), sau đó mở màn hình
+(SDL_VIDEODRIVER=dummy nếu chưa đặt) và gọi images.convert_images(); mỗi ảnh
+được blit lên màn hình ở cả hai dạng, dòng "all" là blit lần lượt mọi ảnh.
+"""
+import argparse
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+import pygame
+
+from benchmark import DEFAULT_MIN_TIME, DEFAULT_REPEAT, time_case
+from constants import HEIGHT, WIDTH
+
+
+def collect_surfaces(images):
+    """{tên: Surface}: ảnh đơn trong IMAGES và khung hình đầu của mỗi sprite sheet."""
+    surfaces = {}
+    for name, value in images.items():
+        if isinstance(value, pygame.Surface):
+            surfaces[name] = value
+        elif isinstance(value, dict):
+            for key, frames in value.items():
+                if frames:
+                    surfaces[f"{name}/{key}"] = frames[0]
+    return surfaces
+
+
+def blit_all(screen, surfaces):
+    def run():
+        for surface in surfaces:
+            screen.blit(surface, (0, 0))
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Đo thời gian blit trước và sau khi đổi định dạng ảnh.")
+    parser.add_argument("-k", dest="pattern", help="chỉ đo ảnh có chuỗi này trong tên")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    from images import convert_images, load_images
+
+    images = load_images()
+    raw = {name: surface for name, surface in collect_surfaces(images).items()
+           if not args.pattern or args.pattern in name}
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    if not convert_images(images):
+        print("Không đổi được ảnh sang định dạng màn hình", file=sys.stderr)
+        return 1
+    converted = collect_surfaces(images)
+
+    print(f"{'image':<20} {'size':>9} {'raw blit/s':>12} {'converted blit/s':>17} {'speedup':>8}")
+    cases = [(name, [surface], [converted[name]]) for name, surface in raw.items()]
+    cases.append(("all", list(raw.values()), [converted[name] for name in raw]))
+    for name, before, after in cases:
+        raw_ops = time_case(blit_all(screen, before), 1, args.min_time, args.repeat)
+        converted_ops = time_case(blit_all(screen, after), 1, args.min_time, args.repeat)
+        size = "x".join(map(str, before[0].get_size())) if len(before) == 1 else "-"
+        print(f"{name:<20} {size:>9} {raw_ops:>12,.0f} {converted_ops:>17,.0f} "
+              f"{converted_ops / raw_ops:>7.1f}x", flush=True)
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
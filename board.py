@@ -0,0 +1,45 @@
+"""Ánh xạ giữa ô (row, col) của mê cung và tọa độ pixel trên màn hình.
+
+Mọi chỗ cần đổi ô <-> pixel (sprite, vẽ sàn, đặt tường/cầu thang) đều đi qua
+một Board, nên kích thước mê cung chỉ còn đến từ dữ liệu cấp độ. Mê cung 6x6
+giữ đúng bố cục cũ (ô 60px, góc trên trái ở (215, 80)); mê cung lớn hơn được
+thu nhỏ ô cho vừa vùng sàn và căn giữa trong vùng đó.
+"""
+from constants import BOARD_X, BOARD_Y, CELL_SIZE, HEIGHT_FLOOR, WIDTH_FLOOR
+
+
+class Board:
+    def __init__(self, rows=6, cols=6):
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = max(1, min(CELL_SIZE, WIDTH_FLOOR // max(cols, 1), HEIGHT_FLOOR // max(rows, 1)))
+        self.width = cols * self.cell_size
+        self.height = rows * self.cell_size
+        self.x = BOARD_X + (WIDTH_FLOOR - self.width) // 2
+        self.y = BOARD_Y + (HEIGHT_FLOOR - self.height) // 2
+
+    @classmethod
+    def for_level(cls, level):
+        """Board cho một rules.Level."""
+        return cls(level.rows, level.cols)
+
+    @property
+    def topleft(self):
+        return self.x, self.y
+
+    def to_pixel(self, row, col):
+        """Góc trên trái (x, y) của ô (row, col); dùng được cả cho ô ngay ngoài biên (cầu thang)."""
+        return self.x + col * self.cell_size, self.y + row * self.cell_size
+
+    def to_cell(self, x, y):
+        return (y - self.y) // self.cell_size, (x - self.x) // self.cell_size
+
+    def is_stair_cell(self, row, col):
+        """Cầu thang phải nằm trong mê cung hoặc sát ngay bên ngoài một cạnh (không ở góc chéo)."""
+        inside_rows = 0 <= row < self.rows
+        inside_cols = 0 <= col < self.cols
+        return ((inside_rows and -1 <= col <= self.cols) or
+                (inside_cols and -1 <= row <= self.rows))
+
+
+DEFAULT_BOARD = Board()
@@ -2,6 +2,16 @@
 WIDTH = 640
 HEIGHT = 480
 
-#Kích thước mỗi ô trong bản đồ trò chơi (ma trận 6x6 ô)
+#Kích thước tối đa mỗi ô trong bản đồ trò chơi (mê cung 6x6 dùng đúng kích thước này)
 CELL_SIZE = 60
-WIDTH_FLOOR, HEIGHT_FLOOR = 6 * CELL_SIZE, 6 * CELL_SIZE
\ No newline at end of file
+#Vùng sàn dành cho mê cung; mê cung lớn hơn 6x6 được thu nhỏ ô cho vừa (xem board.py)
+BOARD_X, BOARD_Y = 215, 80
+WIDTH_FLOOR, HEIGHT_FLOOR = 6 * CELL_SIZE, 6 * CELL_SIZE
+
+#Logic chạy theo bước thời gian cố định FIXED_DT giây, tách khỏi tốc độ vẽ
+FPS = 50
+FIXED_DT = 1 / FPS
+MAX_FRAME_TIME = 0.25  #thời gian tối đa được dồn lại trong một khung hình (tránh chạy bù quá nhiều)
+#Thời gian hoạt ảnh của một bước đi (một ô); 0 là chế độ turbo: lượt được giải quyết ngay, chỉ vẽ vị trí cuối
+STEP_SECONDS = 0.6
+TURBO_FRAME_BUDGET = 0.015  #thời gian tự chơi tối đa trong một khung hình ở chế độ turbo
@@ -0,0 +1,64 @@
+"""Chế độ vẽ theo vùng thay đổi (dirty rectangles) cho vòng lặp chính.
+
+Thay vì pygame.display.flip() mỗi khung hình, chỉ đẩy lên màn hình những vùng
+thật sự đổi: vị trí cũ và mới của các sprite đang di chuyển/đổi khung hình.
+Khi cả cảnh đổi (sang màn hình khác, tải cấp độ, mở menu tùy chọn, mở danh sách
+thuật toán, kéo thanh trượt, nhấn phím...) thì cập nhật toàn màn hình một lần.
+"""
+import pygame
+
+# Sự kiện có thể làm đổi giao diện ở bất kỳ đâu trên màn hình
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP)
+
+
+def is_visual_event(event):
+    """Sự kiện nhập có thể làm đổi giao diện (di chuột chỉ tính khi đang giữ nút, ví dụ kéo thanh trượt)."""
+    if event.type in INPUT_EVENTS:
+        return True
+    return event.type == pygame.MOUSEMOTION and any(event.buttons)
+
+
+class DirtyRectTracker:
+    def __init__(self):
+        self.rects = []
+        self.full = True  # Khung hình đầu tiên luôn cập nhật toàn màn hình
+        self.signature = None
+        self.sprites = {}  # sprite -> (rect, image) ở khung hình đã đẩy lên trước đó
+        self.pushed_area = 0  # Tổng số pixel đã đẩy lên màn hình, để đo hiệu quả
+
+    def invalidate(self):
+        self.full = True
+
+    def check_scene(self, signature):
+        """Cập nhật toàn màn hình khi trạng thái cảnh (`signature` so sánh được) thay đổi."""
+        if signature != self.signature:
+            self.signature = signature
+            self.full = True
+
+    def track_sprites(self, sprites):
+        """Ghi nhận vùng của các sprite đã đổi vị trí/khung hình, được thêm hoặc bị bỏ đi."""
+        current = {}
+        for sprite in sprites:
+            rect = sprite.rect.copy()
+            current[sprite] = (rect, sprite.image)
+            previous = self.sprites.get(sprite)
+            if previous is None:
+                self.rects.append(rect)
+            elif previous[0] != rect or previous[1] is not sprite.image:
+                self.rects.append(previous[0].union(rect))
+        for sprite, (rect, _) in self.sprites.items():
+            if sprite not in current:
+                self.rects.append(rect)
+        self.sprites = current
+
+    def present(self):
+        """Đẩy khung hình lên màn hình: toàn bộ nếu cảnh đổi, chỉ các vùng bẩn nếu không."""
+        surface = pygame.display.get_surface()
+        if self.full:
+            pygame.display.flip()
+            self.pushed_area += surface.get_width() * surface.get_height()
+        elif self.rects:
+            pygame.display.update(self.rects)
+            self.pushed_area += sum(rect.width * rect.height for rect in self.rects)
+        self.full = False
+        self.rects = []
@@ -1,25 +1,30 @@
+import random
+import time
 import pygame
 from constants import *
 from sprites import Wall, Stair, Player, Mummy, Trap
 from button_function import undo_move, reset_maze, show_options, show_world_map, quit_to_main, OptionsMenu
-from audio_manager import AudioManager
-from images import IMAGES
-from level_manager import LevelManager
+from images import IMAGES, get_image
 from agent import auto_play_step
 from algorithm_ui import AlgorithmUI
+import rules
+from board import Board
+from state_packing import get_packed_level
+from undo_history import UndoHistory
+from planner import Planner
 
 class Game:
-    def __init__(self, game_screen, audio_manager, level_manager, map_instance):
+    def __init__(self, game_screen, audio_manager, level_manager, map_instance, recorder=None):
         self.game_screen = game_screen
         self.level_manager = level_manager
         self.map_instance = map_instance
         self.game_state = "play"
         self.auto_play_started = False
         self.backdrop = IMAGES["backdrop"]
-        self.floor = IMAGES["floor"]
+        self.floor_image = IMAGES["floor"]
+        self.floor = self.floor_image
         self.title_img = IMAGES["mumlogo"]
-        self.snake_img = pygame.image.load("images/snake.png")
-        self.snake_img = pygame.transform.scale(self.snake_img, (130, 80))
+        self.snake_img = get_image("snake.png", (130, 80))
         self.game_over_img = IMAGES["game_over"]
         self.game_over_rect = self.game_over_img.get_rect(center=(WIDTH // 2, HEIGHT // 2))
         self.all_levels_completed = False  
@@ -27,9 +32,15 @@ class Game:
         self.stairs = pygame.sprite.Group()
         self.characters = pygame.sprite.Group()
         self.traps = pygame.sprite.Group()
+        # Lớp tĩnh (nền, sàn, logo, tường, bẫy) của cấp độ hiện tại, vẽ sẵn một lần
+        self.static_layer = None
+        self.static_level = None
 
         self.game_over = False
-        self.move_history = []
+        # Mã trạng thái đóng gói của các lượt trước, mã cũ tràn ra tệp tạm khi ván rất dài
+        self.move_history = UndoHistory(spill=True)
+        self.packed = None
+        self.mummy_sprites = []  # mọi sprite xác ướp của cấp độ, kể cả con đã bị nhập, để hoàn tác
 
         self.maze = None
         self.stairs_positions = None
@@ -38,10 +49,19 @@ class Game:
         self.traps_data = []
         self.player = None
         self.mummies = []
+        self.merged_mummies = []
         self.gate = {"isClosed": False}
+        self.level = None
+        self.board = Board()
+        self.state = None
+        self.outcome = rules.MOVED
+        self.recorder = recorder  # replay.ReplayRecorder ghi lại từng lần chơi, None nếu không ghi
+        self.step_seconds = STEP_SECONDS  # thời gian hoạt ảnh một ô, 0 là turbo
+        self.time_accumulator = 0.0  # thời gian thực chưa được chạy thành nhịp logic FIXED_DT
+        self.planner = Planner()  # tìm nước tự chơi trên luồng nền
+        self.plan_seed = 0  # rút từ random sau random.seed() của lần chơi; cùng mã trạng thái tạo seed cho mỗi kế hoạch
 
         self.audio_manager = audio_manager
-        self.audio_manager.play_background_music()
         self.options_menu = OptionsMenu(self.audio_manager)
         self.algorithm_ui = AlgorithmUI(game_screen)
 
@@ -61,15 +81,25 @@ class Game:
 
         self.load_level()
 
+    def close(self):
+        """Dừng luồng lập kế hoạch và đóng tệp tràn của lịch sử hoàn tác; gọi một lần khi thoát."""
+        self.planner.shutdown()
+        self.move_history.close()
+
     def load_level(self):
+        self.planner.cancel()
         self.walls.empty()
         self.stairs.empty()
         self.characters.empty()
         self.traps.empty()
         self.mummies = []
-        self.move_history.clear()
+        self.merged_mummies = []
+        self.move_history.close()  # bỏ lịch sử của lần chơi trước và trả lại tệp tràn của nó
         self.game_over = False
+        self.outcome = rules.MOVED
 
+        # Một lần refresh cho cả lần tải: số cấp độ, dữ liệu và bản biên dịch đều từ cùng một lần đọc file
+        self.level_manager.refresh()
         maze, stairs_positions, player_start, mummies_data, traps_data = self.level_manager.get_current_level_data()
         
         self.maze = maze
@@ -89,91 +119,176 @@ class Game:
         print("Mummies:", mummies_data)
         print("Traps:", traps_data)
 
-        player_x = 215 + player_start["col"] * CELL_SIZE
-        player_y = 80 + player_start["row"] * CELL_SIZE
-        self.player = Player(player_x, player_y)
-        self.characters.add(self.player)
+        self.level = self.level_manager.get_current_compiled_level()
+        self.board = Board.for_level(self.level)
+        if self.board.width == self.floor_image.get_width() and self.board.height == self.floor_image.get_height():
+            self.floor = self.floor_image
+        else:
+            self.floor = pygame.transform.scale(self.floor_image, (self.board.width, self.board.height))
+        self.packed = get_packed_level(self.level)
+        self.state = self.level.initial_state()
+        self.gate = {"isClosed": self.state.gate_closed}
+        if self.recorder is not None:
+            self.recorder.start_attempt(self.level_manager.current_level + 1, self.level)
+        self.plan_seed = random.getrandbits(32)
 
         for mummy_data in mummies_data:
-            mummy_x = 215 + mummy_data["col"] * CELL_SIZE
-            mummy_y = 80 + mummy_data["row"] * CELL_SIZE
-            color = mummy_data["color"].lower()
-            if color not in ["white", "red"]:
-                print(f"Warning: Invalid mummy color '{color}' in level {self.level_manager.current_level + 1}. Using 'white'.")
-                color = "white"
-            mummy = Mummy(mummy_x, mummy_y, color=color)
+            if mummy_data["color"].lower() not in rules.MUMMY_PRIORITY:
+                print(f"Warning: Invalid mummy color '{mummy_data['color']}' in level {self.level_manager.current_level + 1}. Using 'white'.")
+
+        self.create_characters()
+
+        for trap_row, trap_col in self.level.traps:
+            self.traps.add(Trap(*self.board.to_pixel(trap_row, trap_col), board=self.board))
+
+        self.create_objects()
+        if self.static_level is not self.level:
+            self.static_layer = self.build_static_layer()
+            self.static_level = self.level
+
+    def build_static_layer(self):
+        """Vẽ những thứ không đổi trong một cấp độ lên một Surface duy nhất.
+
+        Cầu thang vẫn vẽ riêng sau nhân vật để giữ thứ tự lớp như cũ (người
+        chơi đi vào ô cầu thang thì bị cầu thang che).
+        """
+        layer = pygame.Surface(self.game_screen.get_size())
+        layer.blit(self.backdrop, (0, 0))
+        layer.blit(self.floor, self.board.topleft)
+        layer.blit(self.title_img, (10, 10))
+        layer.blit(self.snake_img, (10, 60))
+        self.walls.draw(layer)
+        self.traps.draw(layer)
+        return layer
+
+    def create_characters(self):
+        """Tạo sprite người chơi và xác ướp theo trạng thái logic hiện tại."""
+        self.characters.empty()
+        self.mummies = []
+        player_row, player_col = self.state.player
+        self.player = Player(*self.board.to_pixel(player_row, player_col), board=self.board)
+        self.characters.add(self.player)
+        for mummy_row, mummy_col, color in self.state.mummies:
+            mummy = Mummy(*self.board.to_pixel(mummy_row, mummy_col), color=color, board=self.board)
             self.mummies.append(mummy)
             self.characters.add(mummy)
-            
-        for trap_data in traps_data:
-            trap_x = 215 + trap_data["col"] * CELL_SIZE
-            trap_y = 80 + trap_data["row"] * CELL_SIZE
-            self.traps.add(Trap(trap_x, trap_y))
+        self.mummy_sprites = list(self.mummies)
 
-        self.create_objects()
+    def place_characters(self):
+        """Đặt lại các sprite đã có theo self.state (dùng khi hoàn tác), không tạo sprite mới.
+
+        Xác ướp đã bị nhập được lấy lại từ self.mummy_sprites theo màu.
+        """
+        self.player.place(*self.state.player)
+        unused = list(self.mummy_sprites)
+        self.mummies = []
+        for mummy_row, mummy_col, color in self.state.mummies:
+            mummy = next((m for m in unused if m.color == color), None)
+            if mummy is None:
+                mummy = Mummy(*self.board.to_pixel(mummy_row, mummy_col), color=color, board=self.board)
+                self.mummy_sprites.append(mummy)
+            else:
+                unused.remove(mummy)
+            mummy.place(mummy_row, mummy_col)
+            self.mummies.append(mummy)
+            self.characters.add(mummy)
+        for mummy in unused:
+            self.characters.remove(mummy)
 
     def create_objects(self):
+        board = self.board
         for row in range(len(self.maze)):
             for col in range(len(self.maze[row])):
                 cell = self.maze[row][col]
-                x = 215 + col * CELL_SIZE
-                y = 80 + row * CELL_SIZE
                 if "walls" in cell:
                     for wall_type in cell["walls"]:
                         if wall_type == "top":
-                            self.walls.add(Wall(x, y, "W_h"))
+                            self.walls.add(Wall(*board.to_pixel(row, col), "W_h", board))
                         elif wall_type == "bottom":
-                            self.walls.add(Wall(x, y + CELL_SIZE, "W_h"))
+                            self.walls.add(Wall(*board.to_pixel(row + 1, col), "W_h", board))
                         elif wall_type == "left":
-                            self.walls.add(Wall(x, y, "W_v"))
+                            self.walls.add(Wall(*board.to_pixel(row, col), "W_v", board))
                         elif wall_type == "right":
-                            self.walls.add(Wall(x + CELL_SIZE, y, "W_v"))
+                            self.walls.add(Wall(*board.to_pixel(row, col + 1), "W_v", board))
 
         for stair in self.stairs_positions:
             row = stair["row"]
             col = stair["col"]
-            x = 215 + col * CELL_SIZE
-            y = 80 + row * CELL_SIZE
-            if 0 <= row < 7 and 0 <= col < 7:
-                self.stairs.add(Stair(x, y, stair["type"]))
+            if board.is_stair_cell(row, col):
+                self.stairs.add(Stair(*board.to_pixel(row, col), stair["type"], board))
             else:
                 print(f"Vị trí cầu thang không hợp lệ: row={row}, col={col}")
 
+    @property
+    def turbo(self):
+        return self.step_seconds <= 0
+
+    def characters_moving(self):
+        return any(c.moving or c.move_queue for c in [self.player] + self.mummies + self.merged_mummies)
+
+    def play_turn(self, direction):
+        """Giải quyết một lượt bằng rules.step_detail rồi xếp hàng hoạt ảnh cho các sprite."""
+        turn = rules.step_detail(self.state, direction)
+        self.player.direction = direction
+        if turn.outcome == rules.BLOCKED:
+            return False
+
+        self.move_history.push(self.packed.pack(self.state))
+        player_row, player_col = turn.state.player
+        self.player.add_to_move_queue(direction, player_row, player_col)
+        for mummy, steps in zip(self.mummies, turn.mummy_steps):
+            for step_direction, row, col in steps:
+                mummy.add_to_move_queue(step_direction, row, col)
+
+        self.merged_mummies += [m for i, m in enumerate(self.mummies) if i not in turn.survivors]
+        self.mummies = [self.mummies[i] for i in turn.survivors]
+        self.state = turn.state
+        self.outcome = turn.outcome
+        if self.turbo:
+            # Bỏ hoạt ảnh: các sprite nhảy ngay tới ô cuối của lượt
+            for character in [self.player] + self.mummies + self.merged_mummies:
+                character.update(0, 0)
+        if self.recorder is not None:
+            algorithm = self.player.current_algorithm if self.game_state == "auto_play" else "manual"
+            self.recorder.record_move(direction, turn.outcome, algorithm)
+        return True
+
     def check_collisions(self):
-        if pygame.sprite.spritecollide(self.player, self.traps, False):
+        mode = "play" if self.game_state == "play" else "auto_play"
+
+        if self.outcome == rules.WIN:
+            if self.game_state == "replay":
+                # Replay dừng ở cấp độ đã ghi, không chuyển sang cấp tiếp theo
+                return "replay"
+            print(f"Hoàn thành cấp độ {self.level_manager.current_level + 1}!")
+            if self.level_manager.next_level():
+                print(f"Tải cấp độ {self.level_manager.current_level + 1}")
+                self.load_level()
+                return mode
+            print("Đã hoàn thành tất cả cấp độ! Quay lại menu.")
+            self.all_levels_completed = True
+            return "menu"
+
+        # Chờ hoạt ảnh kết thúc rồi mới hiển thị va chạm
+        if self.characters_moving():
+            return mode
+
+        if self.merged_mummies:
+            print("Hai xác ướp va chạm! Một xác ướp bị tiêu diệt.")
+            for mummy in self.merged_mummies:
+                self.characters.remove(mummy)
+            self.merged_mummies = []
+
+        if self.outcome == rules.TRAPPED:
             print("Người chơi rơi vào bẫy! Trò chơi kết thúc!")
             self.game_over = True
             print(f"Game Over state set to: {self.game_over}")
-            return "play" if self.game_state == "play" else "auto_play"
-
-        for stair in self.stairs_positions:
-            if self.player.row == stair["row"] and self.player.col == stair["col"]:
-                print(f"Hoàn thành cấp độ {self.level_manager.current_level + 1}!")
-                if self.level_manager.next_level():
-                    print(f"Tải cấp độ {self.level_manager.current_level + 1}")
-                    self.load_level()
-                    return "play" if self.game_state == "play" else "auto_play"
-                else:
-                    print("Đã hoàn thành tất cả cấp độ! Quay lại menu.")
-                    self.all_levels_completed = True
-                    return "menu"
-
-        for i, mummy1 in enumerate(self.mummies):
-            for j, mummy2 in enumerate(self.mummies):
-                if i != j and pygame.sprite.collide_rect(mummy1, mummy2):
-                    print("Hai xác ướp va chạm! Một xác ướp bị tiêu diệt.")
-                    self.mummies.remove(mummy2)
-                    self.characters.remove(mummy2)
-                    break
-
-        for character in self.characters:
-            if character != self.player and pygame.sprite.collide_rect(self.player, character):
-                print("Người chơi va chạm với kẻ địch! Trò chơi kết thúc!")
-                self.game_over = True
-                print(f"Game Over state set to: {self.game_over}")
-                return "play" if self.game_state == "play" else "auto_play"
+        elif self.outcome == rules.CAUGHT:
+            print("Người chơi va chạm với kẻ địch! Trò chơi kết thúc!")
+            self.game_over = True
+            print(f"Game Over state set to: {self.game_over}")
 
-        return "play" if self.game_state == "play" else "auto_play"
+        return mode
 
     def try_again(self):
         print("Trying again... Reloading level.")
@@ -183,38 +298,13 @@ class Game:
 
     def undo_last_move(self):
         if self.move_history:
-            last_state = self.move_history.pop()
-            player_pos = last_state["player_pos"]
-            mummies_data = last_state["mummies"]
-            traps_data = last_state["traps"]
-
-            self.player.row, self.player.col = player_pos
-            self.player.rect.topleft = (215 + self.player.col * CELL_SIZE, 80 + self.player.row * CELL_SIZE)
-            self.player.current_pos = [float(self.player.rect.x), float(self.player.rect.y)]
-            self.player.target_pos = (self.player.rect.x, self.player.rect.y)
-            self.player.moving = False
-            self.player.move_queue.clear()
-
-            self.mummies.clear()
-            self.characters.empty()
-            self.traps.empty()
-            self.characters.add(self.player)
-
-            for mummy_data in mummies_data:
-                mummy_x = 215 + mummy_data["col"] * CELL_SIZE
-                mummy_y = 80 + mummy_data["row"] * CELL_SIZE
-                mummy = Mummy(mummy_x, mummy_y, color=mummy_data["color"])
-                mummy.row, mummy.col = mummy_data["row"], mummy_data["col"]
-                mummy.direction = mummy_data["direction"]
-                mummy.moving = False
-                mummy.move_queue.clear()
-                self.mummies.append(mummy)
-                self.characters.add(mummy)
-
-            for trap_data in traps_data:
-                trap_x = 215 + trap_data["col"] * CELL_SIZE
-                trap_y = 80 + trap_data["row"] * CELL_SIZE
-                self.traps.add(Trap(trap_x, trap_y))
+            self.planner.cancel()
+            self.state = self.packed.unpack(self.move_history.pop())
+            self.outcome = rules.MOVED
+            if self.recorder is not None:
+                self.recorder.record_undo()
+            self.merged_mummies = []
+            self.place_characters()
 
             self.game_over = False
             print("Undo Move: Restored previous state.")
@@ -231,25 +321,56 @@ class Game:
         self.audio_manager.play_button_click()
         return "map"
 
-    def update(self):
+    def update(self, dt=FIXED_DT):
+        """Một nhịp logic dài `dt` giây: quyết định của chế độ tự chơi, hoạt ảnh rồi va chạm."""
+        if self.game_state == "auto_play" and self.auto_play_started:
+            self.run_auto_play()
+
         if self.player:
-            self.player.update()
+            self.player.update(dt, self.step_seconds)
     
-        for mummy in self.mummies:
-            mummy.update()
+        for mummy in self.mummies + self.merged_mummies:
+            mummy.update(dt, self.step_seconds)
 
         if self.player and not self.player.moving and not self.game_over and not self.all_levels_completed:
             # Pass game_state khi gọi check_collisions
             return self.check_collisions()
 
-    def draw_game(self):
-        self.game_screen.blit(self.backdrop, (0, 0))
-        self.game_screen.blit(self.floor, (215, 80))
-        self.game_screen.blit(self.title_img, (10, 10))
-        self.game_screen.blit(self.snake_img, (10, 60))
+    def run_auto_play(self):
+        """Tự chơi theo nhịp logic thay vì theo sự kiện nhập.
 
-        self.walls.draw(self.game_screen)
-        self.traps.draw(self.game_screen)
+        Bình thường auto_play_step chỉ đi khi hoạt ảnh lượt trước đã xong; ở chế
+        độ turbo các lượt không có hoạt ảnh nên tự chơi liên tục tới hết
+        TURBO_FRAME_BUDGET của khung hình, kể cả qua các cấp độ tiếp theo.
+        """
+        if not self.turbo:
+            if not self.game_over and not self.all_levels_completed:
+                auto_play_step(self)
+            return
+        deadline = time.perf_counter() + TURBO_FRAME_BUDGET
+        while not self.game_over and not self.all_levels_completed:
+            # Chờ luồng lập kế hoạch trong phần còn lại của ngân sách thay vì hỏi liên tục
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            auto_play_step(self, wait=remaining)
+            if self.planner.busy:
+                break
+
+    def advance(self, elapsed):
+        """Chạy logic cho `elapsed` giây thời gian thực bằng các nhịp cố định FIXED_DT."""
+        self.time_accumulator = min(self.time_accumulator + elapsed, MAX_FRAME_TIME)
+        result = None
+        while self.time_accumulator >= FIXED_DT:
+            self.time_accumulator -= FIXED_DT
+            result = self.update(FIXED_DT)
+        return result
+
+    def draw_game(self, elapsed=FIXED_DT):
+        if self.static_layer is not None:
+            self.game_screen.blit(self.static_layer, (0, 0))
+        else:
+            self.game_screen.blit(self.backdrop, (0, 0))
         self.characters.draw(self.game_screen)
         self.stairs.draw(self.game_screen)
         self.options_menu.draw(self.game_screen)
@@ -257,7 +378,7 @@ class Game:
         if self.game_state == "auto_play":
             self.algorithm_ui.draw()
 
-        self.update()
+        self.advance(elapsed)
 
         if self.game_over:
             self.game_screen.blit(self.game_over_img, self.game_over_rect)
@@ -305,6 +426,7 @@ class Game:
                 # Xử lý chọn thuật toán
                 selected = self.algorithm_ui.handle_click(event.pos)
                 if selected and self.player:
+                    self.planner.cancel()
                     self.player.set_algorithm(selected)
                     self.auto_play_started = True
                     return "auto_play"
@@ -330,8 +452,9 @@ class Game:
                 if self.options_menu.handle_event(event):
                     return "auto_play"
             
-            if self.auto_play_started:
-                return auto_play_step(self)
+            # Các nước tự chơi được đi trong update(), theo nhịp logic
+            if self.all_levels_completed:
+                return "menu"
             return "auto_play"
 
         if event.type == pygame.KEYDOWN:
@@ -339,17 +462,9 @@ class Game:
                 return "menu"
             elif event.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
                 # Kiểm tra xem có nhân vật nào đang di chuyển hoặc có hàng đợi di chuyển
-                if self.player.moving or any(mummy.moving or mummy.move_queue for mummy in self.mummies):
+                if self.characters_moving():
                     print("Đợi tất cả nhân vật hoàn thành di chuyển!")
                     return "play"
-                
-                mummies_data = [{"row": m.row, "col": m.col, "color": m.color, "direction": m.direction} for m in self.mummies]
-                traps_data = [{"row": (t.rect.y - 80) // CELL_SIZE, "col": (t.rect.x - 215) // CELL_SIZE} for t in self.traps]
-                self.move_history.append({
-                    "player_pos": (self.player.row, self.player.col),
-                    "mummies": mummies_data,
-                    "traps": traps_data
-                })
 
                 direction = {
                     pygame.K_UP: "up",
@@ -359,9 +474,7 @@ class Game:
                 }[event.key]
 
                 print(f"Pressed {direction.upper()}")
-                if self.player.move(direction, self.maze, self.gate, self.stairs_positions):
-                    for mummy in self.mummies:
-                        mummy.auto_move(self.maze, self.gate, self.player.row, self.player.col)
+                if self.play_turn(direction):
                     return self.check_collisions()
                 else:
                     print(f"Move {direction.upper()} blocked!")
@@ -0,0 +1,119 @@
+"""Chơi một cấp độ không cần cửa sổ game, dùng cho công cụ dòng lệnh và đo đạc.
+
+Mỗi thuật toán là một hàm `decide(state, stats) -> direction | None`; `stats`
+là dict để thuật toán cộng dồn số trạng thái đã mở rộng ("expanded") và ghi
+thời gian từng lần ra quyết định ("latencies", giây).
+AgentDecider chọn nước đúng như chế độ tự chơi trong game (agent.choose_move),
+cho mọi chế độ của AlgorithmUI. make_player() nạp pygame để đo các hàm của
+sprite Player (benchmark.py).
+"""
+from collections import namedtuple
+import contextlib
+import io
+import os
+import time
+
+import rules
+import anytime
+from agent import GameState, PlanContext, SEARCH_BUDGET, SEARCH_MAX_DEPTH, SEARCH_MAX_EXPANDED, choose_move, search_no_observation
+from policy_cache import get_policy
+from q_learning import get_q_table
+from solver import solve
+
+DEFAULT_MAX_TURNS = 200
+
+# outcome: một trong rules.TERMINAL_OUTCOMES, "stuck" (không có nước đi) hoặc "turn_limit"
+# latencies: thời gian (giây) của từng lần gọi decide
+PlayResult = namedtuple("PlayResult", ["outcome", "moves", "expanded", "latencies"])
+
+
+def decide_bfs(state, stats):
+    solution = solve(state.level, state, max_depth=SEARCH_MAX_DEPTH, max_expanded=SEARCH_MAX_EXPANDED)
+    stats["expanded"] = stats.get("expanded", 0) + solution.expanded
+    return solution.moves[0] if solution.moves else None
+
+
+def decide_anytime(state, stats):
+    result = anytime.search(state.level, state, SEARCH_BUDGET)
+    stats["expanded"] = stats.get("expanded", 0) + result.expanded
+    return result.move
+
+
+def decide_policy(state, stats):
+    policy = get_policy(state.level)
+    return policy.best_move(state) if policy else None
+
+
+def decide_q_table(state, stats):
+    q_table = get_q_table(state.level)
+    return q_table.best_move(state) if q_table else None
+
+
+def decide_search_no_observation(state, stats):
+    return search_no_observation(None, GameState(state))
+
+
+DECIDERS = {
+    "anytime": decide_anytime,
+    "bfs": decide_bfs,
+    "policy": decide_policy,
+    "q_table": decide_q_table,
+    "search_no_observation": decide_search_no_observation,
+}
+
+
+def make_player():
+    """Sprite Player thật (chỉ nạp ảnh, không mở cửa sổ) để đo các hàm của Player."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    from sprites import Player
+
+    pygame.init()
+    return Player(0, 0)
+
+
+class AgentDecider:
+    """Chọn nước bằng agent.choose_move như auto_play_step trong game.
+
+    Sổ sách chống lặp (PlanContext) được giữ qua các lượt như trên Game, nên
+    mỗi ván dùng một AgentDecider mới, giống khi game tải lại cấp độ. Các dòng
+    in ra của agent bị bỏ đi để không làm ngập đầu ra của công cụ.
+    """
+
+    def __init__(self, algorithm, level_number=None, seed=None):
+        self.algorithm = algorithm
+        self.context = PlanContext(level_number, seed=seed)
+
+    def __call__(self, state, stats):
+        game_state = GameState(state)
+        with contextlib.redirect_stdout(io.StringIO()):
+            move, self.context = choose_move(self.context, game_state, self.algorithm)
+        if game_state.search_result is not None:
+            stats["expanded"] = stats.get("expanded", 0) + game_state.search_result.expanded
+        return move
+
+
+def play(level, decide, state=None, max_turns=DEFAULT_MAX_TURNS):
+    """Cho `decide` chơi tới khi thắng, chết, bế tắc hoặc hết số lượt cho phép."""
+    if state is None:
+        state = level.initial_state()
+    stats = {}
+    moves = []
+    outcome = "turn_limit"
+    latencies = stats.setdefault("latencies", [])
+    for _ in range(max_turns):
+        start = time.perf_counter()
+        move = decide(state, stats)
+        latencies.append(time.perf_counter() - start)
+        if move is None:
+            outcome = "stuck"
+            break
+        state, result = rules.step(state, move)
+        if result == rules.BLOCKED:
+            outcome = "stuck"
+            break
+        moves.append(move)
+        if result in rules.TERMINAL_OUTCOMES:
+            outcome = result
+            break
+    return PlayResult(outcome, moves, stats.get("expanded"), latencies)
@@ -1,127 +1,212 @@
 import pygame
 import os
+import threading
 from constants import CELL_SIZE
 
 BASE_PATH = "./images"
+DIRECTIONS = ("up", "down", "left", "right")
+SHEET_FRAMES = 5
 
-def load_images():
-    images = {}
-    
-    def split_sprite_sheet(sheet, frame_width, frame_count):
-        frames = []
-        for i in range(frame_count):
-            frame = sheet.subsurface((i * frame_width, 0, frame_width, sheet.get_height()))
-            frames.append(pygame.transform.scale(frame, (CELL_SIZE, CELL_SIZE)))
-        return frames
-
-    # Load Player images
-    player_path = os.path.join(BASE_PATH, "player")
-    images["player"] = {}
-    directions = ["up", "down", "left", "right"]
-    player_sprite_sheets = {
-        "up": "move_up.png",
-        "down": "move_down.png",
-        "left": "move_left.png",
-        "right": "move_right.png"
-    }
-    
-    if os.path.exists(player_path):
-        for direction in directions:
-            images["player"][direction] = []
-            file_name = player_sprite_sheets.get(direction, f"player_{direction}.png")
-            file_path = os.path.join(player_path, file_name)
-            try:
-                if os.path.exists(file_path):
-                    sprite_sheet = pygame.image.load(file_path)
-                    frames = split_sprite_sheet(sprite_sheet, sprite_sheet.get_width() // 5, 5)
-                    images["player"][direction].extend(frames)
+# Bộ nhớ đệm ảnh dùng chung cho cả tiến trình: (tên tệp, kích thước) -> Surface
+# hoặc danh sách khung hình. Kích thước None là ảnh gốc.
+_image_cache = {}
+_disk_loads = 0
+# Bộ nhớ đệm có thể được nạp từ luồng nền (preload_game_images) cùng lúc với luồng chính
+_cache_lock = threading.RLock()
+# Đã đổi ảnh sang định dạng màn hình chưa (chỉ làm được sau pygame.display.set_mode)
+_display_format = False
+
+def _to_display_format(surface):
+    """Bản sao cùng định dạng pixel với màn hình để blit không phải đổi định dạng từng pixel."""
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+def _display_ready():
+    return pygame.display.get_init() and pygame.display.get_surface() is not None
+
+def _size_key(size):
+    if size is None:
+        return None
+    if isinstance(size, int):
+        return (size, size)
+    return tuple(size)
+
+def get_image(name, size=None):
+    """Ảnh `name` (đường dẫn trong images/) thu phóng về `size` ((w, h) hoặc một số cho ô vuông).
+
+    Mỗi tệp chỉ được đọc từ đĩa một lần, mỗi kích thước chỉ thu phóng một lần;
+    các sprite dùng chung Surface trả về nên không được vẽ đè lên nó.
+    """
+    global _disk_loads
+    size = _size_key(size)
+    key = (name, size)
+    image = _image_cache.get(key)
+    if image is None:
+        with _cache_lock:
+            image = _image_cache.get(key)
+            if image is None:
+                if size is None:
+                    image = pygame.image.load(os.path.join(BASE_PATH, name))
+                    _disk_loads += 1
+                    if _display_format:
+                        image = _to_display_format(image)
                 else:
-                    print(f"Warning: Player sprite sheet {file_path} not found.")
-                    placeholder = pygame.Surface((CELL_SIZE, CELL_SIZE))
-                    placeholder.fill((0, 255, 0))
-                    images["player"][direction] = [placeholder] * 4
-            except pygame.error as e:
-                print(f"Error loading player sprite sheet {file_path}: {e}")
-                placeholder = pygame.Surface((CELL_SIZE, CELL_SIZE))
-                placeholder.fill((0, 255, 0))
-                images["player"][direction] = [placeholder] * 4
-    else:
-        print(f"Warning: Player image directory not found: {player_path}")
-        for direction in directions:
-            images["player"][direction] = [pygame.Surface((CELL_SIZE, CELL_SIZE)) for _ in range(4)]
-            for frame in images["player"][direction]:
-                frame.fill((0, 255, 0))
-    
-    # Load Mummy images
-    mummy_path = os.path.join(BASE_PATH, "mummy")
-    images["mummy"] = {}
-    colors = ["white", "red"]
-    mummy_sprite_sheets = {
-        "white_up": "whiteup.png",
-        "white_down": "whitedown.png",
-        "white_left": "whiteleft.png",
-        "white_right": "whiteright.png",
-        "red_up": "redup.png",
-        "red_down": "reddown.png",
-        "red_left": "redleft.png",
-        "red_right": "redright.png"
-    }
-    
-    if os.path.exists(mummy_path):
-        for color in colors:
-            for direction in directions:
-                key = f"{color}_{direction}"
-                images["mummy"][key] = []
-                file_name = mummy_sprite_sheets.get(key, f"{color}{direction}.png")
-                file_path = os.path.join(mummy_path, file_name)
-                try:
-                    if os.path.exists(file_path):
-                        sprite_sheet = pygame.image.load(file_path)
-                        frames = split_sprite_sheet(sprite_sheet, sprite_sheet.get_width() // 5, 5)
-                        images["mummy"][key].extend(frames)
-                    else:
-                        print(f"Warning: Mummy sprite sheet {file_path} not found.")
-                        placeholder = pygame.Surface((CELL_SIZE, CELL_SIZE))
-                        placeholder.fill((255, 165, 0))
-                        images["mummy"][key] = [placeholder] * 4
-                except pygame.error as e:
-                    print(f"Error loading mummy sprite sheet {file_path}: {e}")
-                    placeholder = pygame.Surface((CELL_SIZE, CELL_SIZE))
-                    placeholder.fill((255, 165, 0))
-                    images["mummy"][key] = [placeholder] * 4
-    else:
-        print(f"Error: Mummy image directory not found: {mummy_path}")
-        for color in colors:
-            for direction in directions:
-                key = f"{color}_{direction}"
-                images["mummy"][key] = [pygame.Surface((CELL_SIZE, CELL_SIZE)) for _ in range(4)]
-                for frame in images["mummy"][key]:
-                    frame.fill((255, 165, 0))
-    
-    # Load other images
-    try:
-        images["trap_skull"] = pygame.image.load(os.path.join(BASE_PATH, "trap_skull.png"))
-        images["backdrop"] = pygame.image.load(os.path.join(BASE_PATH, "backdrop.png"))
-        images["floor"] = pygame.image.load(os.path.join(BASE_PATH, "floor.jpg"))
-        images["mumlogo"] = pygame.image.load(os.path.join(BASE_PATH, "mumlogo.png"))
-        images["wall_horizontal"] = pygame.image.load(os.path.join(BASE_PATH, "wall_horizontal.png"))
-        images["wall_vertical"] = pygame.image.load(os.path.join(BASE_PATH, "wall_vertical.png"))
-        images["stairs_right"] = pygame.image.load(os.path.join(BASE_PATH, "stairs_right.png"))
-        images["stairs_left"] = pygame.image.load(os.path.join(BASE_PATH, "stairs_left.png"))
-        images["stairs_top"] = pygame.image.load(os.path.join(BASE_PATH, "stairs_top.png"))
-        images["stairs_bottom"] = pygame.image.load(os.path.join(BASE_PATH, "stairs_bottom.png"))
-        images["menuback"] = pygame.image.load(os.path.join(BASE_PATH, "menuback.jpg"))
-        images["menulogo"] = pygame.image.load(os.path.join(BASE_PATH, "menulogo.png"))
-        images["menufront"] = pygame.image.load(os.path.join(BASE_PATH, "menufront.png"))
-        images["playgame_button"] = pygame.image.load(os.path.join(BASE_PATH, "playgame_button.png"))
-        images["menu_quitgame"] = pygame.image.load(os.path.join(BASE_PATH, "menu_quitgame.png"))
-        images["menu_map"] = pygame.image.load(os.path.join(BASE_PATH, "menu_map.png"))
-        images["options"] = pygame.image.load(os.path.join(BASE_PATH, "options.png"))
-        images["icon"] = pygame.image.load(os.path.join(BASE_PATH, "icon.png"))
-        images["game_over"] = pygame.image.load(os.path.join(BASE_PATH, "game_over.png"))
-    except pygame.error as e:
-        print(f"Error loading image: {e}")
-    
+                    image = pygame.transform.scale(get_image(name), size)
+                _image_cache[key] = image
+    return image
+
+def get_frames(name, size, frame_count=SHEET_FRAMES):
+    """Các khung hình của một sprite sheet xếp ngang, mỗi khung thu phóng về `size`."""
+    size = _size_key(size)
+    key = (name, size, frame_count)
+    frames = _image_cache.get(key)
+    if frames is None:
+        with _cache_lock:
+            frames = _image_cache.get(key)
+            if frames is None:
+                sheet = get_image(name)
+                frame_width = sheet.get_width() // frame_count
+                frames = [
+                    pygame.transform.scale(sheet.subsurface((i * frame_width, 0, frame_width, sheet.get_height())),
+                                           size)
+                    for i in range(frame_count)
+                ]
+                _image_cache[key] = frames
+    return frames
+
+def character_frames(kind, size):
+    """{hướng: khung hình} của người chơi (kind="player") hoặc xác ướp (kind là màu)."""
+    if kind == "player":
+        return {d: get_frames(f"player/move_{d}.png", size) for d in DIRECTIONS}
+    return {d: get_frames(f"mummy/{kind}{d}.png", size) for d in DIRECTIONS}
+
+def convert_images(images=None):
+    """Đổi mọi ảnh đã nạp (bộ nhớ đệm và `images`, mặc định IMAGES) sang định dạng màn hình.
+
+    Gọi một lần ngay sau pygame.display.set_mode; ảnh nạp sau đó được đổi ngay
+    khi đọc từ đĩa (ảnh thu phóng giữ định dạng của ảnh gốc). Chưa có cửa sổ
+    (chạy không giao diện, công cụ dòng lệnh) thì giữ nguyên ảnh và trả về False.
+    """
+    global _display_format
+    if not _display_ready():
+        return False
+    converted = {}  # id(Surface cũ) -> Surface mới, để ảnh dùng chung vẫn dùng chung
+
+    def convert(value):
+        if isinstance(value, pygame.Surface):
+            if id(value) not in converted:
+                converted[id(value)] = (value, _to_display_format(value))
+            return converted[id(value)][1]
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        if isinstance(value, dict):
+            for key in value:
+                value[key] = convert(value[key])
+            return value
+        return value
+
+    with _cache_lock:
+        for key in _image_cache:
+            _image_cache[key] = convert(_image_cache[key])
+        convert(IMAGES if images is None else images)
+        _display_format = True
+    return True
+
+def cache_stats():
+    """(số mục trong bộ nhớ đệm, số lần đã đọc ảnh từ đĩa)."""
+    return len(_image_cache), _disk_loads
+
+def _placeholder(color):
+    surface = pygame.Surface((CELL_SIZE, CELL_SIZE))
+    surface.fill(color)
+    return surface
+
+def _load_sheets(directory, sheets, placeholder_color):
+    """{khóa: khung hình} cho các sprite sheet `sheets` (khóa -> tên tệp) trong `directory`."""
+    path = os.path.join(BASE_PATH, directory)
+    images = {}
+    if not os.path.exists(path):
+        print(f"Warning: {directory} image directory not found: {path}")
+        return {key: [_placeholder(placeholder_color)] * 4 for key in sheets}
+    for key, file_name in sheets.items():
+        file_path = os.path.join(path, file_name)
+        try:
+            if os.path.exists(file_path):
+                images[key] = list(get_frames(os.path.join(directory, file_name), CELL_SIZE))
+            else:
+                print(f"Warning: {directory} sprite sheet {file_path} not found.")
+                images[key] = [_placeholder(placeholder_color)] * 4
+        except pygame.error as e:
+            print(f"Error loading {directory} sprite sheet {file_path}: {e}")
+            images[key] = [_placeholder(placeholder_color)] * 4
     return images
 
-IMAGES = load_images()
\ No newline at end of file
+PLAYER_SHEETS = {direction: f"move_{direction}.png" for direction in DIRECTIONS}
+MUMMY_SHEETS = {f"{color}_{direction}": f"{color}{direction}.png"
+                for color in ("white", "red") for direction in DIRECTIONS}
+
+# Ảnh đơn trong IMAGES: khóa -> tệp trong images/
+IMAGE_FILES = {
+    "trap_skull": "trap_skull.png",
+    "backdrop": "backdrop.png",
+    "floor": "floor.jpg",
+    "mumlogo": "mumlogo.png",
+    "wall_horizontal": "wall_horizontal.png",
+    "wall_vertical": "wall_vertical.png",
+    "stairs_right": "stairs_right.png",
+    "stairs_left": "stairs_left.png",
+    "stairs_top": "stairs_top.png",
+    "stairs_bottom": "stairs_bottom.png",
+    "menuback": "menuback.jpg",
+    "menulogo": "menulogo.png",
+    "menufront": "menufront.png",
+    "playgame_button": "playgame_button.png",
+    "menu_quitgame": "menu_quitgame.png",
+    "menu_map": "menu_map.png",
+    "options": "options.png",
+    "icon": "icon.png",
+    "game_over": "game_over.png",
+}
+
+def _load_entry(key):
+    if key == "player":
+        return _load_sheets("player", PLAYER_SHEETS, (0, 255, 0))
+    if key == "mummy":
+        return _load_sheets("mummy", MUMMY_SHEETS, (255, 165, 0))
+    if key not in IMAGE_FILES:
+        raise KeyError(key)
+    return get_image(IMAGE_FILES[key])
+
+class LazyImages(dict):
+    """IMAGES: mỗi mục chỉ được đọc từ đĩa ở lần truy cập đầu tiên (an toàn khi nạp trên luồng nền)."""
+
+    def __missing__(self, key):
+        with _cache_lock:
+            if key not in self:
+                dict.__setitem__(self, key, _load_entry(key))
+            return dict.__getitem__(self, key)
+
+def load_images():
+    """Nạp ngay mọi mục của IMAGES."""
+    images = LazyImages()
+    for key in ("player", "mummy", *IMAGE_FILES):
+        images[key]
+    return images
+
+# Ảnh chỉ màn chơi dùng: nạp trước trên luồng nền trong lúc menu đang hiện
+GAME_IMAGES = ("backdrop", "floor", "mumlogo", "game_over", "options")
+SPRITE_FILES = ("wall_horizontal.png", "wall_vertical.png", "trap_skull.png", "stairs_right.png",
+                "stairs_left.png", "stairs_top.png", "stairs_bottom.png")
+
+def preload_game_images(size=CELL_SIZE):
+    """Nạp sẵn ảnh của màn chơi và nhân vật ở kích thước ô `size` vào bộ nhớ đệm."""
+    for key in GAME_IMAGES:
+        IMAGES[key]
+    get_image("snake.png", (130, 80))
+    for name in SPRITE_FILES:
+        get_image(name, size)
+    for kind in ("player", "white", "red"):
+        character_frames(kind, size)
+
+IMAGES = LazyImages()
@@ -0,0 +1,172 @@
+"""Bảng xếp hạng các thuật toán: chơi không cần cửa sổ trên mọi cấp độ, nhiều seed.
+
+Ví dụ:
+    python leaderboard.py                               # 6 thuật toán của AlgorithmUI, 5 seed
+    python leaderboard.py --seeds 10 -o results.json    # lưu kết quả chi tiết
+    python leaderboard.py --baseline results.json       # báo thụt lùi so với lần chạy trước
+
+Mỗi chế độ của AlgorithmUI chọn nước qua agent.choose_move, đúng đường mà chế
+độ tự chơi trong game dùng, nên bảng xếp hạng cho thấy điều người chơi thấy.
+Chế độ q_learning đọc bảng Q đã huấn luyện ngoại tuyến (q_learning.py); cấp độ
+nào chưa có bảng thì được huấn luyện trước khi chơi, để hàng q_learning đo
+đúng bảng Q chứ không phải nước dự phòng khi thiếu bảng.
+Các tên khác trong headless.DECIDERS (anytime, policy, q_table) chạy thẳng
+một thuật toán để so riêng. Mỗi ván dừng khi thắng, chết, bế tắc hoặc hết
+--max-turns lượt.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+
+import rules
+from headless import DECIDERS, DEFAULT_MAX_TURNS, AgentDecider, play
+from level_manager import LEVELS_PATH
+from q_learning import get_q_table, train_q_table
+
+ALGORITHMS = ("a_star", "q_learning", "min_conflict", "bfs", "local_beam", "search_no_observation")
+# Các thuật toán chọn nước theo bảng Q của q_learning.py
+Q_TABLE_ALGORITHMS = ("q_learning", "q_table")
+DEFAULT_SEEDS = 5
+DEFAULT_LATENCY_THRESHOLD = 0.25  # độ trễ trung vị tăng quá 25% thì coi là thụt lùi
+MIN_LATENCY_DELTA_MS = 0.05  # bỏ qua chênh lệch nhỏ hơn độ nhiễu của đồng hồ
+
+
+def make_decider(algorithm, level_number, seed):
+    if algorithm in ALGORITHMS:
+        return AgentDecider(algorithm, level_number, seed)
+    return DECIDERS[algorithm]
+
+
+def prepare_q_tables(levels):
+    """Huấn luyện (và lưu) bảng Q cho các cấp độ chưa có."""
+    for number, level in levels:
+        if get_q_table(level) is None:
+            print(f"Level {number}: chưa có bảng Q, đang huấn luyện...", file=sys.stderr, flush=True)
+            if train_q_table(level) is None:
+                print(f"Level {number}: quá nhiều trạng thái để lập bảng Q", file=sys.stderr)
+
+
+def run_episodes(levels, algorithms, seeds, max_turns=DEFAULT_MAX_TURNS):
+    """Sinh một bản ghi cho mỗi (thuật toán, cấp độ, seed)."""
+    for algorithm in algorithms:
+        for number, level in levels:
+            for seed in range(seeds):
+                random.seed(seed)
+                result = play(level, make_decider(algorithm, number, seed), max_turns=max_turns)
+                yield {
+                    "algorithm": algorithm,
+                    "level": number,
+                    "seed": seed,
+                    "outcome": result.outcome,
+                    "won": result.outcome == rules.WIN,
+                    "steps": len(result.moves),
+                    "states_expanded": result.expanded,
+                    "latencies_ms": [latency * 1000 for latency in result.latencies],
+                }
+
+
+def summarize(records):
+    """{thuật toán: tỉ lệ thắng, số bước trung bình khi thắng, độ trễ trung vị/p95, ...}."""
+    grouped = {}
+    for record in records:
+        grouped.setdefault(record["algorithm"], []).append(record)
+    summary = {}
+    for algorithm, runs in grouped.items():
+        wins = [run for run in runs if run["won"]]
+        latencies = sorted(latency for run in runs for latency in run["latencies_ms"])
+        expanded = [run["states_expanded"] for run in runs if run["states_expanded"] is not None]
+        summary[algorithm] = {
+            "runs": len(runs),
+            "win_rate": len(wins) / len(runs),
+            "mean_steps": statistics.mean(run["steps"] for run in wins) if wins else None,
+            "mean_states_expanded": statistics.mean(expanded) if expanded else None,
+            "median_latency_ms": statistics.median(latencies) if latencies else 0.0,
+            "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            "levels_won": sorted({run["level"] for run in wins}),
+        }
+    return summary
+
+
+def find_regressions(summary, baseline, latency_threshold=DEFAULT_LATENCY_THRESHOLD):
+    """Danh sách mô tả các thuật toán có tỉ lệ thắng giảm hoặc độ trễ trung vị tăng so với mốc."""
+    regressions = []
+    for algorithm, current in summary.items():
+        previous = baseline.get(algorithm)
+        if previous is None:
+            continue
+        if current["win_rate"] < previous["win_rate"]:
+            regressions.append(f"{algorithm}: tỉ lệ thắng {previous['win_rate']:.0%} -> {current['win_rate']:.0%}")
+        before, after = previous["median_latency_ms"], current["median_latency_ms"]
+        if after - before > MIN_LATENCY_DELTA_MS and after > before * (1 + latency_threshold):
+            regressions.append(f"{algorithm}: độ trễ trung vị {before:.3f} ms -> {after:.3f} ms")
+    return regressions
+
+
+def format_table(summary):
+    lines = [f"{'#':>2} {'algorithm':<22} {'win rate':>8} {'steps':>7} {'expanded':>9} "
+             f"{'median ms':>10} {'p95 ms':>8}  levels won"]
+    ranked = sorted(summary.items(), key=lambda item: (-item[1]["win_rate"],
+                                                      item[1]["mean_steps"] or float("inf"),
+                                                      item[1]["median_latency_ms"]))
+    for rank, (algorithm, row) in enumerate(ranked, 1):
+        steps = f"{row['mean_steps']:.1f}" if row["mean_steps"] is not None else "-"
+        expanded = f"{row['mean_states_expanded']:.0f}" if row["mean_states_expanded"] is not None else "-"
+        levels = ",".join(str(level) for level in row["levels_won"]) or "-"
+        lines.append(f"{rank:>2} {algorithm:<22} {row['win_rate']:>8.0%} {steps:>7} {expanded:>9} "
+                     f"{row['median_latency_ms']:>10.3f} {row['p95_latency_ms']:>8.3f}  {levels}")
+    return "\n".join(lines)
+
+
+def load_levels(path, numbers=None):
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return [(item.get("level"), rules.Level.from_data(item)) for item in data.get("levels", [])
+            if numbers is None or item.get("level") in numbers]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="So sánh các thuật toán trên mọi cấp độ.")
+    parser.add_argument("levels_file", nargs="?", default=LEVELS_PATH)
+    parser.add_argument("--levels", help="danh sách số cấp độ, ví dụ 1,4,6")
+    parser.add_argument("-a", "--algorithms", default=",".join(ALGORITHMS),
+                        help="danh sách thuật toán, cách nhau bởi dấu phẩy")
+    parser.add_argument("--seeds", type=int, default=DEFAULT_SEEDS)
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS)
+    parser.add_argument("-o", "--output", help="ghi bản ghi từng ván và bảng tổng hợp ra tệp JSON")
+    parser.add_argument("--baseline", help="tệp JSON của một lần chạy trước để so sánh")
+    parser.add_argument("--latency-threshold", type=float, default=DEFAULT_LATENCY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    algorithms = args.algorithms.split(",")
+    unknown = [a for a in algorithms if a not in ALGORITHMS and a not in DECIDERS]
+    if unknown:
+        parser.error(f"thuật toán không hợp lệ: {', '.join(unknown)}")
+    numbers = {int(n) for n in args.levels.split(",")} if args.levels else None
+
+    levels = load_levels(args.levels_file, numbers)
+    if any(algorithm in Q_TABLE_ALGORITHMS for algorithm in algorithms):
+        prepare_q_tables(levels)
+    records = list(run_episodes(levels, algorithms, args.seeds, args.max_turns))
+    summary = summarize(records)
+    print(format_table(summary))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"seeds": args.seeds, "max_turns": args.max_turns,
+                       "summary": summary, "runs": records}, file)
+        print(f"Đã ghi kết quả vào '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file).get("summary", {})
+        regressions = find_regressions(summary, baseline, args.latency_threshold)
+        if regressions:
+            print("Thụt lùi so với mốc:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
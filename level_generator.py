@@ -0,0 +1,252 @@
+"""Sinh cấp độ ngẫu nhiên, kiểm chứng bằng bộ giải chính xác và loại trùng lặp.
+
+Ví dụ:
+    python level_generator.py -n 100 -o generated_levels.json
+    python level_generator.py -n 1000 --min-moves 12 --min-detour 4 --max-mummies 3 -j 8
+
+Mỗi ứng viên (tường, cầu thang, người chơi, xác ướp hai màu, bẫy) được sinh từ
+một seed riêng nên kết quả lặp lại được; tiến trình con sinh và giải thử, tiến
+trình chính bỏ các mê cung trùng nhau theo mã băm chuẩn tắc rồi ghi ra tệp cùng
+định dạng levels.json.
+"""
+import argparse
+from collections import deque, namedtuple
+import hashlib
+import json
+from multiprocessing import Pool
+import os
+import random
+import sys
+import time
+
+import rules
+from solver import solve
+
+# Loại ảnh cầu thang theo cạnh mê cung mà cầu thang nằm ngoài
+STAIR_TYPES = {"top": "S_t", "bottom": "S_b", "left": "S_l", "right": "S_r"}
+DEFAULT_STAIR_SIDES = ("top", "bottom", "left", "right")
+
+# Ràng buộc độ khó và hình dạng mê cung
+Settings = namedtuple("Settings", [
+    "rows", "cols", "wall_density", "min_mummies", "max_mummies", "red_ratio",
+    "max_traps", "stair_sides", "min_moves", "max_moves", "min_detour", "max_expanded",
+])
+DEFAULT_SETTINGS = Settings(
+    rows=6, cols=6, wall_density=0.3, min_mummies=1, max_mummies=3, red_ratio=0.5,
+    max_traps=2, stair_sides=DEFAULT_STAIR_SIDES, min_moves=8, max_moves=None, min_detour=2,
+    max_expanded=None,
+)
+
+# data: phần tử "levels" (chưa có số "level"), None nếu bị loại
+# reason: lý do bị loại ("unsolvable", "too_easy", "too_hard", "no_detour")
+Candidate = namedtuple("Candidate", ["seed", "data", "reason", "canonical_hash"])
+
+
+def _stair_cell(rng, side, rows, cols):
+    if side == "top":
+        return -1, rng.randrange(cols)
+    if side == "bottom":
+        return rows, rng.randrange(cols)
+    if side == "left":
+        return rng.randrange(rows), -1
+    return rng.randrange(rows), cols
+
+
+def random_level_data(rng, settings):
+    """Một bố cục ngẫu nhiên ở dạng dữ liệu của levels.json (chưa kiểm chứng)."""
+    rows, cols = settings.rows, settings.cols
+    maze = [[{} for _ in range(cols)] for _ in range(rows)]
+    for row in range(rows):
+        for col in range(cols):
+            walls = []
+            if row + 1 < rows and rng.random() < settings.wall_density:
+                walls.append("bottom")
+            if col > 0 and rng.random() < settings.wall_density:
+                walls.append("left")
+            if walls:
+                maze[row][col]["walls"] = walls
+
+    side = rng.choice(settings.stair_sides)
+    stair_row, stair_col = _stair_cell(rng, side, rows, cols)
+    mummy_count = rng.randint(settings.min_mummies, settings.max_mummies)
+    trap_count = rng.randint(0, settings.max_traps)
+    cells = rng.sample([(row, col) for row in range(rows) for col in range(cols)],
+                       1 + mummy_count + trap_count)
+    player, mummies, traps = cells[0], cells[1:1 + mummy_count], cells[1 + mummy_count:]
+    return {
+        "maze": maze,
+        "stairs": [{"row": stair_row, "col": stair_col, "type": STAIR_TYPES[side]}],
+        "player_start": {"row": player[0], "col": player[1]},
+        "mummies": [
+            {"row": row, "col": col, "color": "red" if rng.random() < settings.red_ratio else "white"}
+            for row, col in mummies
+        ],
+        "traps": [{"row": row, "col": col} for row, col in traps],
+    }
+
+
+def plain_path_length(level):
+    """Số bước ngắn nhất tới cầu thang nếu không có xác ướp (vẫn tránh bẫy); None nếu không tới được."""
+    start = level.cell_index(*level.player_start)
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        index = queue.popleft()
+        if level.exit_mask[index]:
+            return distances[index] + 1
+        for d in range(4):
+            if not level.open_mask[index] >> d & 1:
+                continue
+            target = level.neighbors[index * 4 + d]
+            if target not in distances and not level.trap_mask[target]:
+                distances[target] = distances[index] + 1
+                queue.append(target)
+    return None
+
+
+def _transforms(rows, cols):
+    """Các phép đối xứng (hàm (row, col) -> (row, col), có hoán vị hàng/cột không) giữ nguyên khung mê cung."""
+    result = [
+        (lambda r, c: (r, c), False),
+        (lambda r, c: (r, cols - 1 - c), False),
+        (lambda r, c: (rows - 1 - r, c), False),
+        (lambda r, c: (rows - 1 - r, cols - 1 - c), False),
+    ]
+    if rows == cols:
+        n = rows - 1
+        result += [
+            (lambda r, c: (c, r), True),
+            (lambda r, c: (n - c, r), True),
+            (lambda r, c: (c, n - r), True),
+            (lambda r, c: (n - c, n - r), True),
+        ]
+    return result
+
+
+def canonical_hash(level):
+    """Mã băm giống nhau cho các bố cục chỉ khác nhau bởi phép quay/lật.
+
+    Lật ngang/dọc giữ nguyên màu xác ướp (mỗi lúc chỉ có một hướng ngang rút
+    ngắn khoảng cách, nên thứ tự trái/phải không quan trọng); phép chuyển vị
+    đổi ưu tiên ngang/dọc nên đổi luôn trắng <-> đỏ.
+    """
+    blocked = []
+    for index, (row, col) in enumerate(level.coords):
+        for d in (rules.DIRECTION_INDEX["down"], rules.DIRECTION_INDEX["right"]):
+            target = level.neighbors[index * 4 + d]
+            if target >= 0 and not level.open_mask[index] >> d & 1:
+                blocked.append(((row, col), level.coords[target]))
+
+    swap_color = {"white": "red", "red": "white"}
+    forms = []
+    for transform, transposed in _transforms(level.rows, level.cols):
+        forms.append((
+            sorted(sorted((transform(*a), transform(*b))) for a, b in blocked),
+            sorted(transform(*cell) for cell in level.stairs),
+            transform(*level.player_start),
+            [transform(row, col) + (swap_color[color] if transposed else color,)
+             for row, col, color in level.mummies_start],
+            sorted(transform(*cell) for cell in level.traps),
+        ))
+    shape = sorted((level.rows, level.cols))
+    payload = json.dumps([shape, min(forms)], separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def evaluate(seed, settings=DEFAULT_SETTINGS):
+    """Sinh bố cục từ `seed`, giải thử và áp ràng buộc độ khó."""
+    rng = random.Random(seed)
+    data = random_level_data(rng, settings)
+    level = rules.Level.from_data(data)
+    solution = solve(level, max_depth=settings.max_moves, max_expanded=settings.max_expanded)
+    if solution.moves is None:
+        return Candidate(seed, None, "unsolvable" if solution.complete else "too_hard", None)
+    moves = len(solution.moves)
+    if moves < settings.min_moves:
+        return Candidate(seed, None, "too_easy", None)
+    plain = plain_path_length(level)
+    if plain is not None and moves - plain < settings.min_detour:
+        return Candidate(seed, None, "no_detour", None)
+    data["solution_length"] = moves
+    return Candidate(seed, data, None, canonical_hash(level))
+
+
+def _evaluate_job(job):
+    return evaluate(*job)
+
+
+def generate(count, settings=DEFAULT_SETTINGS, seed=0, workers=None, max_candidates=None):
+    """Sinh tới khi có `count` cấp độ khác nhau; trả về (danh sách dữ liệu cấp độ, thống kê)."""
+    max_candidates = max_candidates or count * 1000
+    stats = {"candidates": 0, "accepted": 0, "duplicate": 0}
+    seen = set()
+    levels = []
+    jobs = ((seed + i, settings) for i in range(max_candidates))
+    with Pool(processes=workers or os.cpu_count() or 1) as pool:
+        # imap giữ thứ tự seed: ứng viên được nhận và bản nào của một mê cung trùng được giữ
+        # chỉ phụ thuộc vào dải seed, không phụ thuộc tiến trình con nào xong trước
+        for candidate in pool.imap(_evaluate_job, jobs, chunksize=64):
+            stats["candidates"] += 1
+            if candidate.data is None:
+                stats[candidate.reason] = stats.get(candidate.reason, 0) + 1
+            elif candidate.canonical_hash in seen:
+                stats["duplicate"] += 1
+            else:
+                seen.add(candidate.canonical_hash)
+                candidate.data["seed"] = candidate.seed
+                levels.append(candidate.data)
+                stats["accepted"] += 1
+                if len(levels) >= count:
+                    pool.terminate()
+                    break
+    return levels, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sinh cấp độ ngẫu nhiên đã được kiểm chứng là giải được.")
+    parser.add_argument("-n", "--count", type=int, default=14, help="số cấp độ cần sinh")
+    parser.add_argument("-o", "--output", default="generated_levels.json")
+    parser.add_argument("--seed", type=int, default=0, help="seed của ứng viên đầu tiên")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--first-level", type=int, default=1, help="số thứ tự của cấp độ đầu tiên trong tệp")
+    parser.add_argument("--rows", type=int, default=DEFAULT_SETTINGS.rows)
+    parser.add_argument("--cols", type=int, default=DEFAULT_SETTINGS.cols)
+    parser.add_argument("--wall-density", type=float, default=DEFAULT_SETTINGS.wall_density)
+    parser.add_argument("--min-mummies", type=int, default=DEFAULT_SETTINGS.min_mummies)
+    parser.add_argument("--max-mummies", type=int, default=DEFAULT_SETTINGS.max_mummies)
+    parser.add_argument("--red-ratio", type=float, default=DEFAULT_SETTINGS.red_ratio)
+    parser.add_argument("--max-traps", type=int, default=DEFAULT_SETTINGS.max_traps)
+    parser.add_argument("--stair-sides", default=",".join(DEFAULT_STAIR_SIDES),
+                        help="các cạnh có thể đặt cầu thang: top,bottom,left,right")
+    parser.add_argument("--min-moves", type=int, default=DEFAULT_SETTINGS.min_moves)
+    parser.add_argument("--max-moves", type=int, default=DEFAULT_SETTINGS.max_moves)
+    parser.add_argument("--min-detour", type=int, default=DEFAULT_SETTINGS.min_detour,
+                        help="số bước tối thiểu mà xác ướp buộc người chơi phải đi vòng")
+    parser.add_argument("--max-expanded", type=int, default=DEFAULT_SETTINGS.max_expanded,
+                        help="số trạng thái tối đa bộ giải được mở rộng cho mỗi ứng viên (mê cung lớn)")
+    args = parser.parse_args(argv)
+
+    sides = tuple(args.stair_sides.split(","))
+    if any(side not in STAIR_TYPES for side in sides):
+        parser.error(f"cạnh cầu thang không hợp lệ: {args.stair_sides}")
+    settings = Settings(args.rows, args.cols, args.wall_density, args.min_mummies, args.max_mummies,
+                        args.red_ratio, args.max_traps, sides, args.min_moves, args.max_moves,
+                        args.min_detour, args.max_expanded)
+
+    start = time.perf_counter()
+    levels, stats = generate(args.count, settings, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    for number, data in enumerate(levels, args.first_level):
+        data["level"] = number
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"levels": levels}, file, indent=2)
+    rate = stats["candidates"] / elapsed * 60 if elapsed else 0
+    print(f"Đã ghi {len(levels)} cấp độ vào '{args.output}' "
+          f"({stats['candidates']} ứng viên, {rate:,.0f} ứng viên/phút)")
+    print(json.dumps(stats))
+    return 0 if len(levels) >= args.count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
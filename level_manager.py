@@ -1,58 +1,108 @@
 import json
 import os
+from level_pack import LevelPack, is_pack
+from rules import Level
 
 LEVELS_PATH = r"./levels.json"
 class LevelManager:
-    def __init__(self):
+    def __init__(self, path=LEVELS_PATH):
+        self.path = path
         self.levels = []
+        self.levels_by_number = {}  # số cấp độ -> dữ liệu cấp độ trong file JSON
+        self.pack = None  # LevelPack khi `path` là gói nhị phân (level_pack.py): giải mã từng cấp độ khi cần
+        self.file_signature = None  # (mtime, kích thước) của file lúc đọc, để biết khi nào cần đọc lại
         self.current_level = 0  # Bắt đầu ở cấp độ 1 (chỉ số 0)
+        self.compiled_levels = {}  # level_number -> rules.Level đã biên dịch
         # Tải dữ liệu levels từ file JSON
         self.load_levels()
 
-    def load_levels(self):
-        """Tải toàn bộ dữ liệu levels từ file JSON."""
+    def _stat_signature(self):
         try:
-            with open(LEVELS_PATH, "r", encoding="utf-8") as file:
-                data = json.load(file)
-                self.levels = data.get("levels", [])
-        except FileNotFoundError:
-            print(f"Lỗi: Không tìm thấy tệp '{LEVELS_PATH}'!")
-            self.levels = []
-        except json.JSONDecodeError:
-            print(f"Lỗi: Định dạng JSON không hợp lệ trong '{LEVELS_PATH}'!")
-            self.levels = []
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
 
-    def load_level(self, level_number):
-        """Đọc dữ liệu level cụ thể từ file JSON."""
+    def load_levels(self):
+        """Tải toàn bộ dữ liệu levels từ file JSON, hoặc mở gói nhị phân bằng mmap."""
+        self.file_signature = self._stat_signature()
+        self.compiled_levels.clear()
+        if self.pack is not None:
+            self.pack.close()
+            self.pack = None
+        if is_pack(self.path):
+            self.pack = LevelPack(self.path)
+            self.levels = []
+            self.levels_by_number = {}
+            return
         try:
-            with open(LEVELS_PATH, "r", encoding="utf-8") as file:
+            with open(self.path, "r", encoding="utf-8") as file:
                 data = json.load(file)
         except FileNotFoundError:
-            print(f"Error: File '{LEVELS_PATH}' not found! Please ensure the file exists in the correct directory.")
-            return None, None, None, None, None
+            print(f"Lỗi: Không tìm thấy tệp '{self.path}'!")
+            data = {}
         except json.JSONDecodeError:
-            print(f"Error: File '{LEVELS_PATH}' contains invalid JSON format!")
+            print(f"Lỗi: Định dạng JSON không hợp lệ trong '{self.path}'!")
+            data = {}
+        self.levels = data.get("levels", [])
+        self.levels_by_number = {}
+        for level in self.levels:
+            self.levels_by_number.setdefault(level.get("level"), level)
+
+    def refresh(self):
+        """Đọc lại file nếu nó đã đổi (mtime hoặc kích thước) từ lần đọc trước; trả về True nếu đã đọc lại.
+
+        Mỗi lần gọi chỉ tốn một os.stat, nên có thể gọi trước mỗi lần tải cấp độ
+        để người thiết kế sửa levels.json mà không phải khởi động lại game.
+        """
+        if self._stat_signature() == self.file_signature:
+            return False
+        self.load_levels()
+        return True
+
+    def load_level(self, level_number, refresh=True):
+        """Dữ liệu của cấp độ `level_number` (đọc lại file JSON nếu nó vừa được sửa)."""
+        if refresh:
+            self.refresh()
+        if self.pack is not None:
+            level = self.pack.get(level_number)
+        else:
+            level = self.levels_by_number.get(level_number)
+        if level is None:
             return None, None, None, None, None
+        return (
+            level["maze"],
+            level["stairs"],
+            level.get("player_start", {"row": 0, "col": 0}),
+            level.get("mummies", []),
+            level.get("traps", [])
+        )
 
-        for level in data.get("levels", []):
-            if level["level"] == level_number:
-                return (
-                    level["maze"],
-                    level["stairs"],
-                    level.get("player_start", {"row": 0, "col": 0}),
-                    level.get("mummies", []),
-                    level.get("traps", [])
-                )
-        return None, None, None, None, None
+    def compile_level(self, level_number, refresh=True):
+        """Biên dịch mê cung thành bảng mặt nạ/ô kề một lần và dùng lại cho các lần sau."""
+        if refresh:
+            self.refresh()
+        if level_number not in self.compiled_levels:
+            maze, stairs, player_start, mummies, traps = self.load_level(level_number, refresh=False)
+            if maze is None:
+                return None
+            self.compiled_levels[level_number] = Level(maze, stairs, player_start, mummies, traps)
+        return self.compiled_levels[level_number]
+
+    def get_current_compiled_level(self):
+        """Trả lại rules.Level đã biên dịch của cấp độ hiện tại (không tự refresh, xem Game.load_level)."""
+        if 0 <= self.current_level < self.get_level_count():
+            return self.compile_level(self.current_level + 1, refresh=False)
+        return None
 
     def get_current_level_data(self):
-        """Trả lại dữ liệu cho cấp độ hiện tại."""
-        if 0 <= self.current_level < len(self.levels):
-            return self.load_level(self.current_level + 1)
+        """Trả lại dữ liệu cho cấp độ hiện tại (không tự refresh, xem Game.load_level)."""
+        if 0 <= self.current_level < self.get_level_count():
+            return self.load_level(self.current_level + 1, refresh=False)
         return None, None, None, None, None
 
     def next_level(self):
-        if self.current_level < len(self.levels) - 1:
+        if self.current_level < self.get_level_count() - 1:
             self.current_level += 1
             return True
         return False
@@ -61,4 +111,6 @@ class LevelManager:
         self.current_level = 0
 
     def get_level_count(self):
+        if self.pack is not None:
+            return len(self.pack)
         return len(self.levels)
\ No newline at end of file
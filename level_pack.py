@@ -0,0 +1,237 @@
+"""Gói cấp độ nhị phân: biên dịch từ levels.json và đọc ngẫu nhiên qua mmap.
+
+Ví dụ:
+    python level_pack.py generated_levels.json -o generated_levels.mmpk
+    python level_pack.py generated_levels.json -o generated_levels.mmpk --verify
+
+Bố cục tệp (little-endian):
+    header   "MMPK", phiên bản (u16), dự trữ (u16), số cấp độ (u32)
+    index    mỗi cấp độ (số cấp độ u32, vị trí bản ghi u64), sắp theo số cấp độ
+    bản ghi  rows, cols, số cầu thang, số xác ướp, số bẫy, hàng/cột người chơi (u8),
+             một byte mỗi ô (bit tường top/right/bottom/left, bit cổng),
+             cầu thang (hàng i8, cột i8, loại u8), xác ướp (hàng, cột, màu u8),
+             bẫy (hàng, cột u8)
+
+LevelPack chỉ đọc header khi mở; tra cứu là tìm nhị phân trên index trong
+mmap, rồi giải mã đúng bản ghi cần dùng, nên thời gian mở và bộ nhớ không phụ
+thuộc số cấp độ trong gói.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+from rules import normalize_color
+
+MAGIC = b"MMPK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+INDEX_ENTRY = struct.Struct("<IQ")
+RECORD_HEADER = struct.Struct("<7B")
+STAIR = struct.Struct("<bbB")
+MUMMY = struct.Struct("<3B")
+TRAP = struct.Struct("<2B")
+
+WALL_SIDES = ("top", "right", "bottom", "left")  # bit 0..3 của byte ô
+GATE_BIT = 1 << len(WALL_SIDES)
+STAIR_TYPES = ("S_t", "S_b", "S_l", "S_r")
+MUMMY_COLORS = ("white", "red")
+MAX_SIDE = 127  # hàng/cột cầu thang lưu bằng i8 (cầu thang có thể ở hàng/cột -1 hoặc rows/cols)
+
+
+def is_pack(path):
+    """Tệp `path` có phải gói nhị phân không (theo 4 byte đầu)."""
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def encode_level(data):
+    """Bản ghi nhị phân của một phần tử trong mảng "levels"."""
+    maze = data["maze"]
+    rows = len(maze)
+    cols = len(maze[0]) if rows else 0
+    if rows > MAX_SIDE or cols > MAX_SIDE:
+        raise ValueError(f"Cấp độ {data.get('level')}: mê cung {rows}x{cols} vượt quá {MAX_SIDE}x{MAX_SIDE}")
+    stairs = data["stairs"]
+    mummies = data.get("mummies", [])
+    traps = data.get("traps", [])
+    player = data.get("player_start", {"row": 0, "col": 0})
+    if max(len(stairs), len(mummies), len(traps)) > 255:
+        raise ValueError(f"Cấp độ {data.get('level')}: quá nhiều cầu thang/xác ướp/bẫy")
+
+    cells = bytearray()
+    for row in maze:
+        for cell in row:
+            walls = cell.get("walls", ())
+            value = sum(1 << bit for bit, side in enumerate(WALL_SIDES) if side in walls)
+            if cell.get("gate"):
+                value |= GATE_BIT
+            cells.append(value)
+
+    parts = [RECORD_HEADER.pack(rows, cols, len(stairs), len(mummies), len(traps),
+                                player["row"], player["col"]), bytes(cells)]
+    parts += [STAIR.pack(s["row"], s["col"], STAIR_TYPES.index(s["type"])) for s in stairs]
+    parts += [MUMMY.pack(m["row"], m["col"], MUMMY_COLORS.index(normalize_color(m.get("color", "white"))))
+              for m in mummies]
+    parts += [TRAP.pack(t["row"], t["col"]) for t in traps]
+    return b"".join(parts)
+
+
+def decode_level(buffer, offset, number):
+    """Dữ liệu cấp độ (cùng dạng phần tử "levels" của levels.json) từ bản ghi ở `offset`."""
+    rows, cols, stair_count, mummy_count, trap_count, player_row, player_col = \
+        RECORD_HEADER.unpack_from(buffer, offset)
+    offset += RECORD_HEADER.size
+    cells = buffer[offset:offset + rows * cols]
+    offset += rows * cols
+
+    maze = []
+    for row in range(rows):
+        maze_row = []
+        for value in cells[row * cols:(row + 1) * cols]:
+            cell = {}
+            if value & (GATE_BIT - 1):
+                cell["walls"] = [side for bit, side in enumerate(WALL_SIDES) if value >> bit & 1]
+            if value & GATE_BIT:
+                cell["gate"] = True
+            maze_row.append(cell)
+        maze.append(maze_row)
+
+    stairs = []
+    for _ in range(stair_count):
+        row, col, kind = STAIR.unpack_from(buffer, offset)
+        stairs.append({"row": row, "col": col, "type": STAIR_TYPES[kind]})
+        offset += STAIR.size
+    mummies = []
+    for _ in range(mummy_count):
+        row, col, color = MUMMY.unpack_from(buffer, offset)
+        mummies.append({"row": row, "col": col, "color": MUMMY_COLORS[color]})
+        offset += MUMMY.size
+    traps = []
+    for _ in range(trap_count):
+        row, col = TRAP.unpack_from(buffer, offset)
+        traps.append({"row": row, "col": col})
+        offset += TRAP.size
+
+    return {
+        "level": number,
+        "maze": maze,
+        "stairs": stairs,
+        "player_start": {"row": player_row, "col": player_col},
+        "mummies": mummies,
+        "traps": traps,
+    }
+
+
+def write_pack(levels, path):
+    """Ghi các cấp độ (phần tử "levels") ra gói nhị phân `path`; trả về số cấp độ.
+
+    Ghi ra tệp tạm rồi os.replace, nên LevelPack đang mmap tệp cũ không bị
+    đọc dở dữ liệu mới.
+    """
+    levels = sorted(levels, key=lambda data: data["level"])
+    numbers = [data["level"] for data in levels]
+    if len(set(numbers)) != len(numbers):
+        raise ValueError("Số cấp độ bị trùng trong dữ liệu nguồn")
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        # Ghi bản ghi trước (sau chỗ chừa cho index) để không phải giữ cả gói trong RAM
+        offset = HEADER.size + INDEX_ENTRY.size * len(levels)
+        file.seek(offset)
+        index = bytearray()
+        for data in levels:
+            record = encode_level(data)
+            index += INDEX_ENTRY.pack(data["level"], offset)
+            file.write(record)
+            offset += len(record)
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, 0, len(levels)))
+        file.write(index)
+    os.replace(temporary, path)
+    return len(levels)
+
+
+class LevelPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self.count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            self.buffer.close()
+            raise ValueError(f"'{path}' không phải gói cấp độ")
+        if version != VERSION:
+            self.buffer.close()
+            raise ValueError(f"'{path}': phiên bản gói {version} không được hỗ trợ")
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(self.buffer, HEADER.size + position * INDEX_ENTRY.size)
+
+    def numbers(self):
+        """Các số cấp độ trong gói, theo thứ tự tăng dần."""
+        return [self._entry(position)[0] for position in range(self.count)]
+
+    def get(self, level_number):
+        """Dữ liệu cấp độ `level_number`, None nếu gói không có."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            number, offset = self._entry(middle)
+            if number == level_number:
+                return decode_level(self.buffer, offset, number)
+            if number < level_number:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def close(self):
+        self.buffer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Biên dịch tệp cấp độ JSON thành gói nhị phân đọc bằng mmap.")
+    parser.add_argument("levels_file", help="tệp JSON dạng levels.json")
+    parser.add_argument("-o", "--output", help="tệp gói (mặc định: cùng tên, đuôi .mmpk)")
+    parser.add_argument("--verify", action="store_true",
+                        help="mở lại gói và so từng cấp độ đã giải mã với bản biên dịch từ JSON")
+    args = parser.parse_args(argv)
+    output = args.output or os.path.splitext(args.levels_file)[0] + ".mmpk"
+
+    with open(args.levels_file, "r", encoding="utf-8") as file:
+        levels = json.load(file).get("levels", [])
+    count = write_pack(levels, output)
+    print(f"Đã ghi {count} cấp độ vào '{output}' ({os.path.getsize(output):,} byte, "
+          f"JSON {os.path.getsize(args.levels_file):,} byte)")
+
+    if args.verify:
+        from rules import Level
+
+        def signature(data):
+            level = Level.from_data(data)
+            return level.content_hash(), level.player_start
+
+        pack = LevelPack(output)
+        try:
+            mismatched = [data["level"] for data in levels
+                          if signature(pack.get(data["level"])) != signature(data)]
+        finally:
+            pack.close()
+        if mismatched:
+            print(f"Giải mã khác nguồn ở các cấp độ: {mismatched}", file=sys.stderr)
+            return 1
+        print("Mọi cấp độ giải mã khớp với nguồn")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
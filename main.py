@@ -1,32 +1,98 @@
+import time
+STARTUP_START = time.perf_counter()
+import argparse
+import threading
 import pygame
-from images import IMAGES
-from constants import WIDTH, HEIGHT
+from images import IMAGES, convert_images, preload_game_images
+from constants import WIDTH, HEIGHT, FPS, FIXED_DT, STEP_SECONDS
 from sprites import *
 from menu import Menu, transition
 from game import Game
 from audio_manager import AudioManager
 from map import Map
-from level_manager import LevelManager
+from level_manager import LEVELS_PATH, LevelManager
+from dirty_rects import DirtyRectTracker, is_visual_event
+from replay import ReplayRecorder, ReplayViewer, load_replays, session_path
+
+parser = argparse.ArgumentParser(description="Mummy Maze")
+parser.add_argument("--dirty-rects", action="store_true",
+                    help="chỉ cập nhật các vùng màn hình thay đổi thay vì vẽ lại toàn bộ mỗi khung hình")
+parser.add_argument("--levels", default=LEVELS_PATH,
+                    help="tệp cấp độ: levels.json hoặc gói nhị phân do level_pack.py tạo")
+parser.add_argument("--profile-startup", action="store_true",
+                    help="in thời gian của từng giai đoạn khởi động")
+parser.add_argument("--step-ms", type=float, default=STEP_SECONDS * 1000,
+                    help="thời gian hoạt ảnh một bước đi (một ô), tính bằng mili giây")
+parser.add_argument("--turbo", action="store_true",
+                    help="giải quyết mỗi lượt ngay lập tức và chỉ vẽ vị trí cuối (tương đương --step-ms 0)")
+parser.add_argument("--replay", metavar="FILE",
+                    help="xem lại một replay đã ghi thay vì vào menu")
+parser.add_argument("--replay-index", type=int, default=0,
+                    help="lần chơi cần xem trong tệp replay (xem 'python replay.py list FILE')")
+parser.add_argument("--no-record", action="store_true",
+                    help="không ghi replay của phiên này vào replays/")
+parser.add_argument("--seed", type=int,
+                    help="hạt giống sinh seed cho từng lần chơi được ghi")
+args = parser.parse_args()
+
+startup_phases = [("imports", time.perf_counter())]
+
+def mark_startup(phase):
+    startup_phases.append((phase, time.perf_counter()))
 
 pygame.init()
 
 SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("MUMMY MAZE")
+convert_images()
 
 pygame.display.set_icon(IMAGES["icon"])
+mark_startup("display")
 
-audio_manager = AudioManager()
-audio_manager.play_background_music()
-
-level_manager = LevelManager()
+level_manager = LevelManager(args.levels)
 map_instance = Map(SCREEN, level_manager)
 
 menu = Menu(SCREEN, map_instance)
-game = Game(SCREEN, audio_manager, level_manager, map_instance)
+mark_startup("menu assets")
+
+# Hiện ngay khung đầu tiên của hiệu ứng menu trượt vào
+menu.draw_menu(-50, HEIGHT + 50)
+pygame.display.update()
+mark_startup("first menu frame")
+
+audio_manager = AudioManager()
+audio_manager.play_background_music()
+mark_startup("audio")
+
+# Ảnh màn chơi được nạp trên luồng nền trong lúc menu trượt vào
+image_loader = threading.Thread(target=preload_game_images, daemon=True)
+image_loader.start()
 
 transition(SCREEN, menu)
+mark_startup("menu transition")
+image_loader.join()
+mark_startup("wait for game images")
+
+recorder = None if args.no_record or args.replay else ReplayRecorder(session_path(), args.seed)
+game = Game(SCREEN, audio_manager, level_manager, map_instance, recorder)
+game.step_seconds = 0 if args.turbo else args.step_ms / 1000
+mark_startup("game")
+
+if args.profile_startup:
+    previous = STARTUP_START
+    for phase, moment in startup_phases:
+        print(f"{phase:<26} {(moment - previous) * 1000:8.1f} ms   (tổng {(moment - STARTUP_START) * 1000:8.1f} ms)")
+        previous = moment
 
 game_state = "menu"
+viewer = None
+if args.replay:
+    viewer = ReplayViewer(game, load_replays(args.replay)[args.replay_index])
+    if viewer.start():
+        game_state = "replay"
+    else:
+        print(f"Cấp độ {viewer.replay['level']} của replay không còn khớp với '{args.levels}'")
+        viewer = None
 
 title_y = 25
 mummy_y = HEIGHT - 470
@@ -35,16 +101,24 @@ target_y_mummy = HEIGHT - 470
 speed = 0
 
 clock = pygame.time.Clock()
+elapsed = FIXED_DT  # thời gian thực của khung hình trước, giây
 running = True
+dirty_tracker = DirtyRectTracker() if args.dirty_rects else None
 
+def scene_signature():
+    return (game_state, game.static_layer, game.game_over, game.all_levels_completed,
+            game.options_menu.active, game.algorithm_ui.is_expanded,
+            game.algorithm_ui.selected_algorithm, map_instance.selected_level,
+            (viewer.position, viewer.speed, viewer.paused) if viewer else None)
 
 while running:
-    SCREEN.fill((0, 0, 0))
-
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
 
+        if dirty_tracker and is_visual_event(event):
+            dirty_tracker.invalidate()
+
         if event.type == pygame.MOUSEBUTTONDOWN:
             print(pygame.mouse.get_pos())
 
@@ -71,16 +145,42 @@ while running:
             elif game_state == "load_level":
                 game.load_level()
                 game_state = "play"
+        elif game_state == "replay":
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                viewer = None
+                game.game_state = game_state = "menu"
+            else:
+                viewer.handle_event(event)
         
-    if game_state == "menu":
-        menu.draw_menu(title_y, mummy_y)
-    elif game_state == "map":
-        map_instance.active = True
-        map_instance.draw()
-    elif game_state in ["play", "auto_play"]:
-        game.draw_game()
+    if dirty_tracker:
+        dirty_tracker.check_scene(scene_signature())
 
-    pygame.display.flip()
-
-    clock.tick(50)
+    # Chế độ dirty rects: menu và bản đồ tĩnh chỉ vẽ lại khi cảnh đổi; màn chơi
+    # luôn vẽ vì draw_game còn cập nhật hoạt ảnh và va chạm
+    if dirty_tracker is None or dirty_tracker.full or game_state in ["play", "auto_play", "replay"]:
+        SCREEN.fill((0, 0, 0))
+        if game_state == "menu":
+            menu.draw_menu(title_y, mummy_y)
+        elif game_state == "map":
+            map_instance.active = True
+            map_instance.draw()
+        elif game_state in ["play", "auto_play"]:
+            game.draw_game(elapsed)
+        elif game_state == "replay":
+            viewer.advance()
+            game.draw_game(elapsed)
+            viewer.draw(SCREEN)
+
+    if dirty_tracker is None:
+        pygame.display.flip()
+    else:
+        if game_state in ["play", "auto_play", "replay"]:
+            dirty_tracker.track_sprites(game.characters)
+        dirty_tracker.check_scene(scene_signature())
+        dirty_tracker.present()
+
+    elapsed = clock.tick(FPS) / 1000
+game.close()
+if recorder is not None:
+    recorder.close()
 pygame.quit()
\ No newline at end of file
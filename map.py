@@ -1,19 +1,20 @@
 import pygame
 from constants import WIDTH, HEIGHT
+from images import get_image
 
 class Map:
     def __init__(self, map_screen, level_manager):
         self.map_screen = map_screen
         self.level_manager = level_manager
-        self.adventure_map = pygame.image.load("images/adventuremap.jpg")
+        self.adventure_map = get_image("adventuremap.jpg")
         self.active = False
         self.previous_state = None
 
         # Center the map image on the screen
         self.image_rect = self.adventure_map.get_rect(center=(WIDTH // 2, HEIGHT // 2))
 
-        self.save_quit_button = pygame.image.load("images/save_and_quit.png").convert_alpha()
-        self.enter_pyramid_button = pygame.image.load("images/enter_pyramid.png").convert_alpha()
+        self.save_quit_button = get_image("save_and_quit.png")
+        self.enter_pyramid_button = get_image("enter_pyramid.png")
 
         self.save_quit_button = pygame.transform.scale(
             self.save_quit_button,
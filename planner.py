@@ -0,0 +1,58 @@
+"""Lập kế hoạch nước đi của chế độ tự chơi trên một luồng nền.
+
+Game gửi một bản chụp (rules.State bất biến cùng bản sao sổ sách chống lặp)
+cho Planner rồi tiếp tục vẽ và xử lý sự kiện;
+mỗi nhịp logic sau đó hỏi lại (poll) cho tới khi có kết quả. Chỉ có một luồng
+làm việc nên các yêu cầu chạy lần lượt, không bao giờ song song với nhau.
+
+Mỗi yêu cầu gắn với một khóa (trạng thái, thuật toán). Khi người chơi đặt lại
+màn, hoàn tác hoặc đổi thuật toán, cancel() bỏ yêu cầu đang chờ: yêu cầu chưa
+chạy bị hủy hẳn, yêu cầu đang chạy vẫn chạy hết nhưng kết quả bị bỏ qua.
+Hàm kế hoạch không được sửa đối tượng dùng chung với luồng chính: mọi thay
+đổi phải nằm trong giá trị trả về, để luồng chính tự áp dụng khi poll trả
+kết quả cho đúng khóa; nhờ vậy kế hoạch bị bỏ không để lại tác dụng phụ.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class Planner:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planner")
+        self.future = None
+        self.key = None
+
+    @property
+    def busy(self):
+        return self.future is not None and not self.future.done()
+
+    def poll(self, key, wait, plan, *args):
+        """(True, kết quả) nếu kế hoạch cho `key` đã xong, ngược lại (False, None).
+
+        Chưa có yêu cầu cho `key` thì gửi plan(*args) lên luồng nền (bỏ yêu cầu
+        cũ của khóa khác). `wait` là số giây tối đa chờ kết quả trước khi trả về.
+        """
+        if self.future is None or self.key != key:
+            self.cancel()
+            self.key = key
+            self.future = self.executor.submit(plan, *args)
+        try:
+            result = self.future.result(timeout=wait)
+        except TimeoutError:
+            return False, None
+        finally:
+            # Xong (có kết quả hoặc ném lỗi) thì yêu cầu kế tiếp được gửi mới
+            if self.future.done():
+                self.future = None
+                self.key = None
+        return True, result
+
+    def cancel(self):
+        """Bỏ yêu cầu đang chờ (nếu có); kết quả của nó sẽ không bao giờ được dùng."""
+        if self.future is not None:
+            self.future.cancel()
+        self.future = None
+        self.key = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
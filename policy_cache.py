@@ -0,0 +1,175 @@
+"""Bộ nhớ đệm chính sách tối ưu cho từng cấp độ, lưu trên đĩa.
+
+Mỗi cấp độ được định danh bằng rules.Level.content_hash(), nên khi levels.json
+thay đổi thì mã băm đổi theo và chính sách cũ tự động không còn được dùng.
+Chính sách ánh xạ mọi trạng thái đạt tới được (từ bất kỳ ô xuất phát nào) sang
+nước đi tiếp theo, được tính một lần bằng BFS ngược từ các nước thắng.
+"""
+from collections import deque
+import json
+import os
+import threading
+
+import rules
+from state_packing import get_packed_level
+
+POLICY_CACHE_DIR = r"./.policy_cache"
+POLICY_FORMAT_VERSION = 1
+
+# Khoảng cách dùng cho trạng thái không thể thắng nhưng vẫn còn nước đi an toàn
+SURVIVE = -1
+
+# Cấp độ có nhiều trạng thái đạt tới được hơn mức này (mê cung lớn, nhiều xác ướp)
+# thì không lập chính sách; các thuật toán quay về tìm kiếm theo từng lượt
+MAX_POLICY_STATES = 20000
+
+
+class Policy:
+    """Bảng tra mã trạng thái đóng gói -> (hướng đi, số lượt còn lại tới cầu thang)."""
+
+    def __init__(self, level, moves, distances):
+        self.level = level
+        self.moves = moves
+        self.distances = distances
+
+    def best_move(self, state):
+        """Nước đi tối ưu (hoặc nước sống sót nếu không thể thắng), None nếu trạng thái lạ."""
+        d = self.moves.get(get_packed_level(state.level).pack(state))
+        return None if d is None else rules.DIRECTIONS[d]
+
+    def distance(self, state):
+        """Số lượt tới cầu thang khi đi tối ưu; SURVIVE nếu không thể thắng, None nếu trạng thái lạ."""
+        return self.distances.get(get_packed_level(state.level).pack(state))
+
+    def __len__(self):
+        return len(self.moves)
+
+
+def start_states(level):
+    """Trạng thái đầu với người chơi đặt ở mọi ô trống (không bẫy, không xác ướp)."""
+    initial = level.initial_state()
+    occupied = {(row, col) for row, col, _ in initial.mummies} | level.traps
+    return [initial._replace(player=cell) for cell in level.coords if cell not in occupied]
+
+
+def build_policy(level, max_states=MAX_POLICY_STATES):
+    """Duyệt xuôi toàn bộ trạng thái đạt tới được rồi BFS ngược từ các nước thắng.
+
+    Trả về None nếu số trạng thái đạt tới được vượt quá `max_states`.
+    """
+    packed = get_packed_level(level)
+    visited = packed.new_visited(max_states)
+    queue = deque()
+    for state in start_states(level):
+        code = packed.pack(state)
+        if visited.add(code):
+            queue.append(code)
+
+    predecessors = {}
+    survive_moves = {}
+    moves = {}
+    distances = {}
+    frontier = deque()
+    while queue:
+        code = queue.popleft()
+        for d in range(4):
+            child, outcome = packed.successor(code, d)
+            if outcome == rules.WIN:
+                if code not in moves:
+                    moves[code] = d
+                    distances[code] = 1
+                    frontier.append(code)
+                continue
+            if child is None:
+                continue
+            survive_moves.setdefault(code, d)
+            predecessors.setdefault(child, []).append(code * 4 + d)
+            if visited.add(child):
+                queue.append(child)
+        if max_states is not None and len(visited) > max_states:
+            return None
+
+    while frontier:
+        code = frontier.popleft()
+        for link in predecessors.get(code, ()):
+            parent = link >> 2
+            if parent not in moves:
+                moves[parent] = link & 3
+                distances[parent] = distances[code] + 1
+                frontier.append(parent)
+
+    for code, d in survive_moves.items():
+        if code not in moves:
+            moves[code] = d
+            distances[code] = SURVIVE
+
+    return Policy(level, moves, distances)
+
+
+class PolicyCache:
+    """Nạp chính sách theo mã băm cấp độ: bộ nhớ -> tệp trên đĩa -> tính mới rồi lưu lại."""
+
+    def __init__(self, cache_dir=POLICY_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.policies = {}
+        self.lock = threading.Lock()  # luồng lập kế hoạch (planner.py) và luồng chính cùng dùng
+
+    def path_for(self, level):
+        return os.path.join(self.cache_dir, f"{level.content_hash()}.json")
+
+    def get_policy(self, level):
+        """Chính sách của `level`, None nếu cấp độ quá lớn (kết quả này cũng được nhớ lại)."""
+        key = level.content_hash()
+        with self.lock:
+            if key in self.policies:
+                return self.policies[key]
+            policy = self.load(level)
+            if policy is None:
+                policy = build_policy(level)
+                if policy is not None:
+                    self.save(policy)
+            self.policies[key] = policy
+            return policy
+
+    def load(self, level):
+        try:
+            with open(self.path_for(level), "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("version") != POLICY_FORMAT_VERSION or data.get("hash") != level.content_hash():
+            return None
+        moves = {}
+        distances = {}
+        for code, d, distance in data["policy"]:
+            moves[code] = d
+            distances[code] = distance
+        return Policy(level, moves, distances)
+
+    def save(self, policy):
+        data = {
+            "version": POLICY_FORMAT_VERSION,
+            "hash": policy.level.content_hash(),
+            "policy": [[code, d, policy.distances[code]] for code, d in policy.moves.items()],
+        }
+        path = self.path_for(policy.level)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(data, file, separators=(",", ":"))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Không thể lưu chính sách vào '{path}': {e}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_policy(level):
+    """Chính sách của `level` từ bộ nhớ đệm mặc định (nạp lười lần đầu cần đến)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PolicyCache()
+    return _default_cache.get_policy(level)
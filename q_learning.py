@@ -0,0 +1,260 @@
+"""Huấn luyện Q-learning ngoại tuyến trên bộ mô phỏng không giao diện; bảng Q lưu ra .npz.
+
+Ví dụ:
+    python q_learning.py                              # mọi cấp độ trong levels.json
+    python q_learning.py --levels 1,4 --episodes 50000 --batch 1024
+
+Trạng thái gồm ô người chơi, vị trí và màu từng xác ướp và cổng (mã đóng gói
+của state_packing). Mọi trạng thái đạt tới được từ các ô xuất phát được đánh
+số liên tục 0..S-1, nên Q là mảng float32 S x 4. Bảng chuyển trạng thái và
+phần thưởng được tính một lần từ rules; sau đó mỗi lô gồm nhiều ván chạy song
+song chỉ bằng phép toán NumPy trên các bảng đó.
+
+Bảng Q được lưu theo mã băm nội dung cấp độ trong .policy_cache/; chế độ
+q_learning trong game chỉ đọc bảng đã huấn luyện (get_q_table).
+"""
+import argparse
+from collections import deque
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import rules
+from level_manager import LEVELS_PATH, LevelManager
+from policy_cache import MAX_POLICY_STATES, POLICY_CACHE_DIR, start_states
+from state_packing import get_packed_level
+
+WIN_REWARD = 1.0
+DEATH_REWARD = -1.0
+STEP_REWARD = -0.01
+BLOCKED_Q = -1e9  # giá trị cố định của nước bị tường chặn, không bao giờ được chọn
+
+# Trong bảng chuyển: chỉ số >= 0 là trạng thái kế tiếp
+TERMINAL = -1
+BLOCKED = -2
+
+DEFAULT_EPISODES = 20000
+DEFAULT_BATCH = 512
+DEFAULT_MAX_STEPS = 200
+
+
+class QModel:
+    """Bảng chuyển trạng thái (S x 4) và phần thưởng tương ứng của một cấp độ."""
+
+    def __init__(self, level, codes, transitions, rewards, starts):
+        self.level = level
+        self.codes = codes  # numpy.ndarray uint64 đã sắp xếp: chỉ số -> mã trạng thái
+        self.transitions = transitions  # int32 S x 4: trạng thái kế tiếp, TERMINAL hoặc BLOCKED
+        self.rewards = rewards  # float32 S x 4
+        self.starts = starts  # chỉ số các trạng thái xuất phát
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def build_model(level, max_states=MAX_POLICY_STATES):
+    """Duyệt mọi trạng thái đạt tới được; None nếu nhiều hơn `max_states`."""
+    packed = get_packed_level(level)
+    if packed.space_size >= 1 << 63:
+        return None
+    start_codes = {packed.pack(state) for state in start_states(level)}
+    seen = set(start_codes)
+    queue = deque(start_codes)
+    edges = {}
+    while queue:
+        code = queue.popleft()
+        row = []
+        for d in range(4):
+            child, outcome = packed.successor(code, d)
+            row.append((child, outcome))
+            if child is not None and child not in seen:
+                seen.add(child)
+                queue.append(child)
+        edges[code] = row
+        if max_states is not None and len(seen) > max_states:
+            return None
+
+    codes = np.array(sorted(seen), dtype=np.uint64)
+    index = {code: i for i, code in enumerate(codes.tolist())}
+    transitions = np.full((len(codes), 4), BLOCKED, dtype=np.int32)
+    rewards = np.zeros((len(codes), 4), dtype=np.float32)
+    for code, row in edges.items():
+        i = index[code]
+        for d, (child, outcome) in enumerate(row):
+            if outcome == rules.BLOCKED:
+                continue
+            if child is None:
+                transitions[i, d] = TERMINAL
+                rewards[i, d] = WIN_REWARD if outcome == rules.WIN else DEATH_REWARD
+            else:
+                transitions[i, d] = index[child]
+                rewards[i, d] = STEP_REWARD
+    starts = np.array(sorted(index[code] for code in start_codes), dtype=np.int32)
+    return QModel(level, codes, transitions, rewards, starts)
+
+
+def train(model, episodes=DEFAULT_EPISODES, batch=DEFAULT_BATCH, alpha=0.5, gamma=0.95,
+          epsilon_start=1.0, epsilon_end=0.05, max_steps=DEFAULT_MAX_STEPS, seed=0):
+    """Bảng Q (float32 S x 4) sau `episodes` ván, mỗi lô `batch` ván chạy song song.
+
+    Mỗi ván bắt đầu từ một ô xuất phát ngẫu nhiên; ε giảm tuyến tính theo lô.
+    Nước ngẫu nhiên chỉ chọn trong các nước không bị chặn. Khi nhiều ván trong
+    lô cập nhật cùng một ô (s, a), lần gán cuối được giữ lại.
+    """
+    rng = np.random.default_rng(seed)
+    transitions, rewards = model.transitions, model.rewards
+    valid = transitions != BLOCKED
+    movable = valid.any(axis=1)
+    q = np.where(valid, 0.0, BLOCKED_Q).astype(np.float32)
+    batches = max(1, -(-episodes // batch))
+    for b in range(batches):
+        epsilon = epsilon_start + (epsilon_end - epsilon_start) * b / max(1, batches - 1)
+        size = min(batch, episodes - b * batch)
+        states = rng.choice(model.starts, size)
+        for _ in range(max_steps):
+            states = states[movable[states]]
+            if not states.size:
+                break
+            greedy = q[states].argmax(axis=1)
+            random_moves = (rng.random((states.size, 4)) * valid[states]).argmax(axis=1)
+            actions = np.where(rng.random(states.size) < epsilon, random_moves, greedy)
+            following = transitions[states, actions]
+            alive = following >= 0
+            future = np.zeros(states.size, dtype=np.float32)
+            future[alive] = q[following[alive]].max(axis=1)
+            target = rewards[states, actions] + gamma * future
+            q[states, actions] += alpha * (target - q[states, actions])
+            states = following[alive]
+    return q
+
+
+class QTable:
+    """Bảng Q đã huấn luyện: tra nước đi tham lam cho một rules.State."""
+
+    def __init__(self, level, codes, q):
+        self.level = level
+        self.packed = get_packed_level(level)
+        self.codes = codes
+        self.q = q
+
+    def index(self, state):
+        """Chỉ số hàng của trạng thái, None nếu trạng thái không có trong bảng."""
+        code = self.packed.pack(state)
+        if code >= 1 << 64:
+            return None
+        i = int(np.searchsorted(self.codes, np.uint64(code)))
+        if i < len(self.codes) and int(self.codes[i]) == code:
+            return i
+        return None
+
+    def best_move(self, state):
+        """Nước có giá trị Q lớn nhất, None nếu trạng thái lạ hoặc mọi hướng bị chặn."""
+        i = self.index(state)
+        if i is None:
+            return None
+        d = int(self.q[i].argmax())
+        return None if self.q[i, d] <= BLOCKED_Q else rules.DIRECTIONS[d]
+
+    def save(self, path):
+        np.savez_compressed(path, hash=self.level.content_hash(), codes=self.codes, q=self.q)
+
+    @classmethod
+    def load(cls, level, path):
+        with np.load(path) as data:
+            if str(data["hash"]) != level.content_hash():
+                return None
+            return cls(level, data["codes"], data["q"])
+
+
+def q_table_path(level, cache_dir=POLICY_CACHE_DIR):
+    return os.path.join(cache_dir, f"{level.content_hash()}.qtable.npz")
+
+
+_q_tables = {}
+_q_tables_lock = threading.Lock()  # luồng lập kế hoạch (planner.py) và luồng chính cùng dùng
+
+
+def get_q_table(level, cache_dir=POLICY_CACHE_DIR):
+    """Bảng Q đã huấn luyện của `level` (nhớ lại theo mã băm), None nếu chưa huấn luyện."""
+    key = level.content_hash()
+    with _q_tables_lock:
+        if key not in _q_tables:
+            try:
+                _q_tables[key] = QTable.load(level, q_table_path(level, cache_dir))
+            except (OSError, ValueError, KeyError):
+                _q_tables[key] = None
+        return _q_tables[key]
+
+
+def train_q_table(level, episodes=DEFAULT_EPISODES, batch=DEFAULT_BATCH, alpha=0.5, gamma=0.95,
+                  max_steps=DEFAULT_MAX_STEPS, seed=0, cache_dir=POLICY_CACHE_DIR):
+    """Huấn luyện, lưu vào `cache_dir` và nhớ lại bảng Q của `level`; None nếu quá nhiều trạng thái."""
+    model = build_model(level)
+    if model is None:
+        return None
+    q = train(model, episodes, batch, alpha, gamma, max_steps=max_steps, seed=seed)
+    table = QTable(level, model.codes, q)
+    os.makedirs(cache_dir, exist_ok=True)
+    table.save(q_table_path(level, cache_dir))
+    with _q_tables_lock:
+        _q_tables[level.content_hash()] = table
+    return table
+
+
+def greedy_rollout(table, state, max_turns=DEFAULT_MAX_STEPS):
+    """(kết quả, số lượt) khi đi tham lam theo bảng Q từ `state`."""
+    for turn in range(1, max_turns + 1):
+        direction = table.best_move(state)
+        if direction is None:
+            return "stuck", turn - 1
+        state, outcome = rules.step(state, direction)
+        if outcome in rules.TERMINAL_OUTCOMES:
+            return outcome, turn
+    return "turn_limit", max_turns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Huấn luyện bảng Q cho từng cấp độ và lưu ra .npz.")
+    parser.add_argument("levels_file", nargs="?", default=LEVELS_PATH)
+    parser.add_argument("--levels", help="danh sách số cấp độ, ví dụ 1,4,6")
+    parser.add_argument("--episodes", type=int, default=DEFAULT_EPISODES)
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="số ván chạy song song mỗi lô")
+    parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--gamma", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=POLICY_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    level_manager = LevelManager(args.levels_file)
+    numbers = ([int(n) for n in args.levels.split(",")] if args.levels
+               else range(1, level_manager.get_level_count() + 1))
+    failed = 0
+    for number in numbers:
+        level = level_manager.compile_level(number)
+        if level is None:
+            print(f"Level {number}: không có trong '{args.levels_file}'")
+            failed += 1
+            continue
+        start = time.perf_counter()
+        table = train_q_table(level, args.episodes, args.batch, args.alpha, args.gamma,
+                              args.max_steps, args.seed, args.cache_dir)
+        if table is None:
+            print(f"Level {number}: quá nhiều trạng thái để lập bảng Q")
+            failed += 1
+            continue
+        elapsed = time.perf_counter() - start
+        path = q_table_path(level, args.cache_dir)
+        outcome, turns = greedy_rollout(table, level.initial_state(), args.max_steps)
+        print(f"Level {number}: {len(table.codes)} trạng thái, {args.episodes} ván trong {elapsed:.2f}s "
+              f"({args.episodes / elapsed:,.0f} ván/s) -> {outcome} sau {turns} lượt; đã lưu '{path}'")
+        if outcome != rules.WIN:
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""Ghi lại từng lượt chơi (thủ công hoặc tự động) và phát lại không cần cửa sổ.
+
+Ví dụ:
+    python replay.py verify replays/20261018-153000.jsonl    # mô phỏng lại, so kết quả
+    python replay.py list replays/20261018-153000.jsonl
+    python main.py --replay replays/20261018-153000.jsonl --replay-index 3   # xem trong game
+
+Mỗi lần chơi một cấp độ (tới khi tải lại cấp độ, sang cấp khác hoặc thoát)
+là một dòng JSON trong tệp replay của phiên:
+    {"version": 1, "level": 4, "hash": "...", "algorithm": "bfs", "seed": 123,
+     "moves": "RRUL<D", "outcome": "caught"}
+`moves` gồm một ký tự cho mỗi lượt (U/D/L/R) và "<" cho mỗi lần hoàn tác.
+Luật chơi là tất định nên danh sách lượt đủ để tái hiện ván chơi; `seed` là
+giá trị random.seed() được đặt khi bắt đầu lần chơi, để chạy lại đúng các lựa
+chọn ngẫu nhiên của thuật toán tự động.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import rules
+from level_manager import LEVELS_PATH, LevelManager
+
+REPLAY_DIR = r"./replays"
+REPLAY_FORMAT_VERSION = 1
+UNDO = "<"
+MOVE_TOKENS = {"up": "U", "down": "D", "left": "L", "right": "R"}
+TOKEN_MOVES = {token: direction for direction, token in MOVE_TOKENS.items()}
+
+
+class ReplayRecorder:
+    """Ghi các lần chơi của một phiên, mỗi lần một dòng, vào `path`."""
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.rng = random.Random(seed)
+        self.file = None
+        self.current = None
+
+    def start_attempt(self, level_number, level):
+        """Kết thúc lần chơi trước rồi bắt đầu lần mới; đặt random.seed() cho lần mới."""
+        self.finish_attempt()
+        seed = self.rng.randrange(1 << 31)
+        random.seed(seed)
+        self.current = {
+            "version": REPLAY_FORMAT_VERSION,
+            "level": level_number,
+            "hash": level.content_hash(),
+            "algorithm": "manual",
+            "seed": seed,
+            "moves": [],
+            "outcome": rules.MOVED,
+        }
+
+    def record_move(self, direction, outcome, algorithm):
+        if self.current is not None:
+            self.current["moves"].append(MOVE_TOKENS[direction])
+            self.current["outcome"] = outcome
+            self.current["algorithm"] = algorithm
+
+    def record_undo(self):
+        if self.current is not None and self.current["moves"]:
+            self.current["moves"].append(UNDO)
+            self.current["outcome"] = rules.MOVED
+
+    def finish_attempt(self):
+        """Ghi lần chơi hiện tại ra tệp (bỏ qua nếu chưa đi lượt nào)."""
+        current, self.current = self.current, None
+        if not current or not current["moves"]:
+            return
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(json.dumps(dict(current, moves="".join(current["moves"])),
+                                   separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.finish_attempt()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def session_path(replay_dir=REPLAY_DIR):
+    return os.path.join(replay_dir, time.strftime("%Y%m%d-%H%M%S") + ".jsonl")
+
+
+def load_replays(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def simulate(level, moves):
+    """(kết quả của lượt cuối, trạng thái cuối) khi chơi lại chuỗi `moves` từ đầu cấp độ."""
+    state = level.initial_state()
+    history = []
+    outcome = rules.MOVED
+    for token in moves:
+        if token == UNDO:
+            if history:
+                state = history.pop()
+            outcome = rules.MOVED
+            continue
+        next_state, outcome = rules.step(state, TOKEN_MOVES[token])
+        if outcome != rules.BLOCKED:
+            history.append(state)
+            state = next_state
+    return outcome, state
+
+
+def verify(replays, level_manager):
+    """[(chỉ số, replay, kết quả mô phỏng, lỗi hoặc None)]."""
+    results = []
+    for index, replay in enumerate(replays):
+        level = level_manager.compile_level(replay["level"])
+        if level is None:
+            results.append((index, replay, None, "cấp độ không có trong tệp cấp độ"))
+            continue
+        if level.content_hash() != replay["hash"]:
+            results.append((index, replay, None, "cấp độ đã thay đổi kể từ khi ghi"))
+            continue
+        outcome, _ = simulate(level, replay["moves"])
+        error = None if outcome == replay["outcome"] else f"ghi {replay['outcome']}, mô phỏng ra {outcome}"
+        results.append((index, replay, outcome, error))
+    return results
+
+
+class ReplayViewer:
+    """Phát lại một replay trong game: Space tạm dừng, phải/lên tua nhanh, trái/xuống chậm lại."""
+
+    SPEEDS = (1, 2, 4, 8, 16, 32)
+
+    def __init__(self, game, replay):
+        import pygame
+
+        self.game = game
+        self.replay = replay
+        self.moves = replay["moves"]
+        self.position = 0
+        self.speed_index = 0
+        self.paused = False
+        self.font = pygame.font.Font(None, 24)
+
+    def start(self):
+        """Tải cấp độ của replay vào game; False nếu cấp độ không còn hoặc đã bị sửa."""
+        level_manager = self.game.level_manager
+        level = level_manager.compile_level(self.replay["level"])
+        if level is None or level.content_hash() != self.replay["hash"]:
+            return False
+        level_manager.current_level = self.replay["level"] - 1
+        self.game.game_state = "replay"
+        self.game.load_level()
+        self.position = 0
+        return True
+
+    @property
+    def speed(self):
+        return self.SPEEDS[self.speed_index]
+
+    @property
+    def finished(self):
+        return self.position >= len(self.moves)
+
+    def handle_event(self, event):
+        import pygame
+
+        if event.type != pygame.KEYDOWN:
+            return
+        if event.key == pygame.K_SPACE:
+            self.paused = not self.paused
+        elif event.key in (pygame.K_RIGHT, pygame.K_UP):
+            self.speed_index = min(self.speed_index + 1, len(self.SPEEDS) - 1)
+        elif event.key in (pygame.K_LEFT, pygame.K_DOWN):
+            self.speed_index = max(self.speed_index - 1, 0)
+
+    def advance(self):
+        """Gọi mỗi khung hình trước game.draw_game().
+
+        draw_game đã chạy các nhịp logic của thời gian thực, nên ở tốc độ xN
+        viewer chạy thêm N-1 nhịp; lượt kế tiếp chỉ được đi khi hoạt ảnh của
+        lượt trước xong.
+        """
+        game = self.game
+        for tick in range(self.speed):
+            if not self.paused and not self.finished and not game.characters_moving():
+                token = self.moves[self.position]
+                self.position += 1
+                if token == UNDO:
+                    game.undo_last_move()
+                else:
+                    game.play_turn(TOKEN_MOVES[token])
+            if tick < self.speed - 1:
+                game.update()
+
+    def draw(self, screen):
+        state = "PAUSED" if self.paused else ("END" if self.finished else f"x{self.speed}")
+        text = (f"REPLAY  level {self.replay['level']}  {self.replay['algorithm']}  "
+                f"{self.position}/{len(self.moves)}  {state}")
+        screen.blit(self.font.render(text, True, (255, 255, 255)), (12, 8))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kiểm tra hoặc liệt kê các replay đã ghi.")
+    parser.add_argument("command", choices=("verify", "list"))
+    parser.add_argument("replay_file")
+    parser.add_argument("--levels-file", default=LEVELS_PATH)
+    args = parser.parse_args(argv)
+
+    replays = load_replays(args.replay_file)
+    if args.command == "list":
+        for index, replay in enumerate(replays):
+            turns = sum(1 for token in replay["moves"] if token != UNDO)
+            print(f"{index:>4}  level {replay['level']:<4} {replay['algorithm']:<22} "
+                  f"{turns:>5} lượt  {replay['outcome']:<8} seed {replay['seed']}")
+        return 0
+
+    start = time.perf_counter()
+    results = verify(replays, LevelManager(args.levels_file))
+    elapsed = time.perf_counter() - start
+    failures = 0
+    for index, replay, outcome, error in results:
+        if error:
+            failures += 1
+            print(f"{index:>4}  level {replay['level']}: LỖI - {error}")
+        else:
+            print(f"{index:>4}  level {replay['level']}: {outcome} sau {len(replay['moves'])} ký tự, khớp")
+    turns = sum(len(replay["moves"]) for replay in replays)
+    print(f"Đã mô phỏng {len(replays)} replay ({turns} lượt) trong {elapsed * 1000:.1f} ms")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Luật chơi Mummy Maze, tách hoàn toàn khỏi pygame.
+
+Mọi quy tắc của một lượt (người chơi đi, mỗi xác ướp đi tối đa 2 bước theo
+thứ tự ưu tiên màu, bẫy, cầu thang, hai xác ướp nhập làm một) đều nằm ở đây.
+`Game` và các thuật toán trong `agent.py` chỉ gọi `step()` để tiến trạng thái.
+"""
+from collections import namedtuple
+import hashlib
+import json
+
+DIRECTIONS = ("up", "down", "left", "right")
+DELTAS = {"up": (-1, 0), "down": (1, 0), "left": (0, -1), "right": (0, 1)}
+# Chỉ số hướng trong bảng di chuyển; bit (1 << index) trong các mặt nạ ô
+DIRECTION_INDEX = {direction: index for index, direction in enumerate(DIRECTIONS)}
+# Tên cạnh tường trong levels.json ứng với mỗi hướng đi
+WALL_SIDES = {"up": "top", "down": "bottom", "left": "left", "right": "right"}
+OPPOSITE_SIDES = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
+
+# Thứ tự ưu tiên hướng đi khi có nhiều bước cùng rút ngắn khoảng cách
+MUMMY_PRIORITY = {
+    "white": ("left", "right", "up", "down"),
+    "red": ("up", "down", "left", "right"),
+}
+MUMMY_PRIORITY_INDEX = {
+    color: tuple(DIRECTION_INDEX[d] for d in priority) for color, priority in MUMMY_PRIORITY.items()
+}
+# MUMMY_CHOICE[color][moves]: hướng được chọn khi tập hướng hợp lệ là mặt nạ `moves` (-1 nếu rỗng)
+MUMMY_CHOICE = {
+    color: tuple(next((d for d in priority if moves >> d & 1), -1) for moves in range(16))
+    for color, priority in MUMMY_PRIORITY_INDEX.items()
+}
+MUMMY_STEPS = 2
+
+# Kết quả của một lượt
+BLOCKED = "blocked"  # Nước đi không hợp lệ, không tốn lượt
+MOVED = "moved"      # Lượt đi bình thường
+WIN = "win"          # Người chơi tới cầu thang
+TRAPPED = "trapped"  # Người chơi rơi vào bẫy
+CAUGHT = "caught"    # Người chơi bị xác ướp bắt
+
+TERMINAL_OUTCOMES = (WIN, TRAPPED, CAUGHT)
+
+# Trạng thái bất biến. `mummies` là tuple (row, col, color) theo thứ tự của
+# xác ướp trong dữ liệu cấp độ (con đã bị nhập thì bị bỏ). Thứ tự quyết định
+# con nào còn lại khi hai con nhập làm một nên là một phần của trạng thái; nó
+# luôn là dãy con của thứ tự ban đầu nên không làm tăng số trạng thái.
+State = namedtuple("State", ["level", "player", "mummies", "gate_closed"])
+
+# Chi tiết một lượt, dùng cho phần hiển thị:
+# mummy_steps[i] là các bước (direction, row, col) của xác ướp thứ i trong
+# trạng thái cũ; survivors là chỉ số (theo trạng thái cũ) của các xác ướp còn
+# lại, theo đúng thứ tự của chúng trong trạng thái mới.
+Turn = namedtuple("Turn", ["state", "outcome", "mummy_steps", "survivors"])
+
+
+def manhattan_distance(row1, col1, row2, col2):
+    return abs(row1 - row2) + abs(col1 - col2)
+
+
+class Level:
+    """Dữ liệu tĩnh của một cấp độ, biên dịch một lần thành bảng tra cứu.
+
+    Ô (row, col) có chỉ số `row * cols + col`. Với mỗi ô:
+    - `open_mask[i]`: 4 bit, bit d bật nếu đi được theo hướng d (đã xét tường cả hai phía);
+    - `gate_mask[i]`: như open_mask nhưng khi cổng đóng;
+    - `exit_mask[i]`: bit d bật nếu bước theo hướng d là tới cầu thang (chỉ người chơi);
+    - `trap_mask[i]`: 1 nếu ô có bẫy.
+    `neighbors[i * 4 + d]` là chỉ số ô kề theo hướng d (-1 nếu ra ngoài mê cung).
+    """
+
+    def __init__(self, maze, stairs, player_start=None, mummies=(), traps=()):
+        self.maze = maze
+        self.rows = len(maze)
+        self.cols = len(maze[0]) if self.rows > 0 else 0
+        self.stairs = frozenset((s["row"], s["col"]) for s in stairs)
+        self.traps = frozenset((t["row"], t["col"]) for t in traps)
+        self.gates = frozenset(
+            (row, col)
+            for row in range(self.rows)
+            for col in range(self.cols)
+            if maze[row][col].get("gate")
+        )
+        player_start = player_start or {"row": 0, "col": 0}
+        self.player_start = (player_start["row"], player_start["col"])
+        self.mummies_start = tuple(
+            (m["row"], m["col"], normalize_color(m.get("color", "white"))) for m in mummies
+        )
+        self._content_hash = None
+        self._compile()
+
+    @classmethod
+    def from_data(cls, data):
+        """Tạo Level từ một phần tử trong mảng "levels" của levels.json."""
+        return cls(
+            data["maze"],
+            data["stairs"],
+            data.get("player_start", {"row": 0, "col": 0}),
+            data.get("mummies", []),
+            data.get("traps", []),
+        )
+
+    def _compile(self):
+        size = self.rows * self.cols
+        self.size = size
+        self.coords = [(row, col) for row in range(self.rows) for col in range(self.cols)]
+        self.neighbors = [-1] * (size * 4)
+        self.open_mask = bytearray(size)
+        self.gate_mask = bytearray(size)
+        self.exit_mask = bytearray(size)
+        self.trap_mask = bytearray(size)
+        self.exit_targets = {}
+
+        for index, (row, col) in enumerate(self.coords):
+            if (row, col) in self.traps:
+                self.trap_mask[index] = 1
+            walls = self.maze[row][col].get("walls", ())
+            for d, direction in enumerate(DIRECTIONS):
+                dr, dc = DELTAS[direction]
+                new_row, new_col = row + dr, col + dc
+                bit = 1 << d
+                if (new_row, new_col) in self.stairs:
+                    self.exit_mask[index] |= bit
+                    self.exit_targets[index * 4 + d] = (new_row, new_col)
+                if not self.in_bounds(new_row, new_col):
+                    continue
+                target = new_row * self.cols + new_col
+                self.neighbors[index * 4 + d] = target
+                side = WALL_SIDES[direction]
+                if side in walls or OPPOSITE_SIDES[side] in self.maze[new_row][new_col].get("walls", ()):
+                    continue
+                self.open_mask[index] |= bit
+                if (new_row, new_col) not in self.gates:
+                    self.gate_mask[index] |= bit
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def cell_index(self, row, col):
+        return row * self.cols + col
+
+    def mummy_target(self, row, col, direction, gate_closed=False):
+        """Ô đích khi xác ướp (hoặc người chơi bên trong mê cung) đi theo `direction`, None nếu bị chặn."""
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        index = row * self.cols + col
+        d = DIRECTION_INDEX[direction]
+        masks = self.gate_mask if gate_closed else self.open_mask
+        if masks[index] >> d & 1:
+            return self.coords[self.neighbors[index * 4 + d]]
+        return None
+
+    def player_target(self, row, col, direction, gate_closed=False):
+        """Ô đích của người chơi; cầu thang luôn bước vào được dù nằm ngoài mê cung."""
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return None
+        index = row * self.cols + col
+        d = DIRECTION_INDEX[direction]
+        if self.exit_mask[index] >> d & 1:
+            return self.exit_targets[index * 4 + d]
+        masks = self.gate_mask if gate_closed else self.open_mask
+        if masks[index] >> d & 1:
+            return self.coords[self.neighbors[index * 4 + d]]
+        return None
+
+    def content_hash(self):
+        """Mã băm nội dung luật chơi (tường, cầu thang, bẫy, cổng, xác ướp), không gồm vị trí xuất phát."""
+        if self._content_hash is None:
+            content = {
+                "rows": self.rows,
+                "cols": self.cols,
+                "open": list(self.open_mask),
+                "gates": sorted(self.gates),
+                "stairs": sorted(self.stairs),
+                "traps": sorted(self.traps),
+                "mummies": list(self.mummies_start),  # thứ tự quyết định con nào còn lại khi nhập
+            }
+            encoded = json.dumps(content, sort_keys=True).encode("utf-8")
+            self._content_hash = hashlib.sha1(encoded).hexdigest()
+        return self._content_hash
+
+    def initial_state(self):
+        return State(self, self.player_start, self.mummies_start, False)
+
+
+def normalize_color(color):
+    color = color.lower()
+    return color if color in MUMMY_PRIORITY else "white"
+
+
+def mummy_steps(level, row, col, color, player, gate_closed=False):
+    """Các bước (direction, row, col) mà một xác ướp đi trong một lượt.
+
+    Mỗi bước phải rút ngắn khoảng cách Manhattan tới người chơi; khi có nhiều
+    lựa chọn, xác ướp trắng ưu tiên đi ngang, xác ướp đỏ ưu tiên đi dọc.
+    """
+    player_row, player_col = player
+    masks = level.gate_mask if gate_closed else level.open_mask
+    neighbors = level.neighbors
+    coords = level.coords
+    index = row * level.cols + col
+    steps = []
+    for _ in range(MUMMY_STEPS):
+        # Hướng d rút ngắn khoảng cách khi người chơi nằm về phía đó
+        closer = ((player_row < row) | (player_row > row) << 1
+                  | (player_col < col) << 2 | (player_col > col) << 3)
+        moves = masks[index] & closer
+        if not moves:
+            break
+        d = MUMMY_CHOICE[color][moves]
+        index = neighbors[index * 4 + d]
+        row, col = coords[index]
+        steps.append((DIRECTIONS[d], row, col))
+    return steps
+
+
+def mummy_destination(level, index, color, player_row, player_col, gate_closed=False):
+    """Như mummy_steps nhưng chỉ trả về chỉ số ô cuối cùng, dùng trong vòng lặp tìm kiếm."""
+    masks = level.gate_mask if gate_closed else level.open_mask
+    neighbors = level.neighbors
+    choice = MUMMY_CHOICE[color]
+    row, col = level.coords[index]
+    for _ in range(MUMMY_STEPS):
+        moves = masks[index] & ((player_row < row) | (player_row > row) << 1
+                                | (player_col < col) << 2 | (player_col > col) << 3)
+        if not moves:
+            break
+        index = neighbors[index * 4 + choice[moves]]
+        row, col = level.coords[index]
+    return index
+
+
+def step_detail(state, action):
+    """Giải quyết trọn một lượt và trả về `Turn` kèm đường đi của từng xác ướp."""
+    level = state.level
+    target = level.player_target(state.player[0], state.player[1], action, state.gate_closed)
+    if target is None:
+        return Turn(state, BLOCKED, tuple(() for _ in state.mummies), tuple(range(len(state.mummies))))
+
+    paths = []
+    moved = []
+    for row, col, color in state.mummies:
+        path = mummy_steps(level, row, col, color, target, state.gate_closed)
+        paths.append(tuple(path))
+        if path:
+            row, col = path[-1][1], path[-1][2]
+        moved.append((row, col, color))
+
+    # Hai xác ướp chung một ô thì chỉ giữ lại con đứng trước trong danh sách của cấp độ
+    occupied = set()
+    survivors = []
+    for index, (row, col, _) in enumerate(moved):
+        if (row, col) not in occupied:
+            occupied.add((row, col))
+            survivors.append(index)
+    mummies = tuple(moved[index] for index in survivors)
+
+    if target in level.traps:
+        outcome = TRAPPED
+    elif target in level.stairs:
+        outcome = WIN
+    elif target in occupied:
+        outcome = CAUGHT
+    else:
+        outcome = MOVED
+
+    new_state = State(level, target, mummies, state.gate_closed)
+    return Turn(new_state, outcome, tuple(paths), tuple(survivors))
+
+
+def step(state, action):
+    """Tiến một lượt: trả về (trạng thái mới, kết quả)."""
+    turn = step_detail(state, action)
+    return turn.state, turn.outcome
+
+
+def legal_actions(state):
+    """Các hướng người chơi có thể đi từ trạng thái hiện tại."""
+    row, col = state.player
+    return [d for d in DIRECTIONS if state.level.player_target(row, col, d, state.gate_closed) is not None]
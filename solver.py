@@ -0,0 +1,73 @@
+"""Bộ giải chính xác: BFS trên toàn bộ không gian trạng thái thật của một cấp độ.
+
+Trạng thái gồm vị trí người chơi, từng xác ướp kèm màu và trạng thái cổng;
+trạng thái con được sinh bởi đúng luật trong rules.py (qua state_packing),
+nên lời giải trả về là ngắn nhất, còn khi hàng đợi cạn mà chưa tới cầu thang
+thì đó là chứng minh cấp độ không có lời giải.
+"""
+from collections import namedtuple
+
+import rules
+from state_packing import get_packed_level
+
+# moves: danh sách hướng đi ngắn nhất (None nếu không giải được)
+# expanded: số trạng thái đã mở rộng; reachable: số trạng thái đạt tới được
+# complete: True nếu đã duyệt hết không gian (khi đó moves=None là chứng minh vô nghiệm);
+#           False nếu dừng vì max_depth hoặc max_expanded
+Solution = namedtuple("Solution", ["moves", "expanded", "reachable", "complete"])
+
+
+def solve(level, state=None, max_depth=None, max_expanded=None):
+    """Tìm chuỗi nước đi ngắn nhất từ `state` (mặc định là trạng thái đầu của level).
+
+    `max_expanded` giới hạn số trạng thái được mở rộng, để mê cung lớn nhiều
+    xác ướp vẫn trả lời kịp trong một khung hình.
+    """
+    if state is None:
+        state = level.initial_state()
+    packed = get_packed_level(level)
+    root = packed.pack(state)
+    # Mỗi trạng thái mở rộng thêm tối đa 4 con: với max_expanded nhỏ thì dùng set thay vì bitmap cả không gian
+    visited = packed.new_visited(None if max_expanded is None else 4 * max_expanded + 1)
+    visited.add(root)
+    parents = {root: -1}
+    frontier = [root]
+    expanded = 0
+    depth = 0
+
+    while frontier:
+        if max_depth is not None and depth >= max_depth:
+            return Solution(None, expanded, len(visited), False)
+        next_frontier = []
+        for code in frontier:
+            if max_expanded is not None and expanded >= max_expanded:
+                return Solution(None, expanded, len(visited), False)
+            expanded += 1
+            for d in range(4):
+                child, outcome = packed.successor(code, d)
+                if outcome == rules.WIN:
+                    moves = packed.path_to(parents, code)
+                    moves.append(rules.DIRECTIONS[d])
+                    return Solution(moves, expanded, len(visited), True)
+                if child is None or not visited.add(child):
+                    continue
+                parents[child] = code * 4 + d
+                next_frontier.append(child)
+        frontier = next_frontier
+        depth += 1
+
+    return Solution(None, expanded, len(visited), True)
+
+
+def is_solvable(level, state=None):
+    return solve(level, state).moves is not None
+
+
+def replay(state, moves):
+    """Chạy lại `moves` bằng rules.step; trả về (trạng thái cuối, kết quả cuối)."""
+    outcome = rules.MOVED
+    for move in moves:
+        state, outcome = rules.step(state, move)
+        if outcome in rules.TERMINAL_OUTCOMES:
+            break
+    return state, outcome
@@ -1,79 +1,87 @@
 import pygame
-from constants import CELL_SIZE, WIDTH, HEIGHT
+from constants import FIXED_DT, STEP_SECONDS
+from board import DEFAULT_BOARD
+from images import character_frames, get_image
 import heapq
 import random
-import numpy as np
+from rules import mummy_steps
 
 class Wall(pygame.sprite.Sprite):
-    def __init__(self, x, y, wall_type):
+    def __init__(self, x, y, wall_type, board=DEFAULT_BOARD):
         super().__init__()
         if wall_type == "W_h":
-            self.image = pygame.image.load("images/wall_horizontal.png")
+            name = "wall_horizontal.png"
         elif wall_type == "W_v":
-            self.image = pygame.image.load("images/wall_vertical.png")
+            name = "wall_vertical.png"
         else:
             raise ValueError(f"Loại tường không hợp lệ: {wall_type}")
-        self.image = pygame.transform.scale(self.image, (CELL_SIZE, CELL_SIZE))
+        self.image = get_image(name, board.cell_size)
         self.rect = self.image.get_rect(topleft=(x, y))
-        self.grid_x = (y - 80) // CELL_SIZE
-        self.grid_y = (x - 215) // CELL_SIZE
+        self.grid_x, self.grid_y = board.to_cell(x, y)
 
 class Stair(pygame.sprite.Sprite):
-    def __init__(self, x, y, stair_type):
+    def __init__(self, x, y, stair_type, board=DEFAULT_BOARD):
         super().__init__()
         if stair_type == "S_r":
-            self.image = pygame.image.load("images/stairs_right.png")
+            name = "stairs_right.png"
         elif stair_type == "S_l":
-            self.image = pygame.image.load("images/stairs_left.png")
+            name = "stairs_left.png"
         elif stair_type == "S_t":
-            self.image = pygame.image.load("images/stairs_top.png")
+            name = "stairs_top.png"
         elif stair_type == "S_b":
-            self.image = pygame.image.load("images/stairs_bottom.png")
+            name = "stairs_bottom.png"
         else:
             raise ValueError(f"Loại cầu thang không hợp lệ: {stair_type}")
-        self.image = pygame.transform.scale(self.image, (CELL_SIZE, CELL_SIZE))
+        self.image = get_image(name, board.cell_size)
         self.rect = self.image.get_rect(topleft=(x, y))
-        self.grid_x = (y - 80) // CELL_SIZE
-        self.grid_y = (x - 215) // CELL_SIZE
+        self.grid_x, self.grid_y = board.to_cell(x, y)
 
 class Trap(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, board=DEFAULT_BOARD):
         super().__init__()
-        self.image = pygame.image.load("images/trap_skull.png")
-        self.image = pygame.transform.scale(self.image, (CELL_SIZE, CELL_SIZE))
+        self.image = get_image("trap_skull.png", board.cell_size)
         self.rect = self.image.get_rect(topleft=(x, y))
-        self.grid_x = (y - 80) // CELL_SIZE
-        self.grid_y = (x - 215) // CELL_SIZE
+        self.grid_x, self.grid_y = board.to_cell(x, y)
 
 class Gate(pygame.sprite.Sprite):
-    def __init__(self, x, y):
+    def __init__(self, x, y, board=DEFAULT_BOARD):
         super().__init__()
-        self.image = pygame.image.load("images/gate6.png")
-        self.image = pygame.transform.scale(self.image, (CELL_SIZE, CELL_SIZE))
+        self.image = get_image("gate6.png", board.cell_size)
         self.rect = self.image.get_rect(topleft=(x, y))
-        self.grid_x = (y - 80) // CELL_SIZE
-        self.grid_y = (x - 215) // CELL_SIZE
+        self.grid_x, self.grid_y = board.to_cell(x, y)
         self.is_closed = True
 
 class Character(pygame.sprite.Sprite):
-    def __init__(self, x, y, images):
+    def __init__(self, x, y, images, board=DEFAULT_BOARD):
         super().__init__()
         self.images = images
+        self.board = board
         self.direction = "down"
         self.image = self.images[self.direction][0]
         self.rect = self.image.get_rect(topleft=(x, y))
-        self.row = (y - 80) // CELL_SIZE
-        self.col = (x - 215) // CELL_SIZE
+        self.row, self.col = board.to_cell(x, y)
         self.grid_x = self.row
         self.grid_y = self.col
         self.moving = False
-        self.move_speed = 2
         self.target_pos = (x, y)
         self.current_pos = [float(x), float(y)]
         self.frame_index = 0
         self.last_update = pygame.time.get_ticks()
         self.move_queue = []  # Hàng đợi lưu trữ các bước di chuyển
 
+    def place(self, row, col):
+        """Đặt ngay nhân vật vào ô (row, col), bỏ hoạt ảnh và các bước đang chờ."""
+        x, y = self.board.to_pixel(row, col)
+        self.row, self.col = row, col
+        self.grid_x, self.grid_y = row, col
+        self.rect.topleft = (x, y)
+        self.target_pos = (x, y)
+        self.current_pos = [float(x), float(y)]
+        self.moving = False
+        self.move_queue = []
+        self.frame_index = 0
+        self.image = self.images[self.direction][0]
+
     def update_image(self):
         if self.moving:
             now = pygame.time.get_ticks()
@@ -85,13 +93,25 @@ class Character(pygame.sprite.Sprite):
             self.frame_index = 0
             self.image = self.images[self.direction][0]
 
-    def update(self):
-        if self.moving:
+    def update(self, dt=FIXED_DT, step_seconds=STEP_SECONDS):
+        """Tiến hoạt ảnh thêm `dt` giây, mỗi ô mất `step_seconds` giây (0: nhảy ngay tới ô cuối)."""
+        if not self.moving:
+            return
+        if step_seconds <= 0:
+            if self.move_queue:
+                self.direction, self.row, self.col = self.move_queue[-1]
+            self.place(self.row, self.col)
+            return
+
+        # Quãng đường theo thời gian, phần còn dư khi tới ô được dùng cho bước kế tiếp trong hàng đợi
+        travel = self.board.cell_size / step_seconds * dt
+        while self.moving and travel > 0:
             target_x, target_y = self.target_pos
             dx = target_x - self.current_pos[0]
             dy = target_y - self.current_pos[1]
             distance = (dx**2 + dy**2)**0.5
-            if distance <= self.move_speed:
+            if distance <= travel:
+                travel -= distance
                 self.current_pos = [target_x, target_y]
                 self.rect.topleft = (target_x, target_y)
                 self.moving = False
@@ -103,82 +123,31 @@ class Character(pygame.sprite.Sprite):
                     new_row, new_col = next_move[1], next_move[2]
                     self.row, self.col = new_row, new_col
                     self.grid_x, self.grid_y = self.row, self.col
-                    self.target_pos = (215 + self.col * CELL_SIZE, 80 + self.row * CELL_SIZE)
+                    self.target_pos = self.board.to_pixel(self.row, self.col)
                     self.moving = True
                     self.update_image()
             else:
-                move_x = (dx / distance) * self.move_speed
-                move_y = (dy / distance) * self.move_speed
-                self.current_pos[0] += move_x
-                self.current_pos[1] += move_y
+                self.current_pos[0] += dx / distance * travel
+                self.current_pos[1] += dy / distance * travel
                 self.rect.topleft = (self.current_pos[0], self.current_pos[1])
+                travel = 0
                 self.update_image()
 
-    def eligible_move(self, maze, gate, new_row, new_col, is_player=False, stairs_positions=None):
-        max_row = len(maze)
-        max_col = len(maze[0])
-
-        # Allow player to move to stairs even if outside maze
-        if is_player and stairs_positions:
-            for stair in stairs_positions:
-                if new_row == stair["row"] and new_col == stair["col"]:
-                    return True
-
-        # Check if move is within maze bounds
-        if not (0 <= new_row < max_row and 0 <= new_col < max_col):
-            if not is_player:
-                print(f"Move to ({new_row}, {new_col}) is out of bounds for mummy!")
-                return False
-            # If player moves out of bounds but not to stairs, block it
-            if not any(stair["row"] == new_row and stair["col"] == new_col for stair in stairs_positions):
-                print(f"Move to ({new_row}, {new_col}) is out of bounds and not a stair!")
-                return False
-
-        # Determine movement direction
-        direction = None
-        if new_row < self.row:
-            direction = "top"
-        elif new_row > self.row:
-            direction = "bottom" 
-        elif new_col < self.col:
-            direction = "left"
-        elif new_col > self.col:
-            direction = "right"
-        
-        # If no direction change, move is invalid
-        if direction is None:
-            return False
-
-        current_cell = maze[self.row][self.col]
-        target_cell = maze[new_row][new_col] if (0 <= new_row < max_row and 0 <= new_col < max_col) else {}
-
-        # Check walls in current cell
-        if "walls" in current_cell and direction in current_cell["walls"]:
-            print(f"Blocked by wall in current cell at ({self.row}, {self.col}) in direction {direction}")
-            return False
+    def eligible_move(self, level, gate, new_row, new_col, is_player=False, origin=None):
+        """Tra bảng di chuyển đã biên dịch của `level` (rules.Level).
 
-        # Check walls in target cell
-        opposite = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
-        if "walls" in target_cell and opposite[direction] in target_cell["walls"]:
-            print(f"Blocked by wall in target cell at ({new_row}, {new_col}) from direction {opposite[direction]}")
+        `origin` mặc định là ô hiện tại của nhân vật; các thuật toán tìm đường
+        truyền vào ô đang được mở rộng.
+        """
+        row, col = origin if origin is not None else (self.row, self.col)
+        dr, dc = new_row - row, new_col - col
+        if abs(dr) + abs(dc) != 1:
             return False
-
-        # Check gates
-        if gate.get("isClosed", False):
-            if direction == "up" and self.row > 0 and maze[self.row - 1][self.col].get("gate"):
-                print(f"Blocked by closed gate at ({self.row - 1}, {self.col})")
-                return False
-            if direction == "down" and self.row < len(maze) - 1 and maze[self.row + 1][self.col].get("gate"):
-                print(f"Blocked by closed gate at ({self.row + 1}, {self.col})")
-                return False
-            if direction == "left" and self.col > 0 and maze[self.row][self.col - 1].get("gate"):
-                print(f"Blocked by closed gate at ({self.row}, {self.col - 1})")
-                return False
-            if direction == "right" and self.col < len(maze[0]) - 1 and maze[self.row][self.col + 1].get("gate"):
-                print(f"Blocked by closed gate at ({self.row}, {self.col + 1})")
-                return False
-
-        return True
+        direction = "up" if dr == -1 else "down" if dr == 1 else "left" if dc == -1 else "right"
+        gate_closed = gate.get("isClosed", False)
+        if is_player:
+            return level.player_target(row, col, direction, gate_closed) is not None
+        return level.mummy_target(row, col, direction, gate_closed) is not None
 
     def add_to_move_queue(self, direction, new_row, new_col):
         self.move_queue.append((direction, new_row, new_col))
@@ -187,26 +156,14 @@ class Character(pygame.sprite.Sprite):
             self.direction = next_move[0]
             self.row, self.col = next_move[1], next_move[2]
             self.grid_x, self.grid_y = self.row, self.col
-            self.target_pos = (215 + self.col * CELL_SIZE, 80 + self.row * CELL_SIZE)
+            self.target_pos = self.board.to_pixel(self.row, self.col)
             self.moving = True
             self.update_image()
 
 class Player(Character):
-    def __init__(self, x, y):
-        images = {
-            "up": [],
-            "down": [],
-            "left": [],
-            "right": []
-        }
-        for direction in ["up", "down", "left", "right"]:
-            sheet = pygame.image.load(f"images/player/move_{direction}.png")
-            frame_width = sheet.get_width() // 5
-            for i in range(5):
-                frame = sheet.subsurface((i * frame_width, 0, frame_width, sheet.get_height()))
-                frame = pygame.transform.scale(frame, (CELL_SIZE, CELL_SIZE))
-                images[direction].append(frame)
-        super().__init__(x, y, images)
+    def __init__(self, x, y, board=DEFAULT_BOARD):
+        images = character_frames("player", board.cell_size)
+        super().__init__(x, y, images, board)
         self.algorithm = "manual"  # Default algorithm
         self.q_table = {}  # For Q-learning
         self.learning_rate = 0.1
@@ -236,7 +193,7 @@ class Player(Character):
         new_q = current_q + self.learning_rate * (reward + self.discount_factor * next_max_q - current_q)
         self.q_table[state][action] = new_q
 
-    def a_star_search(self, maze, start, goal, gate, stairs_positions):
+    def a_star_search(self, level, start, goal, gate):
         def heuristic(a, b):
             return self.manhattan_distance(a[0], a[1], b[0], b[1])
 
@@ -259,7 +216,7 @@ class Player(Character):
                 elif direction == "right": next_col += 1
 
                 next_pos = (next_row, next_col)
-                if self.eligible_move(maze, gate, next_row, next_col, is_player=True, stairs_positions=stairs_positions):
+                if self.eligible_move(level, gate, next_row, next_col, is_player=True, origin=current):
                     new_cost = cost_so_far[current] + 1
                     if next_pos not in cost_so_far or new_cost < cost_so_far[next_pos]:
                         cost_so_far[next_pos] = new_cost
@@ -279,7 +236,7 @@ class Player(Character):
         path.reverse()
         return path
 
-    def min_conflict_search(self, maze, start, goal, gate, stairs_positions):
+    def min_conflict_search(self, level, start, goal, gate):
         def get_conflicts(pos):
             conflicts = 0
             row, col = pos
@@ -290,7 +247,7 @@ class Player(Character):
                 elif direction == "left": next_col -= 1
                 elif direction == "right": next_col += 1
                 
-                if not self.eligible_move(maze, gate, next_row, next_col, is_player=True, stairs_positions=stairs_positions):
+                if not self.eligible_move(level, gate, next_row, next_col, is_player=True, origin=pos):
                     conflicts += 1
             return conflicts
 
@@ -311,7 +268,7 @@ class Player(Character):
 
                 next_pos = (next_row, next_col)
                 if (next_pos not in visited and 
-                    self.eligible_move(maze, gate, next_row, next_col, is_player=True, stairs_positions=stairs_positions)):
+                    self.eligible_move(level, gate, next_row, next_col, is_player=True, origin=current)):
                     conflicts = get_conflicts(next_pos)
                     if conflicts < min_conflicts:
                         min_conflicts = conflicts
@@ -326,7 +283,7 @@ class Player(Character):
 
         return path
 
-    def local_beam_search(self, maze, start, goal, gate, stairs_positions, mummy_row, mummy_col, beam_width=3, max_depth=10):
+    def local_beam_search(self, level, start, goal, gate, mummy_row, mummy_col, beam_width=3, max_depth=10):
         def heuristic(pos, goal, mummy_pos):
             goal_dist = self.manhattan_distance(pos[0], pos[1], goal[0], goal[1])
             mummy_dist = self.manhattan_distance(pos[0], pos[1], mummy_row, mummy_col)
@@ -351,7 +308,7 @@ class Player(Character):
 
                     next_pos = (next_row, next_col)
                     if (next_pos not in visited and 
-                        self.eligible_move(maze, gate, next_row, next_col, is_player=True, stairs_positions=stairs_positions)):
+                        self.eligible_move(level, gate, next_row, next_col, is_player=True, origin=pos)):
                         new_path = path + [(direction, next_row, next_col)]
                         score = heuristic(next_pos, goal, (mummy_row, mummy_col))
                         next_beam.append((score, next_pos, new_path))
@@ -370,12 +327,12 @@ class Player(Character):
             return beam[0][2][0] if beam[0][2] else []
         return []
 
-    def auto_move(self, maze, gate, mummy_row, mummy_col, stairs_positions, goal_row, goal_col):
+    def auto_move(self, level, gate, mummy_row, mummy_col, goal_row, goal_col):
         if self.moving or self.move_queue:
             return False
 
         if self.algorithm == "a_star":
-            path = self.a_star_search(maze, (self.row, self.col), (goal_row, goal_col), gate, stairs_positions)
+            path = self.a_star_search(level, (self.row, self.col), (goal_row, goal_col), gate)
             if path and len(path) > 1:
                 next_pos = path[1]
                 direction = None
@@ -404,7 +361,7 @@ class Player(Character):
             elif direction == "left": new_col -= 1
             elif direction == "right": new_col += 1
 
-            if self.eligible_move(maze, gate, new_row, new_col, is_player=True, stairs_positions=stairs_positions):
+            if self.eligible_move(level, gate, new_row, new_col, is_player=True):
                 next_state = self.get_state_key(new_row, new_col)
                 reward = -1  # Default reward
                 if (new_row, new_col) == (goal_row, goal_col):
@@ -417,7 +374,7 @@ class Player(Character):
                 return True
 
         elif self.algorithm == "min_conflict":
-            path = self.min_conflict_search(maze, (self.row, self.col), (goal_row, goal_col), gate, stairs_positions)
+            path = self.min_conflict_search(level, (self.row, self.col), (goal_row, goal_col), gate)
             if path and len(path) > 1:
                 next_pos = path[1]
                 direction = None
@@ -431,7 +388,7 @@ class Player(Character):
                     return True
 
         elif self.algorithm == "local_beam":
-            result = self.local_beam_search(maze, (self.row, self.col), (goal_row, goal_col), gate, stairs_positions, mummy_row, mummy_col)
+            result = self.local_beam_search(level, (self.row, self.col), (goal_row, goal_col), gate, mummy_row, mummy_col)
             if result:
                 direction, new_row, new_col = result
                 self.add_to_move_queue(direction, new_row, new_col)
@@ -439,18 +396,13 @@ class Player(Character):
 
         return False
 
-    def set_algorithm(self, algorithm):
-        self.algorithm = algorithm
-        if algorithm == "q_learning":
-            self.q_table = {}  # Reset Q-table when switching to Q-learning
-
     def set_algorithm(self, algorithm_name):
         self.current_algorithm = algorithm_name
         if algorithm_name == "search_no_observation":
             from agent import search_no_observation
             self.pathfinding_func = search_no_observation
 
-    def move(self, direction, maze, gate, stairs_positions):
+    def move(self, direction, level, gate):
         if self.moving:
             return False
         
@@ -465,72 +417,27 @@ class Player(Character):
         elif direction == "right":
             new_col += 1
 
-        if self.eligible_move(maze, gate, new_row, new_col, is_player=True, stairs_positions=stairs_positions):
+        if self.eligible_move(level, gate, new_row, new_col, is_player=True):
             self.add_to_move_queue(direction, new_row, new_col)
             return True
         return False
 
 class Mummy(Character):
-    def __init__(self, x, y, color="white"):
-        images = {
-            "up": [],
-            "down": [],
-            "left": [],
-            "right": []
-        }
-        for direction in ["up", "down", "left", "right"]:
-            sheet = pygame.image.load(f"images/mummy/{color}{direction}.png")
-            frame_width = sheet.get_width() // 5
-            for i in range(5):
-                frame = sheet.subsurface((i * frame_width, 0, frame_width, sheet.get_height()))
-                frame = pygame.transform.scale(frame, (CELL_SIZE, CELL_SIZE))
-                images[direction].append(frame)
-        super().__init__(x, y, images)
+    def __init__(self, x, y, color="white", board=DEFAULT_BOARD):
+        images = character_frames(color, board.cell_size)
+        super().__init__(x, y, images, board)
         self.color = color.lower()
 
     def manhattan_distance(self, row1, col1, row2, col2):
         return abs(row1 - row2) + abs(col1 - col2)
 
-    def auto_move(self, maze, gate, player_row, player_col):
+    def auto_move(self, level, gate, player_row, player_col):
+        """Xếp hàng các bước đi của xác ướp theo luật trong rules.mummy_steps."""
         if self.moving or self.move_queue:
             return False
 
-        moved = False
-        for _ in range(2):  # Tối đa 2 bước di chuyển
-            current_distance = self.manhattan_distance(self.row, self.col, player_row, player_col)
-            possible_moves = []
-
-            directions = ["up", "down", "left", "right"]
-            for direction in directions:
-                new_row, new_col = self.row, self.col
-                if direction == "up": new_row -= 1
-                elif direction == "down": new_row += 1
-                elif direction == "left": new_col -= 1
-                elif direction == "right": new_col += 1
-
-                if self.eligible_move(maze, gate, new_row, new_col):
-                    new_distance = self.manhattan_distance(new_row, new_col, player_row, player_col)
-                    if new_distance < current_distance:  # Chỉ chọn hướng giảm khoảng cách
-                        possible_moves.append((new_distance, direction, new_row, new_col))
-
-            if not possible_moves:
-                break
-
-            # Sắp xếp theo khoảng cách nhỏ nhất
-            possible_moves.sort(key=lambda x: x[0])
-            min_distance = possible_moves[0][0]
-            best_moves = [move for move in possible_moves if move[0] == min_distance]
-
-            # Ưu tiên di chuyển theo màu
-            if self.color == "white":
-                priority = ["left", "right", "up", "down"]
-            else:  # red
-                priority = ["up", "down", "left", "right"]
-
-            selected_move = min(best_moves, key=lambda x: priority.index(x[1]))
-            direction, new_row, new_col = selected_move[1], selected_move[2], selected_move[3]
-
+        steps = mummy_steps(level, self.row, self.col, self.color, (player_row, player_col),
+                            gate.get("isClosed", False))
+        for direction, new_row, new_col in steps:
             self.add_to_move_queue(direction, new_row, new_col)
-            moved = True
-
-        return moved
\ No newline at end of file
+        return bool(steps)
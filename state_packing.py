@@ -0,0 +1,180 @@
+"""Mã hóa trạng thái rules.State thành một số nguyên nhỏ cho các thuật toán tìm kiếm.
+
+Một trạng thái không kết thúc được đóng gói thành
+    gate + 2 * (player + N * sum(code_i * B ** i))
+với N là số ô, code_i = 1 + cell * 2 + color_bit của xác ướp thứ i (theo
+thứ tự trong rules.State, 0 nghĩa là không còn xác ướp ở vị trí đó) và B = 2 * N + 1.
+Mê cung tĩnh chỉ được giữ một lần trong rules.Level, mỗi nút tìm kiếm chỉ là
+một số nguyên.
+"""
+import threading
+import weakref
+
+import rules
+
+# Bit màu của xác ướp trong mã đóng gói
+COLORS = ("red", "white")
+COLOR_BITS = {color: bit for bit, color in enumerate(COLORS)}
+
+# Không gian trạng thái tối đa (số bit) còn dùng bitmap dày đặc cho tập đã duyệt
+MAX_BITMAP_STATES = 1 << 27
+# Ước lượng số byte một phần tử trong set tốn; bitmap chỉ đáng dùng khi nhỏ hơn set của số trạng thái tối đa
+SET_BYTES_PER_STATE = 64
+
+_packed_levels = weakref.WeakKeyDictionary()
+_packed_levels_lock = threading.Lock()  # luồng lập kế hoạch (planner.py) và luồng chính cùng dùng
+
+
+def get_packed_level(level):
+    """PackedLevel dùng chung cho một rules.Level."""
+    with _packed_levels_lock:
+        packed = _packed_levels.get(level)
+        if packed is None:
+            packed = PackedLevel(level)
+            _packed_levels[level] = packed
+        return packed
+
+
+class VisitedSet:
+    """Tập trạng thái đã duyệt: bitmap khi không gian đủ nhỏ, set khi quá lớn.
+
+    `max_states` là số trạng thái tối đa sẽ được thêm (None nếu không giới
+    hạn); khi nó nhỏ so với không gian, set rẻ hơn việc cấp phát và xóa trắng
+    cả bitmap.
+    """
+
+    def __init__(self, space_size, max_states=None):
+        if space_size <= MAX_BITMAP_STATES and \
+                (max_states is None or space_size >> 3 <= max_states * SET_BYTES_PER_STATE):
+            self.bits = bytearray((space_size >> 3) + 1)
+            self.codes = None
+        else:
+            self.bits = None
+            self.codes = set()
+        self.count = 0
+
+    def add(self, code):
+        """Thêm `code`; trả về False nếu nó đã có trong tập."""
+        if self.bits is not None:
+            byte, bit = code >> 3, 1 << (code & 7)
+            if self.bits[byte] & bit:
+                return False
+            self.bits[byte] |= bit
+        else:
+            if code in self.codes:
+                return False
+            self.codes.add(code)
+        self.count += 1
+        return True
+
+    def __contains__(self, code):
+        if self.bits is not None:
+            return bool(self.bits[code >> 3] & (1 << (code & 7)))
+        return code in self.codes
+
+    def __len__(self):
+        return self.count
+
+
+class PackedLevel:
+    """Đóng gói/giải mã trạng thái và sinh trạng thái con trực tiếp trên số nguyên."""
+
+    def __init__(self, level):
+        self.level = level
+        self.cells = level.size
+        self.base = 2 * self.cells + 1
+        self.slots = len(level.mummies_start)
+        # Số mã trạng thái có thể có (cận trên), dùng để cấp phát bitmap
+        self.space_size = 2 * self.cells * self.base ** self.slots
+
+    def pack(self, state):
+        level = self.level
+        codes = [1 + level.cell_index(row, col) * 2 + COLOR_BITS[color]
+                 for row, col, color in state.mummies]
+        return self._pack(level.cell_index(*state.player), codes, state.gate_closed)
+
+    def _pack(self, player, codes, gate_closed):
+        mummies = 0
+        for code in reversed(codes):
+            mummies = mummies * self.base + code
+        return int(gate_closed) + 2 * (player + self.cells * mummies)
+
+    def unpack(self, code):
+        """Giải mã về rules.State."""
+        gate_closed, player, mummies = self.decode(code)
+        coords = self.level.coords
+        return rules.State(
+            self.level,
+            coords[player],
+            tuple(coords[cell] + (COLORS[color],) for cell, color in mummies),
+            bool(gate_closed),
+        )
+
+    def decode(self, code):
+        """(gate_closed, ô người chơi, [(ô, color_bit), ...]) của một mã trạng thái."""
+        gate_closed = code & 1
+        rest = code >> 1
+        player = rest % self.cells
+        rest //= self.cells
+        mummies = []
+        while rest:
+            mummy = rest % self.base - 1
+            rest //= self.base
+            mummies.append((mummy >> 1, mummy & 1))
+        return gate_closed, player, mummies
+
+    def new_visited(self, max_states=None):
+        return VisitedSet(self.space_size, max_states)
+
+    def successor(self, code, d):
+        """Trạng thái con sau khi người chơi đi hướng d (chỉ số trong rules.DIRECTIONS).
+
+        Trả về (mã con, kết quả); mã con là None khi nước đi bị chặn hoặc kết thúc ván.
+        Giống hệt rules.step_detail nhưng không tạo tuple trung gian.
+        """
+        level = self.level
+        cells = self.cells
+        base = self.base
+        gate_closed = code & 1
+        rest = code >> 1
+        player = rest % cells
+        rest //= cells
+
+        bit = 1 << d
+        if level.exit_mask[player] & bit:
+            stair = level.exit_targets[player * 4 + d]
+            return None, (rules.TRAPPED if stair in level.traps else rules.WIN)
+        masks = level.gate_mask if gate_closed else level.open_mask
+        if not masks[player] & bit:
+            return None, rules.BLOCKED
+        target = level.neighbors[player * 4 + d]
+        if level.trap_mask[target]:
+            return None, rules.TRAPPED
+
+        player_row, player_col = level.coords[target]
+        destination = rules.mummy_destination
+        occupied = 0
+        codes = []
+        while rest:
+            mummy = rest % base - 1
+            rest //= base
+            color = mummy & 1
+            cell = destination(level, mummy >> 1, COLORS[color], player_row, player_col, gate_closed)
+            if occupied >> cell & 1:
+                continue  # Nhập vào xác ướp đứng trước
+            occupied |= 1 << cell
+            codes.append(1 + cell * 2 + color)
+
+        if occupied >> target & 1:
+            return None, rules.CAUGHT
+        return self._pack(target, codes, gate_closed), rules.MOVED
+
+    def path_to(self, parents, code):
+        """Dựng lại chuỗi hướng đi từ bảng cha {con: cha * 4 + hướng} (gốc có giá trị -1)."""
+        actions = []
+        link = parents[code]
+        while link >= 0:
+            actions.append(rules.DIRECTIONS[link & 3])
+            link = parents[link >> 2]
+        actions.reverse()
+        return actions
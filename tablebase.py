@@ -0,0 +1,295 @@
+"""Bảng tàn cuộc (tablebase) của một cấp độ, tính bằng quy nạp ngược.
+
+Mọi trạng thái hợp lệ (đạt tới được khi người chơi xuất phát ở bất kỳ ô trống
+nào) được gán một giá trị chính xác: thắng sau N lượt, thua sau N lượt (mọi
+nước đi đều dẫn tới chết) hoặc hòa (sống mãi nhưng không tới được cầu thang).
+Chỉ các trạng thái đạt tới được được lưu: mảng NumPy các mã trạng thái đóng
+gói đã sắp xếp cùng một byte giá trị cho mỗi mã, tra bằng tìm nhị phân; mê
+cung có mã vượt quá uint64 dùng dict và lưu mã thành các hàng byte.
+
+Chạy `python tablebase.py` để xem mức độ "dễ thở" của từng ô xuất phát.
+"""
+from collections import deque
+import os
+import threading
+
+import numpy as np
+
+import rules
+from policy_cache import MAX_POLICY_STATES, POLICY_CACHE_DIR, start_states
+from state_packing import get_packed_level
+
+# Mã hóa một byte: 0 chưa biết, 1 hòa, 2..128 thắng sau 1..127 lượt, 255..129 thua sau 1..127 lượt
+UNKNOWN = 0
+DRAW = 1
+MAX_DEPTH = 127
+
+WIN = "win"
+LOSS = "loss"
+DRAW_RESULT = "draw"
+
+# Mã trạng thái từ mức này trở lên không vừa uint64, khi đó dùng dict
+MAX_ARRAY_CODE = 1 << 64
+
+
+def encode_value(kind, n=0):
+    if kind == WIN:
+        return 1 + min(n, MAX_DEPTH)
+    if kind == LOSS:
+        return 256 - min(n, MAX_DEPTH)
+    return DRAW
+
+
+def decode_value(value):
+    """(kind, n) của một byte giá trị; (None, 0) nếu trạng thái không có trong bảng."""
+    if value == UNKNOWN:
+        return None, 0
+    if value == DRAW:
+        return DRAW_RESULT, 0
+    if value <= MAX_DEPTH + 1:
+        return WIN, value - 1
+    return LOSS, 256 - value
+
+
+def move_rank(kind, n):
+    """Khóa sắp xếp: thắng nhanh > hòa > thua càng muộn càng tốt > chết ngay."""
+    if kind == WIN:
+        return (3, -n)
+    if kind == DRAW_RESULT:
+        return (2, 0)
+    if kind == LOSS:
+        return (1, n)
+    return (0, 0)
+
+
+class Tablebase:
+    def __init__(self, level, codes, values):
+        self.level = level
+        self.packed = get_packed_level(level)
+        self.codes = codes  # numpy.ndarray uint64 đã sắp xếp, None khi `values` là dict mã -> byte
+        self.values = values  # numpy.ndarray uint8 song song với `codes`
+
+    def raw_value(self, code):
+        if self.codes is None:
+            return self.values.get(code, UNKNOWN)
+        if code >= MAX_ARRAY_CODE:
+            return UNKNOWN
+        i = int(np.searchsorted(self.codes, np.uint64(code)))
+        if i < len(self.codes) and int(self.codes[i]) == code:
+            return int(self.values[i])
+        return UNKNOWN
+
+    def value(self, state):
+        """(kind, n) của trạng thái: ("win", 3) nghĩa là thắng sau 3 lượt nếu đi đúng."""
+        return decode_value(self.raw_value(self.packed.pack(state)))
+
+    def move_values(self, state):
+        """[(direction, kind, n)] cho mọi nước đi hợp lệ; chết ngay được ghi là ("loss", 0)."""
+        code = self.packed.pack(state)
+        result = []
+        for d, direction in enumerate(rules.DIRECTIONS):
+            child, outcome = self.packed.successor(code, d)
+            if outcome == rules.BLOCKED:
+                continue
+            if outcome == rules.WIN:
+                result.append((direction, WIN, 0))
+            elif outcome in rules.TERMINAL_OUTCOMES:
+                result.append((direction, LOSS, 0))
+            else:
+                kind, n = decode_value(self.raw_value(child))
+                result.append((direction, kind, n))
+        return result
+
+    def best_move(self, state):
+        """Nước đi có giá trị tốt nhất, None nếu không có nước hợp lệ hoặc trạng thái lạ."""
+        if self.raw_value(self.packed.pack(state)) == UNKNOWN:
+            return None
+        moves = self.move_values(state)
+        if not moves:
+            return None
+        return max(moves, key=lambda move: move_rank(move[1], move[2]))[0]
+
+    def start_position_report(self):
+        """{ô xuất phát: (kind, n)} với xác ướp ở vị trí ban đầu của cấp độ."""
+        return {state.player: self.value(state) for state in start_states(self.level)}
+
+    def save(self, path):
+        if self.codes is None:
+            # Mã không vừa uint64: mỗi mã là một hàng byte little-endian cùng độ rộng
+            width = max((code.bit_length() + 7) // 8 for code in self.values) if self.values else 1
+            data = b"".join(code.to_bytes(width, "little") for code in self.values)
+            codes = np.frombuffer(data, dtype=np.uint8).reshape(len(self.values), width)
+            values = np.fromiter(self.values.values(), dtype=np.uint8, count=len(self.values))
+        else:
+            codes, values = self.codes, self.values
+        np.savez_compressed(path, hash=self.level.content_hash(), codes=codes, values=values)
+
+    @classmethod
+    def load(cls, level, path):
+        with np.load(path) as data:
+            if str(data["hash"]) != level.content_hash():
+                return None
+            codes, values = data["codes"], data["values"]
+        if codes.ndim == 2:
+            return cls(level, None, {int.from_bytes(row.tobytes(), "little"): int(value)
+                                     for row, value in zip(codes, values)})
+        order = np.argsort(codes, kind="stable")
+        return cls(level, codes[order], values[order])
+
+
+def _make_tablebase(level, items):
+    """Tablebase từ các cặp (mã, byte giá trị); dict khi không gian mã vượt quá uint64."""
+    if get_packed_level(level).space_size > MAX_ARRAY_CODE:
+        return Tablebase(level, None, dict(items))
+    items = sorted(items)
+    codes = np.fromiter((code for code, _ in items), dtype=np.uint64, count=len(items))
+    values = np.fromiter((value for _, value in items), dtype=np.uint8, count=len(items))
+    return Tablebase(level, codes, values)
+
+
+def build_tablebase(level, max_states=MAX_POLICY_STATES):
+    """Quy nạp ngược từ các trạng thái thắng (tới cầu thang) và chết (bẫy, bị bắt).
+
+    Trả về None nếu số trạng thái đạt tới được vượt quá `max_states`.
+    """
+    packed = get_packed_level(level)
+    visited = packed.new_visited(max_states)
+    order = []
+    queue = deque()
+    for state in start_states(level):
+        code = packed.pack(state)
+        if visited.add(code):
+            queue.append(code)
+
+    predecessors = {}
+    remaining = {}  # số nước đi chưa được xác định là thua
+    wins = {}
+    losses = {}
+    win_frontier = deque()
+    while queue:
+        code = queue.popleft()
+        order.append(code)
+        open_moves = 0
+        for d in range(4):
+            child, outcome = packed.successor(code, d)
+            if outcome == rules.WIN:
+                if code not in wins:
+                    wins[code] = 1
+                    win_frontier.append(code)
+                continue
+            if child is None:
+                continue  # Bị chặn hoặc chết ngay (nước thua đã xác định)
+            open_moves += 1
+            predecessors.setdefault(child, []).append(code)
+            if visited.add(child):
+                queue.append(child)
+        remaining[code] = open_moves
+        if max_states is not None and len(visited) > max_states:
+            return None
+
+    # Thắng: BFS ngược, N nhỏ nhất
+    while win_frontier:
+        code = win_frontier.popleft()
+        for parent in predecessors.get(code, ()):
+            if parent not in wins:
+                wins[parent] = wins[code] + 1
+                win_frontier.append(parent)
+
+    # Thua: mọi nước đi đều dẫn tới trạng thái thua; xử lý theo N tăng dần nên
+    # nước cuối cùng được xác định cho N lớn nhất (người chơi cố kéo dài nhất)
+    loss_frontier = deque()
+    for code in order:
+        if code not in wins and remaining[code] == 0 and _has_legal_move(packed, code):
+            losses[code] = 1
+            loss_frontier.append(code)
+    while loss_frontier:
+        code = loss_frontier.popleft()
+        for parent in predecessors.get(code, ()):
+            if parent in wins or parent in losses:
+                continue
+            remaining[parent] -= 1
+            if remaining[parent] == 0:
+                losses[parent] = losses[code] + 1
+                loss_frontier.append(parent)
+
+    def items():
+        for code in order:
+            if code in wins:
+                yield code, encode_value(WIN, wins[code])
+            elif code in losses:
+                yield code, encode_value(LOSS, losses[code])
+            else:
+                yield code, DRAW
+
+    return _make_tablebase(level, items())
+
+
+def _has_legal_move(packed, code):
+    return any(packed.successor(code, d)[1] != rules.BLOCKED for d in range(4))
+
+
+_tablebases = {}
+_tablebases_lock = threading.Lock()  # luồng lập kế hoạch (planner.py) và luồng chính cùng dùng
+
+
+def get_tablebase(level, cache_dir=POLICY_CACHE_DIR):
+    """Tablebase của `level`: bộ nhớ -> tệp .npz theo mã băm nội dung -> tính mới rồi lưu.
+
+    None nếu cấp độ quá lớn để lập bảng.
+    """
+    key = level.content_hash()
+    with _tablebases_lock:
+        if key not in _tablebases:
+            _tablebases[key] = _load_or_build(level, os.path.join(cache_dir, f"{key}.tablebase.npz"))
+        return _tablebases[key]
+
+
+def _load_or_build(level, path):
+    try:
+        tablebase = Tablebase.load(level, path)
+    except (OSError, ValueError, KeyError):
+        tablebase = None
+    if tablebase is None:
+        tablebase = build_tablebase(level)
+        if tablebase is not None:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                tablebase.save(path)
+            except OSError as e:
+                print(f"Không thể lưu tablebase vào '{path}': {e}")
+    return tablebase
+
+
+def format_report(level, report):
+    """Lưới ký tự: W3 thắng sau 3 lượt, L2 thua sau 2 lượt, == hòa, ## ô bẫy/xác ướp."""
+    lines = []
+    for row in range(level.rows):
+        cells = []
+        for col in range(level.cols):
+            kind, n = report.get((row, col), (None, 0))
+            if kind == WIN:
+                cells.append(f"W{n:<2}")
+            elif kind == LOSS:
+                cells.append(f"L{n:<2}")
+            elif kind == DRAW_RESULT:
+                cells.append("== ")
+            else:
+                cells.append("## ")
+        lines.append(" ".join(cells))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from level_manager import LevelManager
+
+    level_manager = LevelManager()
+    for number in range(1, level_manager.get_level_count() + 1):
+        level = level_manager.compile_level(number)
+        tablebase = get_tablebase(level)
+        if tablebase is None:
+            print(f"Level {number}: quá lớn để lập tablebase\n")
+            continue
+        kind, n = tablebase.value(level.initial_state())
+        print(f"Level {number}: start {level.player_start} -> {kind} {n}")
+        print(format_report(level, tablebase.start_position_report()))
+        print()
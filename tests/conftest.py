@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from level_manager import LevelManager  # noqa: E402
+
+LEVELS_FILE = os.path.join(ROOT, "levels.json")
+
+
+@pytest.fixture(scope="session")
+def level_manager():
+    return LevelManager(LEVELS_FILE)
+
+
+@pytest.fixture(scope="session")
+def levels(level_manager):
+    """{số cấp độ: rules.Level} cho mọi cấp độ trong levels.json."""
+    return {number: level_manager.compile_level(number)
+            for number in range(1, level_manager.get_level_count() + 1)}
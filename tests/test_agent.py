@@ -0,0 +1,18 @@
+import random
+
+import rules
+from agent import GameState, PlanContext, choose_move
+
+MODES = ("a_star", "q_learning", "min_conflict", "bfs", "local_beam", "search_no_observation")
+
+
+def test_choose_move_leaves_global_random_alone(levels):
+    random.seed(24)
+    before = random.getstate()
+    for number, level in levels.items():
+        for algorithm in MODES:
+            context = PlanContext(number, seed=1)
+            move, context = choose_move(context, GameState(level.initial_state()), algorithm)
+            assert move in rules.DIRECTIONS
+    assert random.getstate() == before
+
@@ -0,0 +1,68 @@
+import rules
+from replay import UNDO, ReplayRecorder, TOKEN_MOVES, load_replays, simulate, verify
+
+
+def play_attempt(recorder, level, tokens):
+    """Chơi `tokens` như Game: ghi từng lượt và lần hoàn tác; trả về trạng thái cuối."""
+    state = level.initial_state()
+    history = []
+    for token in tokens:
+        if token == UNDO:
+            state = history.pop()
+            recorder.record_undo()
+            continue
+        next_state, outcome = rules.step(state, TOKEN_MOVES[token])
+        if outcome != rules.BLOCKED:
+            history.append(state)
+            state = next_state
+            recorder.record_move(TOKEN_MOVES[token], outcome, "manual")
+    return state
+
+
+def test_simulate_recorded_attempt_with_undos(levels, tmp_path):
+    level = levels[5]
+    path = str(tmp_path / "session.jsonl")
+    recorder = ReplayRecorder(path, seed=22)
+    recorder.start_attempt(5, level)
+    # Lời giải ngắn nhất LLULUUUURRRRRR xen các nước thử rồi hoàn tác (kể cả
+    # sau khi bị bắt ở D<); nước U đầu tiên bị chặn nên không được ghi
+    final = play_attempt(recorder, level, "ULR<LL<UD<LR<UUD<UUD<RRL<RRRD<R")
+    recorder.close()
+
+    [replay] = load_replays(path)
+    assert replay["moves"] == "LR<LL<UD<LR<UUD<UUD<RRL<RRRD<R"
+    assert replay["outcome"] == rules.WIN
+    outcome, state = simulate(level, replay["moves"])
+    assert outcome == rules.WIN
+    assert state == final
+
+
+def test_undo_after_losing_move_resumes_attempt(levels, tmp_path):
+    level = levels[4]
+    path = str(tmp_path / "session.jsonl")
+    recorder = ReplayRecorder(path, seed=22)
+    recorder.start_attempt(4, level)
+    final = play_attempt(recorder, level, "DU<")
+    recorder.close()
+
+    [replay] = load_replays(path)
+    assert simulate(level, "DU") == (rules.CAUGHT, rules.step(final, "up")[0])
+    outcome, state = simulate(level, replay["moves"])
+    assert outcome == replay["outcome"] == rules.MOVED
+    assert state == final == simulate(level, "D")[1]
+
+
+def test_verify_checks_outcome_and_level_hash(level_manager, levels, tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    recorder = ReplayRecorder(path, seed=22)
+    for number in (2, 4):
+        recorder.start_attempt(number, levels[number])
+        play_attempt(recorder, levels[number], "DRRRR" if number == 2 else "DDLD")
+    recorder.close()
+    replays = load_replays(path)
+    assert [error for _, _, _, error in verify(replays, level_manager)] == [None, None]
+
+    replays[0]["outcome"] = rules.CAUGHT
+    replays[1]["hash"] = "0" * 40
+    errors = [error for _, _, _, error in verify(replays, level_manager)]
+    assert all(errors)
@@ -0,0 +1,146 @@
+"""rules.step_detail so với cách Game cũ di chuyển nhân vật trên các cấp độ có sẵn.
+
+`old_turn` chép lại logic trước khi có rules.py: Character.eligible_move đọc
+thẳng tường trong levels.json, Mummy.auto_move đi tối đa 2 bước rút ngắn
+khoảng cách theo ưu tiên màu, rồi Game.check_collisions xét bẫy, cầu thang,
+hai xác ướp nhập làm một và người chơi bị bắt. Các cấp độ trong levels.json
+không có cổng nên phần cổng đóng không được chép. Xác ướp được xét theo thứ
+tự trong dữ liệu cấp độ, như danh sách game.mummies của Game cũ.
+"""
+from collections import deque
+import random
+
+import rules
+
+OLD_DIRECTIONS = [("up", -1, 0), ("down", 1, 0), ("left", 0, -1), ("right", 0, 1)]
+OLD_PRIORITY = {"white": ["left", "right", "up", "down"], "red": ["up", "down", "left", "right"]}
+OPPOSITE = {"top": "bottom", "bottom": "top", "left": "right", "right": "left"}
+
+
+def old_eligible_move(maze, row, col, new_row, new_col, stairs=None):
+    if stairs and (new_row, new_col) in stairs:
+        return True
+    if not (0 <= new_row < len(maze) and 0 <= new_col < len(maze[0])):
+        return False
+    if new_row < row:
+        direction = "top"
+    elif new_row > row:
+        direction = "bottom"
+    elif new_col < col:
+        direction = "left"
+    else:
+        direction = "right"
+    if direction in maze[row][col].get("walls", ()):
+        return False
+    if OPPOSITE[direction] in maze[new_row][new_col].get("walls", ()):
+        return False
+    return True
+
+
+def old_mummy_moves(maze, row, col, color, player_row, player_col):
+    steps = []
+    for _ in range(2):
+        current_distance = abs(row - player_row) + abs(col - player_col)
+        possible_moves = []
+        for direction, dr, dc in OLD_DIRECTIONS:
+            new_row, new_col = row + dr, col + dc
+            if old_eligible_move(maze, row, col, new_row, new_col):
+                new_distance = abs(new_row - player_row) + abs(new_col - player_col)
+                if new_distance < current_distance:
+                    possible_moves.append((new_distance, direction, new_row, new_col))
+        if not possible_moves:
+            break
+        min_distance = min(move[0] for move in possible_moves)
+        best_moves = [move for move in possible_moves if move[0] == min_distance]
+        _, direction, row, col = min(best_moves, key=lambda move: OLD_PRIORITY[color].index(move[1]))
+        steps.append((direction, row, col))
+    return steps
+
+
+def old_turn(state, action):
+    """(kết quả, người chơi, xác ướp, đường đi của từng xác ướp) theo logic Game cũ."""
+    level = state.level
+    row, col = state.player
+    _, dr, dc = next(move for move in OLD_DIRECTIONS if move[0] == action)
+    new_row, new_col = row + dr, col + dc
+    if not old_eligible_move(level.maze, row, col, new_row, new_col, level.stairs):
+        return rules.BLOCKED, state.player, state.mummies, [[] for _ in state.mummies]
+
+    paths = []
+    mummies = []
+    for mummy_row, mummy_col, color in state.mummies:
+        path = old_mummy_moves(level.maze, mummy_row, mummy_col, color, new_row, new_col)
+        paths.append(path)
+        if path:
+            mummy_row, mummy_col = path[-1][1], path[-1][2]
+        # Hai xác ướp trùng ô: con đứng sau trong danh sách bị loại
+        if all((m[0], m[1]) != (mummy_row, mummy_col) for m in mummies):
+            mummies.append((mummy_row, mummy_col, color))
+
+    if (new_row, new_col) in level.traps:
+        outcome = rules.TRAPPED
+    elif (new_row, new_col) in level.stairs:
+        outcome = rules.WIN
+    elif any((m[0], m[1]) == (new_row, new_col) for m in mummies):
+        outcome = rules.CAUGHT
+    else:
+        outcome = rules.MOVED
+    return outcome, (new_row, new_col), tuple(mummies), paths
+
+
+def assert_same_turn(state, action):
+    turn = rules.step_detail(state, action)
+    outcome, player, mummies, paths = old_turn(state, action)
+    assert turn.outcome == outcome, (state.player, state.mummies, action)
+    assert turn.state.player == player
+    assert turn.state.mummies == mummies
+    assert [list(path) for path in turn.mummy_steps] == paths
+    return turn
+
+
+def test_step_detail_matches_old_movement_on_every_reachable_state(levels):
+    for level in levels.values():
+        start = level.initial_state()
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            state = queue.popleft()
+            for action in rules.DIRECTIONS:
+                turn = assert_same_turn(state, action)
+                if turn.outcome == rules.MOVED and turn.state not in seen:
+                    seen.add(turn.state)
+                    queue.append(turn.state)
+
+
+def test_step_detail_matches_old_movement_from_other_start_cells(levels):
+    generator = random.Random(20261018)
+    for level in levels.values():
+        for _ in range(50):
+            player = (generator.randrange(level.rows), generator.randrange(level.cols))
+            state = level.initial_state()._replace(player=player)
+            for _ in range(30):
+                turn = assert_same_turn(state, generator.choice(rules.DIRECTIONS))
+                if turn.outcome in rules.TERMINAL_OUTCOMES:
+                    break
+                state = turn.state
+
+
+def test_blocked_move_keeps_state(levels):
+    state = levels[1].initial_state()
+    blocked = [action for action in rules.DIRECTIONS
+               if rules.step_detail(state, action).outcome == rules.BLOCKED]
+    assert blocked
+    for action in blocked:
+        turn = rules.step_detail(state, action)
+        assert turn.state == state
+        assert turn.survivors == tuple(range(len(state.mummies)))
+
+
+def test_merge_keeps_mummy_listed_first():
+    # Xác ướp đỏ (đứng trước trong danh sách) đi 2 bước vào ô của xác ướp trắng bị tường chặn
+    maze = [[{}, {}, {}, {"walls": ["left"]}, {}, {}]]
+    mummies = [{"row": 0, "col": 5, "color": "red"}, {"row": 0, "col": 3, "color": "white"}]
+    level = rules.Level(maze, [{"row": 0, "col": -1}], {"row": 0, "col": 0}, mummies)
+    turn = assert_same_turn(level.initial_state(), "right")
+    assert turn.state.mummies == ((0, 3, "red"),)
+    assert turn.survivors == (0,)
@@ -0,0 +1,51 @@
+from collections import deque
+
+import rules
+from solver import replay, solve
+
+# Độ dài lời giải ngắn nhất của từng cấp độ trong levels.json
+OPTIMAL_LENGTHS = {1: 9, 2: 5, 3: 8, 4: 4, 5: 14, 6: 8}
+
+
+def shortest_win(state):
+    """Số lượt thắng ít nhất bằng BFS thẳng trên rules.step, None nếu không thắng được."""
+    seen = {state}
+    queue = deque([(state, 0)])
+    while queue:
+        state, depth = queue.popleft()
+        for action in rules.DIRECTIONS:
+            child, outcome = rules.step(state, action)
+            if outcome == rules.WIN:
+                return depth + 1
+            if outcome == rules.MOVED and child not in seen:
+                seen.add(child)
+                queue.append((child, depth + 1))
+    return None
+
+
+def test_optimal_lengths_for_levels_json(levels):
+    assert sorted(levels) == sorted(OPTIMAL_LENGTHS)
+    for number, level in levels.items():
+        solution = solve(level)
+        assert solution.complete
+        assert len(solution.moves) == OPTIMAL_LENGTHS[number], number
+        assert shortest_win(level.initial_state()) == OPTIMAL_LENGTHS[number]
+        _, outcome = replay(level.initial_state(), solution.moves)
+        assert outcome == rules.WIN
+
+
+def test_unsolvable_level_is_proved():
+    # Người chơi bị tường vây kín, cầu thang ở ngoài
+    maze = [[{"walls": ["top", "bottom", "left", "right"]}, {}]]
+    level = rules.Level(maze, [{"row": -1, "col": 1}], {"row": 0, "col": 0})
+    solution = solve(level)
+    assert solution.moves is None
+    assert solution.complete
+
+
+def test_limits_stop_search_without_proof(levels):
+    level = levels[5]
+    solution = solve(level, max_depth=OPTIMAL_LENGTHS[5] - 1)
+    assert solution.moves is None and not solution.complete
+    solution = solve(level, max_expanded=1)
+    assert solution.moves is None and not solution.complete
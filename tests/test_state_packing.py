@@ -0,0 +1,79 @@
+from collections import deque
+import random
+
+import rules
+from state_packing import get_packed_level
+
+
+def reachable_states(level):
+    start = level.initial_state()
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        state = queue.popleft()
+        for action in rules.DIRECTIONS:
+            child, outcome = rules.step(state, action)
+            if outcome == rules.MOVED and child not in seen:
+                seen.add(child)
+                queue.append(child)
+    return seen
+
+
+def test_pack_unpack_round_trip_on_reachable_states(levels):
+    for level in levels.values():
+        packed = get_packed_level(level)
+        codes = set()
+        for state in reachable_states(level):
+            for gate_closed in (False, True):
+                state = state._replace(gate_closed=gate_closed)
+                code = packed.pack(state)
+                assert 0 <= code < packed.space_size
+                assert packed.unpack(code) == state
+                codes.add(code)
+        # Hai trạng thái khác nhau không bao giờ cùng mã
+        assert len(codes) == 2 * len(reachable_states(level))
+
+
+def test_successor_matches_rules_step(levels):
+    for level in levels.values():
+        packed = get_packed_level(level)
+        for state in reachable_states(level):
+            code = packed.pack(state)
+            for d, action in enumerate(rules.DIRECTIONS):
+                child, outcome = packed.successor(code, d)
+                next_state, expected = rules.step(state, action)
+                assert outcome == expected
+                if outcome == rules.MOVED:
+                    assert packed.unpack(child) == next_state
+                else:
+                    assert child is None
+
+
+def test_round_trip_on_large_maze():
+    size = 64
+    maze = [[{} for _ in range(size)] for _ in range(size)]
+    generator = random.Random(7)
+    mummies = [{"row": generator.randrange(size), "col": generator.randrange(size),
+                "color": generator.choice(("white", "red"))} for _ in range(10)]
+    level = rules.Level(maze, [{"row": -1, "col": 0}], {"row": 0, "col": 0}, mummies)
+    packed = get_packed_level(level)
+    for _ in range(200):
+        cells = [level.coords[cell] for cell in generator.sample(range(level.size), 11)]
+        state = rules.State(
+            level,
+            cells[0],
+            tuple(sorted(cell + (generator.choice(("white", "red")),)
+                         for cell in cells[1:1 + generator.randrange(11)])),
+            generator.random() < 0.5,
+        )
+        assert packed.unpack(packed.pack(state)) == state
+
+
+def test_visited_set_uses_set_for_small_caps(levels):
+    packed = get_packed_level(levels[4])
+    assert packed.new_visited().bits is not None
+    capped = packed.new_visited(max_states=4001)
+    assert capped.bits is None
+    for visited in (packed.new_visited(), capped):
+        assert visited.add(5) and not visited.add(5)
+        assert 5 in visited and 6 not in visited and len(visited) == 1
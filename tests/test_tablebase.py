@@ -0,0 +1,73 @@
+import pytest
+
+import rules
+from policy_cache import start_states
+from solver import solve
+from state_packing import get_packed_level
+from tablebase import DRAW_RESULT, LOSS, MAX_ARRAY_CODE, WIN, Tablebase, build_tablebase, get_tablebase
+
+
+@pytest.fixture(scope="module")
+def tablebases(levels):
+    return {number: build_tablebase(level) for number, level in levels.items()}
+
+
+def assert_agrees_with_solver(tablebase, state):
+    kind, n = tablebase.value(state)
+    moves = solve(state.level, state).moves
+    if moves is None:
+        assert kind in (LOSS, DRAW_RESULT)
+    else:
+        assert (kind, n) == (WIN, len(moves))
+
+
+def test_every_value_agrees_with_solver(levels, tablebases):
+    for number, level in levels.items():
+        tablebase = tablebases[number]
+        for state in start_states(level):
+            assert tablebase.raw_value(tablebase.packed.pack(state))
+        for code in tablebase.codes:
+            assert_agrees_with_solver(tablebase, tablebase.packed.unpack(int(code)))
+
+
+def test_best_move_wins_in_table_distance(levels, tablebases):
+    for number, level in levels.items():
+        tablebase = tablebases[number]
+        state = level.initial_state()
+        kind, n = tablebase.value(state)
+        assert kind == WIN
+        for _ in range(n):
+            state, outcome = rules.step(state, tablebase.best_move(state))
+        assert outcome == rules.WIN
+
+
+def test_save_and_load_keep_values(levels, tablebases, tmp_path):
+    level = levels[6]
+    tablebase = tablebases[6]
+    path = str(tmp_path / "level6.tablebase.npz")
+    tablebase.save(path)
+    loaded = Tablebase.load(level, path)
+    assert list(loaded.codes) == list(tablebase.codes)
+    assert list(loaded.values) == list(tablebase.values)
+    # Tệp của cấp độ khác (mã băm khác) bị bỏ qua
+    assert Tablebase.load(levels[5], path) is None
+
+
+def test_codes_beyond_uint64_use_dict_and_persist(tmp_path):
+    # 10x10 trống với 9 xác ướp trắng: không gian mã vượt quá 2^64
+    maze = [[{} for _ in range(10)] for _ in range(10)]
+    mummies = [{"row": 9, "col": col, "color": "white"} for col in range(9)]
+    level = rules.Level(maze, [{"row": -1, "col": 0}], {"row": 0, "col": 0}, mummies)
+    assert get_packed_level(level).space_size > MAX_ARRAY_CODE
+
+    tablebase = get_tablebase(level, cache_dir=str(tmp_path))
+    assert tablebase.codes is None
+    assert max(tablebase.values) >= MAX_ARRAY_CODE
+    state = level.initial_state()
+    assert tablebase.value(state) == (WIN, len(solve(level).moves))
+
+    path = str(tmp_path / f"{level.content_hash()}.tablebase.npz")
+    loaded = Tablebase.load(level, path)
+    assert loaded.codes is None
+    assert loaded.values == tablebase.values
+    assert loaded.best_move(state) == tablebase.best_move(state)
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from undo_history import MAX_CODE_BYTES, UndoHistory
+
+
+def test_full_buffer_drops_oldest_without_spill():
+    history = UndoHistory(capacity=4)
+    for code in range(10):
+        history.push(code)
+    assert len(history) == 4
+    assert [history.pop() for _ in range(5)] == [9, 8, 7, 6, None]
+    assert not history
+
+
+def test_spill_restores_every_code_in_order():
+    history = UndoHistory(capacity=4, spill=True)
+    # Có cả 0 (không byte nào), mã một byte và mã rất lớn
+    codes = [0, 1, 255, 256, 1 << 64, (1 << 1000) + 3] + list(range(20, 40))
+    for code in codes:
+        history.push(code)
+    assert len(history) == len(codes)
+    assert history.spilled == len(codes) - 4
+    assert [history.pop() for _ in codes] == codes[::-1]
+    assert history.pop() is None
+    history.close()
+
+
+def test_spill_with_interleaved_undo():
+    generator = random.Random(21)
+    history = UndoHistory(capacity=3, spill=True)
+    expected = []
+    for _ in range(500):
+        if expected and generator.random() < 0.4:
+            assert history.pop() == expected.pop()
+        else:
+            code = generator.getrandbits(generator.randrange(1, 300))
+            history.push(code)
+            expected.append(code)
+        assert len(history) == len(expected)
+    assert [history.pop() for _ in range(len(expected))] == expected[::-1]
+    history.close()
+
+
+def test_clear_drops_spilled_codes():
+    history = UndoHistory(capacity=2, spill=True)
+    for code in range(6):
+        history.push(code)
+    history.clear()
+    assert len(history) == 0 and history.pop() is None
+    history.push(42)
+    assert history.pop() == 42
+    history.close()
+
+
+def test_code_too_long_for_spill():
+    history = UndoHistory(capacity=1, spill=True)
+    history.push(1 << (8 * MAX_CODE_BYTES))
+    with pytest.raises(ValueError):
+        history.push(1)
+    history.close()
+
+
+def test_close_releases_spill_file_and_history_stays_usable():
+    with UndoHistory(capacity=2, spill=True) as history:
+        for code in range(5):
+            history.push(code)
+        spill_file = history.spill_file
+        history.close()
+        assert spill_file.closed and history.spill_file is None
+        assert len(history) == 0 and history.pop() is None
+        for code in range(5):
+            history.push(code)
+        assert [history.pop() for _ in range(5)] == [4, 3, 2, 1, 0]
+    assert history.spill_file is None
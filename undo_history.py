@@ -0,0 +1,94 @@
+"""Lịch sử hoàn tác gọn: mã trạng thái đóng gói trong một vòng đệm cố định.
+
+Mỗi lượt chỉ lưu một số nguyên (state_packing.PackedLevel.pack). Khi vòng đệm
+đầy, mã cũ nhất hoặc bị bỏ (bộ nhớ giới hạn), hoặc được ghi tiếp vào một tệp
+tạm nếu bật spill. Trên đĩa mỗi mã chiếm vài byte: các byte của số nguyên rồi
+một byte độ dài đứng sau. Nhờ vậy lấy lại mã mới nhất từ cuối tệp và cắt tệp
+đi đều là O(1), và độ sâu hoàn tác không bị giới hạn.
+"""
+import os
+import tempfile
+
+DEFAULT_CAPACITY = 1024
+MAX_CODE_BYTES = 255  # độ dài mỗi mã trên đĩa được ghi bằng một byte
+
+
+class UndoHistory:
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill=False):
+        self.capacity = capacity
+        self.spill = spill
+        self.buffer = [0] * capacity
+        self.start = 0  # vị trí của mã cũ nhất trong vòng đệm
+        self.size = 0
+        self.spill_file = None  # tạo khi lần đầu cần tràn ra đĩa
+        self.spilled = 0  # số mã đang nằm trên đĩa (cũ hơn mọi mã trong vòng đệm)
+
+    def __len__(self):
+        return self.size + self.spilled
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+        self.spilled = 0
+        if self.spill_file is not None:
+            self.spill_file.seek(0)
+            self.spill_file.truncate()
+
+    def push(self, code):
+        """Thêm mã trạng thái mới nhất; vòng đệm đầy thì mã cũ nhất tràn ra đĩa hoặc bị bỏ."""
+        if self.size == self.capacity:
+            oldest = self.buffer[self.start]
+            if self.spill:
+                self._write(oldest)
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+        self.buffer[(self.start + self.size) % self.capacity] = code
+        self.size += 1
+
+    def pop(self):
+        """Lấy ra mã mới nhất, None nếu lịch sử rỗng."""
+        if self.size:
+            self.size -= 1
+            return self.buffer[(self.start + self.size) % self.capacity]
+        if self.spilled:
+            return self._read_last()
+        return None
+
+    def close(self):
+        """Bỏ toàn bộ lịch sử và đóng tệp tràn; vẫn dùng tiếp được (tệp được tạo lại khi cần)."""
+        self.start = 0
+        self.size = 0
+        self.spilled = 0
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, code):
+        data = code.to_bytes((code.bit_length() + 7) // 8, "little")
+        if len(data) > MAX_CODE_BYTES:
+            raise ValueError(f"Mã trạng thái dài {len(data)} byte, vượt quá {MAX_CODE_BYTES}")
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile(prefix="mummy_undo_")
+        self.spill_file.seek(0, os.SEEK_END)
+        self.spill_file.write(data + bytes((len(data),)))
+        self.spilled += 1
+
+    def _read_last(self):
+        file = self.spill_file
+        end = file.seek(0, os.SEEK_END)
+        file.seek(end - 1)
+        length = file.read(1)[0]
+        file.seek(end - 1 - length)
+        code = int.from_bytes(file.read(length), "little")
+        file.truncate(end - 1 - length)
+        self.spilled -= 1
+        return code